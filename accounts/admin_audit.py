@@ -115,7 +115,7 @@ def log_publication_action(admin_user, action_type, publication, request=None, c
         action_type=action_type,
         object_type='publication',
         object_id=publication.id,
-        object_name=f"{publication.cultivo.nombre} - {publication.cultivo.productor.username}",
+        object_name=f"{publication.cultivo.nombre} - {publication.productor.username}",
         description=f"{action_type.title()} publicación: {publication.cultivo.nombre}",
         request=request,
         changes=changes
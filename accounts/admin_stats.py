@@ -0,0 +1,179 @@
+"""
+Cifras del panel de administración.
+
+Cada tabla se resume con un solo aggregate() de conteos y sumas condicionales
+(Count/Sum con filter=Q(...)); los pedidos salen del resumen diario
+(sales/rollups.py) en lugar de recorrer Order, y el crecimiento mensual de
+usuarios de un único TruncMonth agrupado. El resultado completo se guarda en
+caché ADMIN_DASHBOARD_CACHE_TTL segundos, así que la mayoría de las visitas
+al panel no consultan ninguna de estas tablas.
+"""
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from inventory.models import Crop
+from marketplace.models import Publication
+from sales.models import DailyStats, Order
+
+User = get_user_model()
+
+CACHE_KEY = 'accounts:admin_dashboard:stats'
+GROWTH_MONTHS = 6
+
+
+def _cache_ttl():
+    return getattr(settings, 'ADMIN_DASHBOARD_CACHE_TTL', 60)
+
+
+def _zeros(valores):
+    return {clave: valor or 0 for clave, valor in valores.items()}
+
+
+def _user_stats(today, last_week, last_month):
+    return _zeros(User.objects.aggregate(
+        total_users=Count('id'),
+        active_users=Count('id', filter=Q(is_active=True)),
+        inactive_users=Count('id', filter=Q(is_active=False)),
+        admin_users=Count('id', filter=Q(role='Admin')),
+        producer_users=Count('id', filter=Q(role='Productor')),
+        buyer_users=Count('id', filter=Q(role='Comprador')),
+        new_users_today=Count('id', filter=Q(date_joined__date=today)),
+        new_users_week=Count('id', filter=Q(date_joined__date__gte=last_week)),
+        new_users_month=Count('id', filter=Q(date_joined__date__gte=last_month)),
+    ))
+
+
+def _crop_stats(today, last_week):
+    return _zeros(Crop.objects.aggregate(
+        total_crops=Count('id'),
+        crops_en_crecimiento=Count('id', filter=Q(estado='en_crecimiento')),
+        crops_listo_para_cosechar=Count('id', filter=Q(estado='listo_para_cosechar')),
+        crops_cosechado=Count('id', filter=Q(estado='cosechado')),
+        crops_sembrado=Count('id', filter=Q(estado='sembrado')),
+        crops_today=Count('id', filter=Q(created_at__date=today)),
+        crops_week=Count('id', filter=Q(created_at__date__gte=last_week)),
+    ))
+
+
+def _publication_stats(today, last_week):
+    return _zeros(Publication.objects.aggregate(
+        total_publications=Count('id'),
+        active_publications=Count('id', filter=Q(estado='Activa')),
+        paused_publications=Count('id', filter=Q(estado='Pausada')),
+        sold_out_publications=Count('id', filter=Q(estado='Agotada')),
+        publications_today=Count('id', filter=Q(created_at__date=today)),
+        publications_week=Count('id', filter=Q(created_at__date__gte=last_week)),
+    ))
+
+
+def _order_figures(today, last_week, last_month):
+    """Todas las cifras de pedidos e ingresos en un aggregate sobre DailyStats"""
+    completado = Q(estado='completado')
+    return _zeros(DailyStats.objects.aggregate(
+        total_orders=Sum('pedidos'),
+        orders_today=Sum('pedidos', filter=Q(dia=today)),
+        orders_week=Sum('pedidos', filter=Q(dia__gte=last_week)),
+        total_revenue=Sum('monto', filter=completado),
+        revenue_today=Sum('monto', filter=completado & Q(dia=today)),
+        revenue_week=Sum('monto', filter=completado & Q(dia__gte=last_week)),
+        revenue_month=Sum('monto', filter=completado & Q(dia__gte=last_month)),
+        pending_revenue=Sum('monto', filter=Q(estado__in=['pendiente', 'confirmado'])),
+        **{f'estado_{estado}': Sum('pedidos', filter=Q(estado=estado)) for estado, _ in Order.ESTADO_CHOICES},
+    ))
+
+
+def _monthly_growth(now):
+    """Usuarios nuevos por mes de los últimos GROWTH_MONTHS meses (incluido el actual)"""
+    primero = timezone.localtime(now).date().replace(day=1)
+    meses = [primero]
+    for _ in range(GROWTH_MONTHS - 1):
+        meses.insert(0, (meses[0] - timedelta(days=1)).replace(day=1))
+
+    por_mes = {
+        timezone.localtime(fila['month']).date() if hasattr(fila['month'], 'hour') else fila['month']: fila['users']
+        for fila in User.objects.filter(date_joined__date__gte=meses[0])
+        .annotate(month=TruncMonth('date_joined'))
+        .values('month')
+        .annotate(users=Count('id'))
+        .order_by('month')
+    }
+    return [{'month': mes.strftime('%b %Y'), 'users': por_mes.get(mes, 0)} for mes in meses]
+
+
+def compute_admin_dashboard_stats():
+    """Calcula (sin caché) el contexto de cifras del panel de administración"""
+    now = timezone.now()
+    today = timezone.localdate(now)
+    last_week = today - timedelta(days=7)
+    last_month = today - timedelta(days=30)
+
+    user_stats = _user_stats(today, last_week, last_month)
+    crop_stats = _crop_stats(today, last_week)
+    publication_stats = _publication_stats(today, last_week)
+    pedidos = _order_figures(today, last_week, last_month)
+
+    por_estado = {estado: pedidos[f'estado_{estado}'] for estado, _ in Order.ESTADO_CHOICES}
+    order_stats = {
+        'total_orders': pedidos['total_orders'],
+        'pending_orders': por_estado['pendiente'],
+        'confirmed_orders': por_estado['confirmado'],
+        'shipped_orders': por_estado['enviado'],
+        'completed_orders': por_estado['completado'],
+        'cancelled_orders': por_estado['cancelado'],
+        'orders_today': pedidos['orders_today'],
+        'orders_week': pedidos['orders_week'],
+    }
+    revenue_stats = {
+        'total_revenue': pedidos['total_revenue'],
+        'revenue_today': pedidos['revenue_today'],
+        'revenue_week': pedidos['revenue_week'],
+        'revenue_month': pedidos['revenue_month'],
+    }
+    financial_stats = {
+        'total_revenue': pedidos['total_revenue'],
+        'pending_revenue': pedidos['pending_revenue'],
+        'avg_order_value': (
+            pedidos['total_revenue'] / por_estado['completado'] if por_estado['completado'] else 0
+        ),
+    }
+
+    return {
+        'stats': {
+            'total_users': user_stats['total_users'],
+            'total_crops': crop_stats['total_crops'],
+            'total_publications': publication_stats['total_publications'],
+            'total_orders': order_stats['total_orders'],
+        },
+        'user_stats': user_stats,
+        'crop_stats': crop_stats,
+        'publication_stats': publication_stats,
+        'order_stats': order_stats,
+        'revenue_stats': revenue_stats,
+        'financial_stats': financial_stats,
+        'monthly_growth': json.dumps(_monthly_growth(now)),
+        'order_status_distribution': json.dumps([
+            {'estado': estado, 'count': count} for estado, count in sorted(por_estado.items()) if count
+        ]),
+        'recent_activity': {
+            'recent_users': list(User.objects.order_by('-date_joined')[:5]),
+            'recent_crops': list(Crop.objects.order_by('-created_at')[:5]),
+            'recent_publications': list(Publication.objects.order_by('-created_at')[:5]),
+            'recent_orders': list(Order.objects.order_by('-created_at')[:5]),
+        },
+    }
+
+
+def admin_dashboard_stats():
+    """Cifras del panel, desde la caché si se calcularon hace poco"""
+    stats = cache.get(CACHE_KEY)
+    if stats is None:
+        stats = compute_admin_dashboard_stats()
+        cache.set(CACHE_KEY, stats, _cache_ttl())
+    return stats
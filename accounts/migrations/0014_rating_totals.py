@@ -0,0 +1,70 @@
+# Generated by Django 4.2.24 on 2026-10-18 04:59
+
+from django.db import migrations, models
+
+
+def backfill_rating_totals(apps, schema_editor):
+    from sales.rating_stats import recompute_profile_stats
+
+    recompute_profile_stats(
+        Rating=apps.get_model('sales', 'Rating'),
+        ProducerProfile=apps.get_model('accounts', 'ProducerProfile'),
+        BuyerProfile=apps.get_model('accounts', 'BuyerProfile'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_add_pais_field'),
+        ('sales', '0004_add_qr_tokens'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='buyerprofile',
+            name='suma_calificacion_calidad',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='buyerprofile',
+            name='suma_calificacion_comunicacion',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='buyerprofile',
+            name='suma_calificacion_general',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='buyerprofile',
+            name='suma_calificacion_puntualidad',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='buyerprofile',
+            name='total_calificaciones',
+            field=models.IntegerField(default=0, verbose_name='Total de Calificaciones Recibidas'),
+        ),
+        migrations.AddField(
+            model_name='producerprofile',
+            name='suma_calificacion_calidad',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='producerprofile',
+            name='suma_calificacion_comunicacion',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='producerprofile',
+            name='suma_calificacion_general',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='producerprofile',
+            name='suma_calificacion_puntualidad',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.24 on 2026-10-18 05:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_rating_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='notifications_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
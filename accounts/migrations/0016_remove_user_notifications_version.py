@@ -0,0 +1,18 @@
+# Generated by Django 4.2.24 on 2026-10-18 05:43
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_user_notifications_version'),
+        ('core', '0007_notificationversion'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='user',
+            name='notifications_version',
+        ),
+    ]
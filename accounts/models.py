@@ -71,7 +71,27 @@ class Farm(BaseModel):
             parts.append(self.departamento)
         return ", ".join(parts) if parts else "Ubicación no especificada"
 
-class ProducerProfile(BaseModel):
+class RatingTotalsMixin:
+    """Promedios por dimensión a partir de las sumas y el conteo de calificaciones"""
+
+    def promedio(self, campo):
+        if not self.total_calificaciones:
+            return None
+        return getattr(self, f'suma_{campo}') / self.total_calificaciones
+
+    @property
+    def ratings_stats(self):
+        """Mismas claves que el aggregate que usaba el perfil público"""
+        return {
+            'total_ratings': self.total_calificaciones,
+            'avg_general': self.promedio('calificacion_general'),
+            'avg_comunicacion': self.promedio('calificacion_comunicacion'),
+            'avg_puntualidad': self.promedio('calificacion_puntualidad'),
+            'avg_calidad': self.promedio('calificacion_calidad'),
+        }
+
+
+class ProducerProfile(RatingTotalsMixin, BaseModel):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='producer_profile')
     
     # Ubicación estructurada (TODOS OPCIONALES)
@@ -96,6 +116,11 @@ class ProducerProfile(BaseModel):
     )
     total_calificaciones = models.IntegerField(default=0, verbose_name="Total de Calificaciones Recibidas")
     fecha_primera_venta = models.DateTimeField(null=True, blank=True, verbose_name="Fecha de Primera Venta")
+    # Sumas de cada dimensión de las calificaciones recibidas (ver sales/rating_stats.py)
+    suma_calificacion_general = models.PositiveIntegerField(default=0)
+    suma_calificacion_comunicacion = models.PositiveIntegerField(default=0)
+    suma_calificacion_puntualidad = models.PositiveIntegerField(default=0)
+    suma_calificacion_calidad = models.PositiveIntegerField(default=0)
 
     def save(self, *args, **kwargs):
         # Actualizar location automáticamente para compatibilidad
@@ -128,7 +153,7 @@ class ProducerProfile(BaseModel):
     def __str__(self):
         return self.user.username
 
-class BuyerProfile(BaseModel):
+class BuyerProfile(RatingTotalsMixin, BaseModel):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='buyer_profile')
     company_name = models.CharField(max_length=255, verbose_name="Nombre de la Empresa", blank=True, null=True)
     business_type = models.CharField(max_length=255, verbose_name="Tipo de Negocio", blank=True, null=True)
@@ -142,6 +167,12 @@ class BuyerProfile(BaseModel):
     gastos_totales = models.DecimalField(max_digits=12, decimal_places=2, default=0, 
                                        verbose_name="Gastos Totales")
     fecha_primera_compra = models.DateTimeField(null=True, blank=True, verbose_name="Fecha de Primera Compra")
+    total_calificaciones = models.IntegerField(default=0, verbose_name="Total de Calificaciones Recibidas")
+    # Sumas de cada dimensión de las calificaciones recibidas (ver sales/rating_stats.py)
+    suma_calificacion_general = models.PositiveIntegerField(default=0)
+    suma_calificacion_comunicacion = models.PositiveIntegerField(default=0)
+    suma_calificacion_puntualidad = models.PositiveIntegerField(default=0)
+    suma_calificacion_calidad = models.PositiveIntegerField(default=0)
 
     @property
     def ciudad_departamento(self):
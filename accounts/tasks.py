@@ -0,0 +1,17 @@
+"""
+Tareas en segundo plano de cuentas (ver core/tasks.py).
+"""
+from core.tasks import task
+from .models import User
+
+
+@task(max_attempts=3)
+def descargar_imagen_google(user_id, photo_url):
+    """Descarga la foto de perfil de Google del usuario fuera del request de login/registro"""
+    from .forms import download_google_profile_image
+
+    user = User.objects.filter(pk=user_id).first()
+    if user is None:
+        return
+    if not download_google_profile_image(photo_url, user):
+        raise RuntimeError(f'No se pudo descargar la imagen de Google de {user.email}')
@@ -98,21 +98,9 @@ def google_auth_callback(request):
                     if photo_url:
                         print(f"[GOOGLE LOGIN] ✅ Descargando imagen de Google...")
                         logger.info(f"✅ Photo URL disponible - Descargando imagen de Google...")
-                        from accounts.forms import download_google_profile_image
-                        try:
-                            result = download_google_profile_image(photo_url, user)
-                            if result:
-                                print(f"[GOOGLE LOGIN] ✅ Imagen descargada exitosamente")
-                                logger.info(f"✅ Imagen de perfil de Google descargada exitosamente para usuario: {user.email}")
-                                # Recargar usuario para asegurar que la imagen esté disponible
-                                user.refresh_from_db()
-                                print(f"[GOOGLE LOGIN] Usuario recargado. Tiene imagen ahora: {bool(user.profile_image)}")
-                            else:
-                                print(f"[GOOGLE LOGIN] ❌ La función retornó False")
-                                logger.error(f"❌ La función download_google_profile_image retornó False para usuario: {user.email}")
-                        except Exception as e:
-                            print(f"[GOOGLE LOGIN] ❌ EXCEPCIÓN: {str(e)}")
-                            logger.error(f"❌ EXCEPCIÓN al actualizar imagen de perfil de Google para usuario {user.email}: {str(e)}", exc_info=True)
+                        # La descarga corre en segundo plano para no bloquear el login
+                        from accounts.tasks import descargar_imagen_google
+                        descargar_imagen_google.delay(user.pk, photo_url)
                     else:
                         print(f"[GOOGLE LOGIN] ⚠️ No hay photo_url disponible")
                         logger.warning(f"⚠️ No hay photo_url disponible de Google para usuario: {user.email}")
@@ -270,30 +258,17 @@ def register(request):
             request.session.save()
             print(f"[REGISTER] Sesión guardada después del login. Session key: {request.session.session_key}")
             
-            # Descargar la imagen de Google DESPUÉS del login (pero no bloquear el redirect)
+            # Descargar la imagen de Google en segundo plano (sin bloquear el redirect)
             if google_photo_url:
                 print(f"[REGISTER] ✅ Photo URL disponible: {google_photo_url}")
                 logger.info(f"Descargando imagen de Google después del login: {google_photo_url}")
-                try:
-                    from accounts.forms import download_google_profile_image
-                    print(f"[REGISTER] Llamando a download_google_profile_image...")
-                    # Descargar la imagen
-                    result = download_google_profile_image(google_photo_url, user)
-                    if result:
-                        print(f"[REGISTER] ✅ Imagen descargada exitosamente")
-                        logger.info(f"Imagen descargada exitosamente después del registro")
-                    else:
-                        print(f"[REGISTER] ❌ La función retornó False")
-                        logger.error(f"La función download_google_profile_image retornó False")
-                except Exception as e:
-                    print(f"[REGISTER] ❌ Error descargando imagen: {e}")
-                    logger.error(f"Error descargando imagen después del registro: {e}", exc_info=True)
+                from accounts.tasks import descargar_imagen_google
+                descargar_imagen_google.delay(user.pk, google_photo_url)
             else:
                 print(f"[REGISTER] ⚠️ No hay google_photo_url disponible")
                 logger.warning(f"No hay google_photo_url disponible para descargar imagen")
             
             # CRÍTICO: Guardar la sesión DESPUÉS de todo para asegurar que persista
-            # Esto debe hacerse después de la descarga de la imagen
             request.session.modified = True
             request.session.save()
             
@@ -5,13 +5,11 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import user_passes_test
 from django.contrib.auth import get_user_model
 from django.contrib import messages
-from django.db.models import Q, Count, Sum, Avg
+from django.db.models import Q, Count
 from django.core.paginator import Paginator
 from django.http import JsonResponse
 from django.utils import timezone
 from datetime import datetime, timedelta
-from django.db.models.functions import TruncMonth
-import json
 from inventory.models import Crop
 from inventory.forms import AdminCropForm
 from marketplace.models import Publication
@@ -19,6 +17,7 @@ from marketplace.forms import AdminPublicationForm
 from sales.models import Order
 from sales.models import Conversation, Message
 from accounts.models import AdminAction
+from accounts.admin_stats import admin_dashboard_stats
 from core.models import Notification, Farm
 from core.forms import AdminFarmForm
 
@@ -30,150 +29,8 @@ def is_admin(user):
 
 @user_passes_test(is_admin)
 def admin_dashboard(request):
-    """Dashboard principal de administración"""
-    from django.utils import timezone
-    from datetime import timedelta, datetime
-    from django.db.models import Sum, Avg, Q
-    
-    # Fechas para comparaciones
-    now = timezone.now()
-    today = now.date()
-    yesterday = today - timedelta(days=1)
-    last_week = today - timedelta(days=7)
-    last_month = today - timedelta(days=30)
-    
-    # Estadísticas principales
-    stats = {
-        'total_users': User.objects.count(),
-        'total_crops': Crop.objects.count(),
-        'total_publications': Publication.objects.count(),
-        'total_orders': Order.objects.count(),
-    }
-    
-    # Estadísticas de usuarios
-    user_stats = {
-        'active_users': User.objects.filter(is_active=True).count(),
-        'inactive_users': User.objects.filter(is_active=False).count(),
-        'admin_users': User.objects.filter(role='Admin').count(),
-        'producer_users': User.objects.filter(role='Productor').count(),
-        'buyer_users': User.objects.filter(role='Comprador').count(),
-        'new_users_today': User.objects.filter(date_joined__date=today).count(),
-        'new_users_week': User.objects.filter(date_joined__date__gte=last_week).count(),
-        'new_users_month': User.objects.filter(date_joined__date__gte=last_month).count(),
-    }
-    
-    # Estadísticas de cultivos
-    crop_stats = {
-        'total_crops': Crop.objects.count(),
-        'crops_en_crecimiento': Crop.objects.filter(estado='en_crecimiento').count(),
-        'crops_listo_para_cosechar': Crop.objects.filter(estado='listo_para_cosechar').count(),
-        'crops_cosechado': Crop.objects.filter(estado='cosechado').count(),
-        'crops_sembrado': Crop.objects.filter(estado='sembrado').count(),
-        'crops_today': Crop.objects.filter(created_at__date=today).count(),
-        'crops_week': Crop.objects.filter(created_at__date__gte=last_week).count(),
-    }
-    
-    # Estadísticas de publicaciones
-    publication_stats = {
-        'total_publications': Publication.objects.count(),
-        'active_publications': Publication.objects.filter(estado='Activa').count(),
-        'paused_publications': Publication.objects.filter(estado='Pausada').count(),
-        'sold_out_publications': Publication.objects.filter(estado='Agotada').count(),
-        'publications_today': Publication.objects.filter(created_at__date=today).count(),
-        'publications_week': Publication.objects.filter(created_at__date__gte=last_week).count(),
-    }
-    
-    # Estadísticas de pedidos
-    order_stats = {
-        'total_orders': Order.objects.count(),
-        'pending_orders': Order.objects.filter(estado='pendiente').count(),
-        'confirmed_orders': Order.objects.filter(estado='confirmado').count(),
-        'shipped_orders': Order.objects.filter(estado='enviado').count(),
-        'completed_orders': Order.objects.filter(estado='completado').count(),
-        'cancelled_orders': Order.objects.filter(estado='cancelado').count(),
-        'orders_today': Order.objects.filter(created_at__date=today).count(),
-        'orders_week': Order.objects.filter(created_at__date__gte=last_week).count(),
-    }
-    
-    # Ingresos
-    revenue_stats = {
-        'total_revenue': Order.objects.filter(estado='completado').aggregate(
-            total=Sum('precio_total')
-            )['total'] or 0,
-        'revenue_today': Order.objects.filter(
-            estado='completado',
-            created_at__date=today
-        ).aggregate(total=Sum('precio_total'))['total'] or 0,
-        'revenue_week': Order.objects.filter(
-            estado='completado',
-            created_at__date__gte=last_week
-        ).aggregate(total=Sum('precio_total'))['total'] or 0,
-        'revenue_month': Order.objects.filter(
-            estado='completado',
-            created_at__date__gte=last_month
-        ).aggregate(total=Sum('precio_total'))['total'] or 0,
-        }
-    
-    # Datos para gráficas
-    from django.db.models.functions import Extract
-    
-    # Crecimiento mensual de usuarios (últimos 6 meses)
-    monthly_growth = []
-    for i in range(6):
-        month_date = now - timedelta(days=30*i)
-        month_start = month_date.replace(day=1)
-        month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-        
-        users_count = User.objects.filter(
-            date_joined__date__gte=month_start,
-            date_joined__date__lte=month_end
-        ).count()
-        
-        monthly_growth.append({
-            'month': month_start.strftime('%b %Y'),
-            'users': users_count
-        })
-    
-    monthly_growth.reverse()  # Ordenar cronológicamente
-    
-    # Distribución de estados de pedidos
-    order_status_distribution = Order.objects.values('estado').annotate(
-        count=Count('id')
-    ).order_by('estado')
-    
-    # Actividad reciente
-    recent_activity = {
-        'recent_users': User.objects.order_by('-date_joined')[:5],
-        'recent_crops': Crop.objects.order_by('-created_at')[:5],
-        'recent_publications': Publication.objects.order_by('-created_at')[:5],
-        'recent_orders': Order.objects.order_by('-created_at')[:5],
-    }
-    
-    # Estadísticas financieras
-    financial_stats = {
-        'total_revenue': revenue_stats['total_revenue'],
-        'pending_revenue': Order.objects.filter(estado__in=['pendiente', 'confirmado']).aggregate(
-            total=Sum('precio_total')
-        )['total'] or 0,
-        'avg_order_value': Order.objects.filter(estado='completado').aggregate(
-            avg=Avg('precio_total')
-        )['avg'] or 0,
-    }
-    
-    context = {
-        'stats': stats,
-        'user_stats': user_stats,
-        'crop_stats': crop_stats,
-        'publication_stats': publication_stats,
-        'order_stats': order_stats,
-        'revenue_stats': revenue_stats,
-        'financial_stats': financial_stats,
-        'monthly_growth': json.dumps(monthly_growth),
-        'order_status_distribution': json.dumps(list(order_status_distribution)),
-        'recent_activity': recent_activity,
-    }
-    
-    return render(request, 'accounts/admin_dashboard_tailadmin.html', context)
+    """Dashboard principal de administración (cifras de accounts/admin_stats.py)"""
+    return render(request, 'accounts/admin_dashboard_tailadmin.html', admin_dashboard_stats())
 
 @user_passes_test(is_admin)
 def admin_user_list(request):
@@ -248,7 +105,7 @@ def admin_crop_list(request):
 @user_passes_test(is_admin)
 def admin_order_list(request):
     """Lista de pedidos"""
-    orders = Order.objects.select_related('comprador', 'publicacion', 'publicacion__cultivo', 'publicacion__cultivo__productor').order_by('-created_at')
+    orders = Order.objects.select_related('comprador', 'publicacion', 'publicacion__cultivo', 'vendedor').order_by('-created_at')
     
     # Filtros
     status_filter = request.GET.get('status')
@@ -260,7 +117,7 @@ def admin_order_list(request):
         orders = orders.filter(
             Q(comprador__username__icontains=search_query) |
             Q(publicacion__cultivo__nombre__icontains=search_query) |
-            Q(publicacion__cultivo__productor__username__icontains=search_query)
+            Q(vendedor__username__icontains=search_query)
         )
     
     # Paginación
@@ -289,7 +146,7 @@ def admin_order_list(request):
 @user_passes_test(is_admin)
 def admin_publication_list(request):
     """Lista de publicaciones"""
-    publications = Publication.objects.select_related('cultivo', 'finca').order_by('-created_at')
+    publications = Publication.objects.select_related('cultivo', 'finca', 'productor').order_by('-created_at')
     
     # Filtros
     status_filter = request.GET.get('status')
@@ -300,7 +157,7 @@ def admin_publication_list(request):
     if search_query:
         publications = publications.filter(
             Q(descripcion__icontains=search_query) |
-            Q(cultivo__productor__username__icontains=search_query) |
+            Q(productor__username__icontains=search_query) |
             Q(cultivo__nombre__icontains=search_query)
         )
     
@@ -351,7 +208,7 @@ def admin_user_list_preview(request):
 
 def admin_order_list_preview(request):
     """Vista de preview de pedidos sin autenticación"""
-    orders = Order.objects.select_related('comprador', 'publicacion', 'publicacion__cultivo', 'publicacion__cultivo__productor').order_by('-created_at')
+    orders = Order.objects.select_related('comprador', 'publicacion', 'publicacion__cultivo', 'vendedor').order_by('-created_at')
     
     # Filtros
     status_filter = request.GET.get('status')
@@ -363,7 +220,7 @@ def admin_order_list_preview(request):
         orders = orders.filter(
             Q(comprador__username__icontains=search_query) |
             Q(publicacion__cultivo__nombre__icontains=search_query) |
-            Q(publicacion__cultivo__productor__username__icontains=search_query)
+            Q(vendedor__username__icontains=search_query)
         )
     
     # Paginación
@@ -411,7 +268,7 @@ def admin_crop_list_preview(request):
 
 def admin_publication_list_preview(request):
     """Vista de preview de publicaciones sin autenticación"""
-    publications = Publication.objects.select_related('cultivo', 'finca').order_by('-created_at')
+    publications = Publication.objects.select_related('cultivo', 'finca', 'productor').order_by('-created_at')
     
     # Filtros
     status_filter = request.GET.get('status')
@@ -422,7 +279,7 @@ def admin_publication_list_preview(request):
     if search_query:
         publications = publications.filter(
             Q(descripcion__icontains=search_query) |
-            Q(cultivo__productor__username__icontains=search_query) |
+            Q(productor__username__icontains=search_query) |
             Q(cultivo__nombre__icontains=search_query)
         )
     
@@ -441,133 +298,7 @@ def admin_publication_list_preview(request):
 
 def admin_dashboard_preview(request):
     """Vista de preview del dashboard sin autenticación"""
-    from django.utils import timezone
-    from datetime import timedelta, datetime
-    from django.db.models import Sum, Avg, Q, Count
-    from django.db.models.functions import Extract
-    
-    # Fechas para comparaciones
-    now = timezone.now()
-    today = now.date()
-    yesterday = today - timedelta(days=1)
-    last_week = today - timedelta(days=7)
-    last_month = today - timedelta(days=30)
-    
-    # Estadísticas principales
-    stats = {
-        'total_users': User.objects.count(),
-        'total_crops': Crop.objects.count(),
-        'total_publications': Publication.objects.count(),
-        'total_orders': Order.objects.count(),
-    }
-    
-    # Estadísticas de usuarios
-    user_stats = {
-        'active_users': User.objects.filter(is_active=True).count(),
-        'inactive_users': User.objects.filter(is_active=False).count(),
-        'admin_users': User.objects.filter(role='Admin').count(),
-        'producer_users': User.objects.filter(role='Productor').count(),
-        'buyer_users': User.objects.filter(role='Comprador').count(),
-        'new_users_today': User.objects.filter(date_joined__date=today).count(),
-        'new_users_week': User.objects.filter(date_joined__date__gte=last_week).count(),
-        'new_users_month': User.objects.filter(date_joined__date__gte=last_month).count(),
-    }
-    
-    # Estadísticas de cultivos
-    crop_stats = {
-        'total_crops': Crop.objects.count(),
-        'crops_en_crecimiento': Crop.objects.filter(estado='en_crecimiento').count(),
-        'crops_listo_para_cosechar': Crop.objects.filter(estado='listo_para_cosechar').count(),
-        'crops_cosechado': Crop.objects.filter(estado='cosechado').count(),
-        'crops_sembrado': Crop.objects.filter(estado='sembrado').count(),
-        'crops_today': Crop.objects.filter(created_at__date=today).count(),
-        'crops_week': Crop.objects.filter(created_at__date__gte=last_week).count(),
-    }
-    
-    # Estadísticas de publicaciones
-    publication_stats = {
-        'total_publications': Publication.objects.count(),
-        'active_publications': Publication.objects.filter(estado='Activa').count(),
-        'paused_publications': Publication.objects.filter(estado='Pausada').count(),
-        'sold_out_publications': Publication.objects.filter(estado='Agotada').count(),
-        'publications_today': Publication.objects.filter(created_at__date=today).count(),
-        'publications_week': Publication.objects.filter(created_at__date__gte=last_week).count(),
-    }
-    
-    # Estadísticas de pedidos
-    order_stats = {
-        'total_orders': Order.objects.count(),
-        'pending_orders': Order.objects.filter(estado='pendiente').count(),
-        'confirmed_orders': Order.objects.filter(estado='confirmado').count(),
-        'shipped_orders': Order.objects.filter(estado='enviado').count(),
-        'completed_orders': Order.objects.filter(estado='completado').count(),
-        'cancelled_orders': Order.objects.filter(estado='cancelado').count(),
-        'orders_today': Order.objects.filter(created_at__date=today).count(),
-        'orders_week': Order.objects.filter(created_at__date__gte=last_week).count(),
-    }
-    
-    # Ingresos
-    revenue_stats = {
-        'total_revenue': Order.objects.filter(estado='completado').aggregate(
-            total=Sum('precio_total')
-            )['total'] or 0,
-        'revenue_today': Order.objects.filter(
-            estado='completado',
-            created_at__date=today
-        ).aggregate(total=Sum('precio_total'))['total'] or 0,
-        'revenue_week': Order.objects.filter(
-            estado='completado',
-            created_at__date__gte=last_week
-        ).aggregate(total=Sum('precio_total'))['total'] or 0,
-        'revenue_month': Order.objects.filter(
-            estado='completado',
-            created_at__date__gte=last_month
-        ).aggregate(total=Sum('precio_total'))['total'] or 0,
-        }
-    
-    # Actividad reciente
-    recent_activity = {
-        'recent_users': User.objects.order_by('-date_joined')[:5],
-        'recent_crops': Crop.objects.order_by('-created_at')[:5],
-        'recent_publications': Publication.objects.order_by('-created_at')[:5],
-        'recent_orders': Order.objects.order_by('-created_at')[:5],
-    }
-    
-    # Datos para gráficos - Crecimiento de usuarios (últimos 6 meses)
-    six_months_ago = now - timedelta(days=180)
-    monthly_users = User.objects.filter(date_joined__gte=six_months_ago).annotate(
-        month=Extract('date_joined', 'month')
-    ).values('month').annotate(count=Count('id')).order_by('month')
-    
-    monthly_growth = []
-    months = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun']
-    month_numbers = [1, 2, 3, 4, 5, 6]
-    
-    for i, month in enumerate(months):
-        month_num = month_numbers[i]
-        count = next((item['count'] for item in monthly_users if item['month'] == month_num), 0)
-        monthly_growth.append({'month': month, 'users': count})
-    
-    # Distribución de estados de pedidos
-    order_status_distribution = []
-    for status, _ in Order.ESTADO_CHOICES:
-        count = Order.objects.filter(estado=status).count()
-        if count > 0:
-            order_status_distribution.append({'estado': status, 'count': count})
-    
-    context = {
-        'stats': stats,
-        'user_stats': user_stats,
-        'crop_stats': crop_stats,
-        'publication_stats': publication_stats,
-        'order_stats': order_stats,
-        'revenue_stats': revenue_stats,
-        'recent_activity': recent_activity,
-        'monthly_growth': monthly_growth,
-        'order_status_distribution': order_status_distribution,
-    }
-    
-    return render(request, 'accounts/admin_dashboard_tailadmin.html', context)
+    return render(request, 'accounts/admin_dashboard_tailadmin.html', admin_dashboard_stats())
 
 # Funciones auxiliares para compatibilidad
 
@@ -1096,7 +827,7 @@ def admin_publication_create(request):
                 }
             )
             
-            messages.success(request, f'Publicación "{publication.cultivo.nombre}" creada exitosamente para {publication.cultivo.productor.get_full_name() or publication.cultivo.productor.username}.')
+            messages.success(request, f'Publicación "{publication.cultivo.nombre}" creada exitosamente para {publication.productor.get_full_name() or publication.productor.username}.')
             return redirect('admin_publication_list')
         else:
             messages.error(request, 'Por favor corrige los errores en el formulario.')
@@ -1171,7 +902,7 @@ def admin_publication_delete(request, pk):
             changes={
                 'publication_id': publication.id,
                 'cultivo': publication.cultivo.nombre,
-                'productor': publication.cultivo.productor.username,
+                'productor': publication.productor.username,
             }
         )
         
@@ -1546,7 +1277,7 @@ def admin_conversation_detail(request, pk):
     seller = None
     
     if conversation.publication:
-        seller = conversation.publication.cultivo.productor
+        seller = conversation.publication.productor
         buyer = participants.exclude(id=seller.id).first()
     else:
         # Si no hay publicación asociada, tomar los dos participantes
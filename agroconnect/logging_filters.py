@@ -13,7 +13,7 @@ class ExcludeNotificationsFilter(logging.Filter):
         # Check if this is a request log record
         if hasattr(record, 'getMessage'):
             message = record.getMessage()
-            # Exclude notification polling requests
-            if '/core/notifications/list/' in message:
+            # Exclude notification polling and long-poll requests
+            if '/core/notifications/list/' in message or '/core/notifications/wait/' in message:
                 return False
         return True
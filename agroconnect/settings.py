@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.sites',
+    'django.contrib.postgres',
     'cloudinary_storage',
     'django.contrib.staticfiles',
     'cloudinary',
@@ -104,6 +105,35 @@ DATABASES = {
 }
 
 
+# Cache
+# Sin Redis: memoria local por proceso (por defecto) o archivos compartidos
+# entre procesos con CACHE_BACKEND=file (directorio en CACHE_LOCATION)
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+
+if CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / 'cache')),
+            'TIMEOUT': 300,
+            'OPTIONS': {
+                'MAX_ENTRIES': 10000,
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'agroconnect',
+            'TIMEOUT': 300,
+            'OPTIONS': {
+                'MAX_ENTRIES': 5000,
+            },
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -224,8 +254,40 @@ SESSION_COOKIE_SAMESITE = 'Lax'  # Protección CSRF
 if not DEBUG:
     SESSION_ENGINE = 'django.contrib.sessions.backends.db'
 
+# Cola de tareas en segundo plano (core/tasks.py, comando run_workers)
+# Segundos tras los que una tarea 'running' de un worker caído vuelve a la cola
+TASK_LOCK_TIMEOUT = config('TASK_LOCK_TIMEOUT', default=15 * 60, cast=int)
+
+# Rankings (sales/leaderboard.py)
+# Calificaciones "virtuales" con el promedio general que recibe cada vendedor
+LEADERBOARD_PRIOR_WEIGHT = config('LEADERBOARD_PRIOR_WEIGHT', default=5, cast=int)
+# Segundos entre una venta o calificación y la reconstrucción de los rankings
+LEADERBOARD_REFRESH_DELAY = config('LEADERBOARD_REFRESH_DELAY', default=60, cast=int)
+
+# Segundos que se reutilizan las cifras del panel de administración (accounts/admin_stats.py)
+ADMIN_DASHBOARD_CACHE_TTL = config('ADMIN_DASHBOARD_CACHE_TTL', default=60, cast=int)
+
+# Chat en vivo por Server-Sent Events (sales/chat.py, requiere servir por ASGI)
+# Segundos entre consultas de respaldo de cada stream (mensajes de otros workers)
+CHAT_STREAM_CHECK_INTERVAL = config('CHAT_STREAM_CHECK_INTERVAL', default=15, cast=int)
+# Segundos que dura abierto un stream antes de que el navegador se reconecte
+CHAT_STREAM_MAX_AGE = config('CHAT_STREAM_MAX_AGE', default=300, cast=int)
+
+# Long-poll de notificaciones (core/notifications.py, solo ASGI): espera máxima
+# y cada cuánto se relee la versión del usuario (una consulta por clave primaria)
+NOTIFICATIONS_LONG_POLL_TIMEOUT = config('NOTIFICATIONS_LONG_POLL_TIMEOUT', default=25, cast=int)
+NOTIFICATIONS_LONG_POLL_STEP = config('NOTIFICATIONS_LONG_POLL_STEP', default=5, cast=float)
+
 # MercadoPago Configuration
 MERCADOPAGO_ACCESS_TOKEN = config('MERCADOPAGO_ACCESS_TOKEN', default='')
+# URL base de la API (vacío = la oficial); permite apuntar a un servidor de pruebas
+MERCADOPAGO_API_BASE_URL = config('MERCADOPAGO_API_BASE_URL', default='')
+# Tiempo máximo en segundos por llamada a la API
+MERCADOPAGO_TIMEOUT = config('MERCADOPAGO_TIMEOUT', default=10.0, cast=float)
+# Preferencias creadas en paralelo en el resumen del carrito
+MERCADOPAGO_PREFERENCE_WORKERS = config('MERCADOPAGO_PREFERENCE_WORKERS', default=4, cast=int)
+# Segundos durante los que se reutiliza una preferencia ya creada
+MERCADOPAGO_PREFERENCE_TTL = config('MERCADOPAGO_PREFERENCE_TTL', default=6 * 60 * 60, cast=int)
 
 # Firebase Configuration
 FIREBASE_API_KEY = config('FIREBASE_API_KEY', default='')
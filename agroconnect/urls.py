@@ -89,6 +89,7 @@ urlpatterns = [
     path('api/conversations/', sales_views.conversations_list_api, name='conversations_list_api'),
     path('conversation/<int:conversation_id>/', sales_views.conversation_detail_simple, name='conversation_detail'),
     path('conversation/<int:conversation_id>/messages/', sales_views.get_new_messages, name='get_new_messages'),
+    path('conversation/<int:conversation_id>/stream/', sales_views.conversation_stream, name='conversation_stream'),
     
     # Dashboards
     path('dashboard/producer/', inventory_views.producer_dashboard, name='producer_dashboard'),
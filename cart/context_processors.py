@@ -1,7 +1,7 @@
-from .models import Cart
+from .summary import CartSummary
 
 def cart(request):
     if request.user.is_authenticated:
-        cart_instance, created = Cart.objects.get_or_create(user=request.user)
-        return {'cart': cart_instance}
+        # Perezoso: solo consulta si la plantilla lo usa
+        return {'cart_summary': CartSummary(request.user.pk)}
     return {}
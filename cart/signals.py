@@ -1,9 +1,38 @@
-from django.db.models.signals import post_save
+from functools import lru_cache
+from django.db.models.signals import post_save, post_delete
 from django.conf import settings
 from django.dispatch import receiver
-from .models import Cart
+from marketplace.models import Publication
+from .models import Cart, CartItem
+from .summary import invalidate_cart_summaries
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_user_cart(sender, instance, created, **kwargs):
     if created:
         Cart.objects.create(user=instance)
+
+
+@lru_cache(maxsize=4096)
+def _cart_user_id(cart_id):
+    # Un carrito pertenece siempre al mismo usuario: basta consultarlo una vez
+    return Cart.objects.filter(pk=cart_id).values_list('user_id', flat=True).first()
+
+
+@receiver(post_save, sender=CartItem)
+@receiver(post_delete, sender=CartItem)
+def invalidate_cart_summary(sender, instance, **kwargs):
+    """El resumen del carrito cambia con cada item agregado, editado o eliminado"""
+    user_id = _cart_user_id(instance.cart_id)
+    if user_id is not None:
+        invalidate_cart_summaries([user_id])
+
+
+@receiver(post_save, sender=Publication)
+def invalidate_cart_summaries_for_publication(sender, instance, created, raw=False, **kwargs):
+    """El total del carrito depende del precio de la publicación"""
+    if raw or created:
+        return
+    user_ids = CartItem.objects.filter(
+        publication=instance
+    ).values_list('cart__user_id', flat=True).distinct()
+    invalidate_cart_summaries(list(user_ids))
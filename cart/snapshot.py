@@ -0,0 +1,106 @@
+"""
+Precios del carrito calculados en una sola pasada.
+
+CartSnapshot carga los items con su publicación y cultivo en una consulta y
+calcula para cada línea precio unitario, subtotal, mínimo, disponible y error
+de validación, junto con los totales del carrito. Las plantillas y la creación
+de pedidos leen el snapshot en lugar de las propiedades de Cart/CartItem, que
+repetían las mismas conversiones y consultas.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from core import units
+from .models import CartItem
+
+
+class CartLine:
+    """Un item del carrito con sus valores ya calculados (Decimal exacto)"""
+
+    def __init__(self, item):
+        publication = item.publication
+        unidad_venta = publication.unidad_medida
+
+        self.item = item
+        self.id = item.id
+        self.publication = publication
+        self.unidad_compra = item.unidad_compra
+        self.quantity = Decimal(str(item.quantity))
+
+        # Precio por unidad de compra (si no es convertible, el precio original)
+        precio = units.convertir_precio(publication.precio_por_unidad, unidad_venta, item.unidad_compra)
+        self.precio_unitario = precio if precio is not None else publication.precio_por_unidad
+        # Subtotal desde el precio exacto, redondeado una sola vez
+        exacto = units.convertir_precio(publication.precio_por_unidad, unidad_venta, item.unidad_compra, None)
+        if exacto is None:
+            exacto = publication.precio_por_unidad
+        self.precio_total = (exacto * self.quantity).quantize(units.PRECIO_DECIMALES, rounding=ROUND_HALF_UP)
+
+        # Mínimo y disponible expresados en la unidad de compra
+        minimo = units.convertir(publication.cantidad_minima, unidad_venta, item.unidad_compra)
+        # Si no es convertible, al menos 1
+        self.minimo = minimo if minimo is not None else Decimal('1')
+        disponible = units.convertir(publication.cantidad_disponible, unidad_venta, item.unidad_compra)
+        self.disponible = disponible if disponible is not None else Decimal(str(publication.cantidad_disponible))
+        self.cantidad_en_unidad_vendedor = units.convertir(self.quantity, item.unidad_compra, unidad_venta)
+
+        self.is_below_minimum = self.quantity < self.minimo
+        self.is_over_available = self.quantity > self.disponible
+        if self.is_over_available:
+            self.validation_error = f"Disponible: {self.disponible:.1f} {self.unidad_compra}"
+        elif self.is_below_minimum:
+            self.validation_error = f"Mínimo: {self.minimo:.1f} {self.unidad_compra}"
+        else:
+            self.validation_error = ""
+
+    @property
+    def hay_disponibilidad(self):
+        """True si la cantidad, en la unidad del vendedor, cabe en el stock"""
+        return (
+            self.cantidad_en_unidad_vendedor is not None and
+            self.cantidad_en_unidad_vendedor <= self.publication.cantidad_disponible
+        )
+
+
+class CartSnapshot:
+    """Líneas y totales de un carrito, calculados una vez"""
+
+    def __init__(self, items):
+        self.lines = [CartLine(item) for item in items]
+        self.item_count = len(self.lines)
+
+        total = Decimal('0')
+        totals_by_unit = {}
+        self.has_invalid_items = False
+        for line in self.lines:
+            total += line.precio_total
+            totals_by_unit[line.unidad_compra] = totals_by_unit.get(line.unidad_compra, Decimal('0')) + line.quantity
+            if line.validation_error:
+                self.has_invalid_items = True
+        self.total = total
+        self.totals_by_unit = {
+            u: q.quantize(Decimal('0.1'), rounding=ROUND_HALF_UP) for u, q in totals_by_unit.items()
+        }
+        self.totals_by_unit_items = sorted(self.totals_by_unit.items(), key=lambda x: x[0])
+
+    @classmethod
+    def for_cart(cls, cart):
+        return cls(cls.items_queryset().filter(cart=cart))
+
+    @classmethod
+    def for_user(cls, user_id):
+        return cls(cls.items_queryset().filter(cart__user_id=user_id))
+
+    @staticmethod
+    def items_queryset():
+        return CartItem.objects.select_related(
+            'publication__cultivo__finca', 'publication__productor'
+        ).order_by('id')
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    def __len__(self):
+        return self.item_count
+
+    def __bool__(self):
+        return self.item_count > 0
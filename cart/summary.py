@@ -0,0 +1,61 @@
+"""
+Resumen del carrito (cantidad de productos y total) para el encabezado.
+
+El resumen se guarda en la caché por usuario y se invalida desde las señales
+de CartItem y Publication (ver cart.signals). CartSummary es perezoso: solo
+consulta la caché, y la base de datos si hace falta, cuando una plantilla lee
+uno de sus atributos. Nunca crea el carrito.
+"""
+from django.core.cache import cache
+
+CART_SUMMARY_TIMEOUT = 60 * 60
+
+
+def _summary_key(user_id):
+    return f'cart:resumen:{user_id}'
+
+
+def get_cart_summary(user_id):
+    """Diccionario {'item_count', 'total'} del carrito del usuario"""
+    from .snapshot import CartSnapshot
+
+    resumen = cache.get(_summary_key(user_id))
+    if resumen is None:
+        snapshot = CartSnapshot.for_user(user_id)
+        resumen = {
+            'item_count': snapshot.item_count,
+            'total': snapshot.total,
+        }
+        cache.set(_summary_key(user_id), resumen, CART_SUMMARY_TIMEOUT)
+    return resumen
+
+
+def invalidate_cart_summaries(user_ids):
+    cache.delete_many([_summary_key(user_id) for user_id in user_ids])
+
+
+class CartSummary:
+    """Resumen del carrito que se carga la primera vez que se lee"""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self._resumen = None
+
+    def _load(self):
+        if self._resumen is None:
+            self._resumen = get_cart_summary(self.user_id)
+        return self._resumen
+
+    @property
+    def item_count(self):
+        return self._load()['item_count']
+
+    @property
+    def total(self):
+        return self._load()['total']
+
+    def __len__(self):
+        return self.item_count
+
+    def __bool__(self):
+        return self.item_count > 0
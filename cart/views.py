@@ -1,7 +1,7 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST
-from marketplace.models import Publication
+from marketplace.models import Publication, prefetch_images
 from .models import Cart, CartItem
 from django.http import HttpResponseRedirect
 from django.contrib import messages
@@ -11,12 +11,14 @@ from django.contrib import messages
 @login_required
 def cart_detail(request):
     cart, created = Cart.objects.get_or_create(user=request.user)
-    return render(request, 'cart/cart_detail.html', {'cart': cart})
+    snapshot = cart.snapshot
+    prefetch_images([line.publication for line in snapshot])
+    return render(request, 'cart/cart_detail.html', {'cart': cart, 'snapshot': snapshot})
 
 @login_required
 @require_POST
 def add_to_cart(request, publication_id):
-    cart = get_object_or_404(Cart, user=request.user)
+    cart, created = Cart.objects.get_or_create(user=request.user)
     publication = get_object_or_404(Publication, id=publication_id)
     
     try:
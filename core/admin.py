@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Notification
+from django.utils import timezone
+from .models import Notification, Task
 
 
 @admin.register(Notification)
@@ -7,3 +8,19 @@ class NotificationAdmin(admin.ModelAdmin):
     list_display = ('id', 'title', 'recipient', 'category', 'is_read', 'created_at')
     list_filter = ('category', 'is_read', 'created_at')
     search_fields = ('title', 'message', 'recipient__username', 'recipient__email')
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'priority', 'attempts', 'max_attempts', 'run_at', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'last_error')
+    readonly_fields = ('locked_by', 'locked_at', 'started_at', 'finished_at', 'last_error')
+    actions = ['retry_tasks']
+
+    @admin.action(description='Reintentar tareas seleccionadas')
+    def retry_tasks(self, request, queryset):
+        updated = queryset.exclude(status='running').update(
+            status='pending', attempts=0, run_at=timezone.now(), locked_by='',
+        )
+        self.message_user(request, f'{updated} tarea(s) reencoladas.')
@@ -48,6 +48,10 @@ class EmailService:
         else:
             logger.warning("RESEND_API_KEY not configured. Email functionality will be disabled.")
     
+    @property
+    def is_configured(self):
+        return bool(self.api_key and self.api_key.strip())
+    
     def send_password_reset_email(self, user_email, reset_url, user_name=None, recovery_code=None):
         """
         Envía correo de recuperación de contraseña
@@ -301,3 +305,15 @@ class EmailService:
 
 # Instancia global del servicio
 email_service = EmailService()
+
+
+class EmailSendError(Exception):
+    """Falla de envío; dentro de una tarea en segundo plano provoca el reintento"""
+
+
+def raise_on_failure(resultado):
+    """Convierte el (False, error) que retornan los métodos de EmailService en excepción"""
+    ok, detalle = resultado
+    if not ok:
+        raise EmailSendError(detalle)
+    return detalle
@@ -0,0 +1,109 @@
+"""
+Simula un minuto de polling de notifications_list con N usuarios conectados
+(cada uno consulta cada --intervalo segundos) y compara las consultas a la base
+de datos del endpoint sin versión (la lista completa en cada poll) y con la
+versión de NotificationVersion (core/notifications.py).
+
+Llama a la vista directamente con RequestFactory. Los usuarios se recargan en
+cada vuelta, como haría el middleware de autenticación, y esa consulta (igual
+en los dos casos) no se cuenta; la lectura de la versión sí. Las notificaciones nuevas se crean con
+create_notification entre vueltas. Los usuarios se crean al empezar y se
+borran al terminar.
+"""
+import json
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+
+from core.models import Notification, create_notification
+from core.views import notifications_list
+
+PREFIJO = 'bench_notif_'
+
+
+class Command(BaseCommand):
+    help = 'Compara las consultas por minuto del polling de notificaciones con y sin versión'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=1000, help='Usuarios conectados')
+        parser.add_argument('--intervalo', type=int, default=5, help='Segundos entre polls de cada usuario')
+        parser.add_argument('--notificaciones', type=int, default=200,
+                            help='Notificaciones nuevas por minuto, repartidas al azar')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        if User.objects.filter(username__startswith=PREFIJO).exists():
+            raise CommandError(f'Ya existen usuarios {PREFIJO}*: bórralos antes de repetir la prueba')
+
+        User.objects.bulk_create([
+            User(username=f'{PREFIJO}{i}', role='Comprador') for i in range(options['usuarios'])
+        ], batch_size=500)
+        self.stdout.write(self.style.WARNING(
+            f'{options["usuarios"]} usuarios, poll cada {options["intervalo"]}s, '
+            f'{options["notificaciones"]} notificaciones/min'
+        ))
+        try:
+            Notification.objects.bulk_create([
+                Notification(recipient=usuario, title='Bienvenida', message='Notificación inicial')
+                for usuario in User.objects.filter(username__startswith=PREFIJO)
+            ], batch_size=500)
+            sin_version = self._simular(options, con_version=False)
+            con_version = self._simular(options, con_version=True)
+        finally:
+            User.objects.filter(username__startswith=PREFIJO).delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{sin_version / max(con_version, 1):.1f}x menos consultas por minuto con la versión.'
+        ))
+
+    def _simular(self, options, con_version):
+        usuarios_bench = get_user_model().objects.filter(username__startswith=PREFIJO).order_by('pk')
+        rng = random.Random(42)
+        factory = RequestFactory()
+        rondas = 60 // options['intervalo']
+        por_ronda = options['notificaciones'] // rondas
+        versiones = {}
+        consultas = [0]
+        respuestas_sin_cambios = 0
+
+        def contar(execute, sql, params, many, context):
+            consultas[0] += 1
+            return execute(sql, params, many, context)
+
+        inicio = time.perf_counter()
+        for _ in range(rondas):
+            usuarios = list(usuarios_bench.all())
+            destinatarios = {usuario.pk for usuario in rng.sample(usuarios, min(por_ronda, len(usuarios)))}
+            for usuario in usuarios:
+                if usuario.pk in destinatarios:
+                    create_notification(recipient=usuario, title='Pedido', message='Tu pedido cambió de estado',
+                                        category='order')
+
+            # Como el middleware: el usuario del request se lee después de los cambios
+            usuarios = list(usuarios_bench.all())
+            for usuario in usuarios:
+                params = {'version': versiones[usuario.pk]} if con_version and usuario.pk in versiones else {}
+                request = factory.get('/core/notifications/list/', params)
+                request.user = usuario
+                with connection.execute_wrapper(contar):
+                    response = notifications_list(request)
+                datos = json.loads(response.content)
+                versiones[usuario.pk] = datos['version']
+                if not datos['changed']:
+                    respuestas_sin_cambios += 1
+                    if usuario.pk in destinatarios:
+                        raise CommandError('Un usuario con notificaciones nuevas recibió changed=false')
+        duracion = time.perf_counter() - inicio
+
+        consultas = consultas[0]
+        polls = rondas * len(usuarios)
+        nombre = 'Con versión' if con_version else 'Sin versión'
+        self.stdout.write(
+            f'{nombre:<12} {consultas:7d} consultas/min  ({consultas / polls:.2f} por poll, '
+            f'{respuestas_sin_cambios}/{polls} sin cambios, {duracion:.1f}s)'
+        )
+        return consultas
@@ -0,0 +1,68 @@
+"""
+Micro-benchmark de la conversión de unidades: camino float anterior frente a
+core.units (escalar y por lotes). No toca la base de datos.
+"""
+import random
+import timeit
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from core import units
+
+# Copia del camino anterior (Publication.convertir_unidad con float)
+_FLOAT_TO_KG = {
+    'kg': 1,
+    'libras': 0.453592,
+    'arrobas': 11.502,
+    'toneladas': 1000,
+}
+
+
+def _convertir_float(cantidad, origen, destino):
+    if origen == destino:
+        return float(cantidad)
+    factor_origen = _FLOAT_TO_KG.get(origen)
+    factor_destino = _FLOAT_TO_KG.get(destino)
+    if factor_origen is None or factor_destino is None:
+        return None
+    return round(float(cantidad) * factor_origen / factor_destino, 3)
+
+
+class Command(BaseCommand):
+    help = 'Compara el tiempo de conversión de unidades con float y con core.units'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cantidades', type=int, default=10000,
+                            help='Cantidades a convertir por repetición')
+        parser.add_argument('--repeticiones', type=int, default=5)
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        unidades = list(units.FACTORES_A_KG)
+        datos = [
+            (Decimal(rng.randint(1, 1000000)) / 100, rng.choice(unidades))
+            for _ in range(options['cantidades'])
+        ]
+        repeticiones = options['repeticiones']
+
+        casos = [
+            ('float (anterior)', lambda: [_convertir_float(c, u, 'kg') for c, u in datos]),
+            ('units.convertir', lambda: [units.convertir(c, u, 'kg') for c, u in datos]),
+            ('units.convertir_lote', lambda: units.convertir_lote(datos, 'kg')),
+        ]
+
+        self.stdout.write(self.style.WARNING(
+            f'Convirtiendo {len(datos)} cantidades a kg, {repeticiones} repeticiones...'
+        ))
+        for nombre, funcion in casos:
+            mejor = min(timeit.repeat(funcion, number=1, repeat=repeticiones))
+            por_item = mejor / len(datos) * 1_000_000
+            self.stdout.write(f'{nombre:<22} {mejor * 1000:8.2f} ms  ({por_item:.2f} µs/cantidad)')
+
+        # Diferencia entre ambos caminos (error acumulado del float)
+        total_float = sum(Decimal(str(_convertir_float(c, u, 'kg'))) for c, u in datos)
+        total_exacto = sum(units.convertir_lote(datos, 'kg', decimales=None))
+        self.stdout.write(self.style.SUCCESS(
+            f'Total float: {total_float} kg | total exacto: {total_exacto.quantize(Decimal("0.001"))} kg'
+        ))
@@ -0,0 +1,69 @@
+"""
+Worker de la cola de tareas (core/tasks.py).
+
+En cada vuelta despacha el outbox de notificaciones (core/outbox.py), toma
+lotes de tareas listas y las ejecuta en un pool de hilos hasta que se
+interrumpe con Ctrl+C / SIGTERM. Se pueden lanzar varios procesos a la vez:
+en PostgreSQL cada uno toma filas distintas gracias a SKIP LOCKED.
+
+    python manage.py run_workers --threads 4
+    python manage.py run_workers --once      # vacía la cola y termina
+    python manage.py run_workers --stats     # muestra las métricas en JSON
+"""
+import json
+import os
+import signal
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.outbox import dispatch_outbox
+from core.tasks import claim_tasks, queue_stats, run_task
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta las tareas en segundo plano encoladas en la base de datos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4, help='Tareas ejecutadas en paralelo')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Segundos de espera cuando la cola está vacía')
+        parser.add_argument('--once', action='store_true', help='Procesar lo pendiente y terminar')
+        parser.add_argument('--stats', action='store_true', help='Mostrar métricas de la cola y terminar')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(queue_stats(), indent=2))
+            return
+
+        threads = max(1, options['threads'])
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        detener = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: detener.set())
+
+        self.stdout.write(self.style.WARNING(f'Worker {worker_id} con {threads} hilo(s)...'))
+        ok = fallidas = 0
+        try:
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                while not detener.is_set():
+                    eventos, _ = dispatch_outbox()
+                    tareas = claim_tasks(worker_id, threads)
+                    # Liberar la conexión del hilo principal mientras corren las tareas
+                    connections.close_all()
+                    if not tareas and not eventos:
+                        if options['once']:
+                            break
+                        detener.wait(options['poll_interval'])
+                        continue
+                    for resultado in pool.map(run_task, tareas):
+                        if resultado:
+                            ok += 1
+                        else:
+                            fallidas += 1
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f'Worker detenido: {ok} tarea(s) completadas, {fallidas} fallida(s).'))
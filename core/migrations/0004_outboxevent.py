@@ -0,0 +1,36 @@
+# Generated by Django 4.2.24 on 2026-10-18 04:55
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0003_task'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255, verbose_name='Título')),
+                ('message', models.TextField(verbose_name='Mensaje')),
+                ('category', models.CharField(choices=[('order', 'Pedido'), ('payment', 'Pago'), ('system', 'Sistema')], default='system', max_length=20, verbose_name='Categoría')),
+                ('order_id', models.IntegerField(blank=True, null=True, verbose_name='ID Pedido')),
+                ('payment_id', models.IntegerField(blank=True, null=True, verbose_name='ID Pago')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Procesado el')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Destinatario')),
+            ],
+            options={
+                'verbose_name': 'Evento pendiente',
+                'verbose_name_plural': 'Eventos pendientes',
+                'ordering': ['id'],
+                'indexes': [models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['id'], name='core_outbox_pending_idx')],
+            },
+        ),
+    ]
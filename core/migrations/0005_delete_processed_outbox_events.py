@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def delete_processed_events(apps, schema_editor):
+    # dispatch_outbox ya borra los eventos al despacharlos; quitar los que
+    # quedaron marcados como procesados antes de ese cambio
+    OutboxEvent = apps.get_model('core', 'OutboxEvent')
+    OutboxEvent.objects.filter(processed_at__isnull=False).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_outboxevent'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_processed_events, migrations.RunPython.noop),
+    ]
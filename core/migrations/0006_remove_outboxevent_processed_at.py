@@ -0,0 +1,21 @@
+# Generated by Django 4.2.24 on 2026-10-18 05:42
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_delete_processed_outbox_events'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='outboxevent',
+            name='core_outbox_pending_idx',
+        ),
+        migrations.RemoveField(
+            model_name='outboxevent',
+            name='processed_at',
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.24 on 2026-10-18 05:43
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def copy_user_versions(apps, schema_editor):
+    # La versión vivía en User.notifications_version: conservarla para que los
+    # navegadores abiertos no confundan una versión reiniciada con la suya
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    NotificationVersion = apps.get_model('core', 'NotificationVersion')
+    NotificationVersion.objects.bulk_create([
+        NotificationVersion(user_id=user_id, version=version)
+        for user_id, version in User.objects.filter(notifications_version__gt=0).values_list('id', 'notifications_version')
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_user_notifications_version'),
+        ('core', '0006_remove_outboxevent_processed_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationVersion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+                ('version', models.PositiveIntegerField(default=0, verbose_name='Versión')),
+            ],
+            options={
+                'verbose_name': 'Versión de notificaciones',
+                'verbose_name_plural': 'Versiones de notificaciones',
+            },
+        ),
+        migrations.RunPython(copy_user_versions, migrations.RunPython.noop),
+    ]
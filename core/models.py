@@ -1,7 +1,10 @@
 from django.db import models
+from django.utils import timezone
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from .notifications import bump_notifications_version
+
 # Create your models here.
 class BaseModel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
@@ -43,6 +46,28 @@ class Notification(BaseModel):
         return f"{self.title} -> {self.recipient}"
 
 
+class NotificationVersion(models.Model):
+    """
+    Versión de las notificaciones de un usuario (core/notifications.py). Solo
+    cambia con UPDATE ... + 1; sin fila, la versión es 0.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name='Usuario'
+    )
+    version = models.PositiveIntegerField(default=0, verbose_name='Versión')
+
+    class Meta:
+        verbose_name = 'Versión de notificaciones'
+        verbose_name_plural = 'Versiones de notificaciones'
+
+    def __str__(self):
+        return f"{self.user_id}: {self.version}"
+
+
 # Helper to create and emit notifications via Channels
 def create_notification(*, recipient, title, message, category='system', order_id=None, payment_id=None):
     """Crear notificación simple (sin WebSockets)"""
@@ -54,6 +79,7 @@ def create_notification(*, recipient, title, message, category='system', order_i
         order_id=order_id,
         payment_id=payment_id,
     )
+    bump_notifications_version(notification.recipient_id)
     return notification
 
 
@@ -160,3 +186,65 @@ class Farm(BaseModel):
         return Crop.objects.filter(finca=self).aggregate(
             total=models.Sum('area_ocupada')
         )['total'] or 0
+
+
+class Task(BaseModel):
+    """Tarea en segundo plano; la ejecuta el comando run_workers (ver core/tasks.py)"""
+    STATUS_CHOICES = (
+        ('pending', 'Pendiente'),
+        ('running', 'En ejecución'),
+        ('done', 'Completada'),
+        ('dead', 'Fallida'),
+    )
+
+    name = models.CharField(max_length=200, verbose_name='Función')
+    args = models.JSONField(default=list, blank=True, verbose_name='Argumentos')
+    kwargs = models.JSONField(default=dict, blank=True, verbose_name='Argumentos con nombre')
+    priority = models.SmallIntegerField(default=0, verbose_name='Prioridad', help_text='Mayor se ejecuta antes')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', verbose_name='Estado')
+    attempts = models.PositiveIntegerField(default=0, verbose_name='Intentos')
+    max_attempts = models.PositiveIntegerField(default=5, verbose_name='Intentos máximos')
+    run_at = models.DateTimeField(default=timezone.now, verbose_name='Ejecutar desde')
+    locked_by = models.CharField(max_length=100, blank=True, verbose_name='Worker')
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name='Tomada el')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='Iniciada el')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Terminada el')
+    last_error = models.TextField(blank=True, verbose_name='Último error')
+
+    class Meta:
+        verbose_name = 'Tarea'
+        verbose_name_plural = 'Tareas'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', '-priority', 'run_at'], name='core_task_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
+
+
+class OutboxEvent(models.Model):
+    """
+    Notificación pendiente, escrita en la misma transacción que el cambio de
+    estado que la origina; la crea core.outbox.dispatch_outbox
+    """
+    recipient = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Destinatario'
+    )
+    title = models.CharField(max_length=255, verbose_name='Título')
+    message = models.TextField(verbose_name='Mensaje')
+    category = models.CharField(max_length=20, choices=Notification.CATEGORY_CHOICES, default='system', verbose_name='Categoría')
+    order_id = models.IntegerField(null=True, blank=True, verbose_name='ID Pedido')
+    payment_id = models.IntegerField(null=True, blank=True, verbose_name='ID Pago')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Evento pendiente'
+        verbose_name_plural = 'Eventos pendientes'
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.title} -> {self.recipient_id}"
@@ -0,0 +1,66 @@
+"""
+Versión de las notificaciones de cada usuario (core.models.NotificationVersion).
+
+Cada vez que cambian las notificaciones de un usuario (create_notification, el
+despacho del outbox, los endpoints de marcar y borrar) su versión sube en 1
+con un UPDATE dentro de la misma transacción, así que los workers y el proceso
+de run_workers la ven en cuanto hace commit, junto con las notificaciones.
+
+notifications_list devuelve la versión con los datos; si el navegador la
+reenvía y no cambió, responde sin consultar Notification: el poll sin cambios
+solo lee una fila de NotificationVersion por clave primaria.
+
+wait_for_change sirve al long-poll (core.views.notifications_wait): relee la
+versión cada NOTIFICATIONS_LONG_POLL_STEP segundos hasta que cambie o pase el
+timeout.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import F
+
+
+def bump_notifications_version(*user_ids):
+    """Sube la versión de los usuarios en la transacción en curso"""
+    from .models import NotificationVersion
+
+    ids = sorted({user_id for user_id in user_ids if user_id is not None})
+    if not ids:
+        return
+    versiones = NotificationVersion.objects.filter(user_id__in=ids)
+    if versiones.update(version=F('version') + 1) < len(ids):
+        # Usuarios sin fila todavía: crearla en 0 y subirla como las demás
+        existentes = set(versiones.values_list('user_id', flat=True))
+        faltantes = [user_id for user_id in ids if user_id not in existentes]
+        NotificationVersion.objects.bulk_create(
+            [NotificationVersion(user_id=user_id) for user_id in faltantes], ignore_conflicts=True
+        )
+        NotificationVersion.objects.filter(user_id__in=faltantes).update(version=F('version') + 1)
+
+
+def read_notifications_version(user_id):
+    """Versión actual del usuario (0 si nunca cambió)"""
+    from .models import NotificationVersion
+
+    version = NotificationVersion.objects.filter(user_id=user_id).values_list('version', flat=True).first()
+    return version or 0
+
+
+async def wait_for_change(user_id, version, timeout=None, step=None):
+    """
+    Espera a que la versión del usuario deje de ser `version` (texto, como
+    llega en la query string), como mucho `timeout` segundos. Retorna la
+    versión actual.
+    """
+    timeout = timeout if timeout is not None else getattr(settings, 'NOTIFICATIONS_LONG_POLL_TIMEOUT', 25)
+    step = step or getattr(settings, 'NOTIFICATIONS_LONG_POLL_STEP', 5)
+    leer = sync_to_async(read_notifications_version)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        actual = await leer(user_id)
+        restante = deadline - loop.time()
+        if str(actual) != version or restante <= 0:
+            return actual
+        await asyncio.sleep(min(step, restante))
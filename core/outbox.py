@@ -0,0 +1,110 @@
+"""
+Outbox de notificaciones de pedidos y pagos.
+
+Las señales de Order y Payment no crean Notification directamente: escriben
+un OutboxEvent en la misma transacción que el cambio de estado (un INSERT, sin
+esperar a nada externo). Si la transacción se revierte, el evento desaparece
+con ella; si hace commit, el evento queda hasta que se despacha.
+
+dispatch_outbox (lo llama run_workers en cada vuelta) toma los eventos
+pendientes por lotes, descarta los duplicados de un mismo pedido/pago y
+destinatario (p. ej. un pedido guardado dos veces en el mismo estado), crea las
+Notification con un bulk_create y borra los eventos en la misma transacción,
+así la tabla solo guarda lo pendiente (y cambia la versión de notificaciones
+de los destinatarios, ver core/notifications.py).
+"""
+import logging
+
+from django.db import connection, transaction
+
+from .models import Notification, OutboxEvent
+from .notifications import bump_notifications_version
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+def record_notification(*, recipient, title, message, category='system', order_id=None, payment_id=None):
+    """Misma firma que core.models.create_notification, pero la notificación sale por el outbox"""
+    return OutboxEvent.objects.create(
+        recipient=recipient,
+        title=title,
+        message=message,
+        category=category,
+        order_id=order_id,
+        payment_id=payment_id,
+    )
+
+
+def record_notifications(notifications):
+    """Encola una lista de Notification sin guardar en un solo INSERT"""
+    return OutboxEvent.objects.bulk_create([
+        OutboxEvent(
+            recipient_id=n.recipient_id,
+            title=n.title,
+            message=n.message,
+            category=n.category,
+            order_id=n.order_id,
+            payment_id=n.payment_id,
+        )
+        for n in notifications
+    ])
+
+
+def _coalesce(events):
+    """Un evento por (destinatario, pedido, pago, título); gana el más reciente"""
+    latest = {}
+    for event in events:
+        latest[(event.recipient_id, event.order_id, event.payment_id, event.title)] = event
+    return sorted(latest.values(), key=lambda e: e.id)
+
+
+def _dispatch_batch(batch_size):
+    pendientes = OutboxEvent.objects.order_by('id')
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            events = list(pendientes.select_for_update(skip_locked=True)[:batch_size])
+            OutboxEvent.objects.filter(id__in=[e.id for e in events]).delete()
+        else:
+            # SQLite: borrar primero; si otro despachador se adelantó, reintentar luego
+            events = list(pendientes[:batch_size])
+            ids = [e.id for e in events]
+            borrados, _ = OutboxEvent.objects.filter(id__in=ids).delete()
+            if borrados != len(ids):
+                transaction.set_rollback(True)
+                return 0, 0
+        if not events:
+            return 0, 0
+
+        notifications = Notification.objects.bulk_create([
+            Notification(
+                recipient_id=e.recipient_id,
+                title=e.title,
+                message=e.message,
+                category=e.category,
+                order_id=e.order_id,
+                payment_id=e.payment_id,
+            )
+            for e in _coalesce(events)
+        ])
+        bump_notifications_version(*{n.recipient_id for n in notifications})
+    return len(events), len(notifications)
+
+
+def dispatch_outbox(batch_size=BATCH_SIZE, max_batches=None):
+    """
+    Despacha los eventos pendientes. Retorna (eventos procesados, notificaciones creadas).
+    """
+    total_events = total_notifications = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        events, notifications = _dispatch_batch(batch_size)
+        batches += 1
+        total_events += events
+        total_notifications += notifications
+        if events < batch_size:
+            break
+    if total_events:
+        logger.info(f"Outbox: {total_events} events -> {total_notifications} notifications")
+    return total_events, total_notifications
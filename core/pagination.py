@@ -0,0 +1,176 @@
+"""
+Paginación por cursor (keyset / seek) para listados grandes.
+
+En lugar de OFFSET, cada página se pide con un cursor que codifica los valores
+de ordenamiento de la última (o primera) fila mostrada. La consulta filtra con
+una comparación lexicográfica sobre esas columnas, de modo que la base de datos
+solo lee las filas de la página solicitada, sin importar qué tan profunda sea.
+"""
+import base64
+import datetime
+import decimal
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """El cursor recibido no se puede decodificar o no corresponde al ordenamiento"""
+
+
+class _CursorEncoder(json.JSONEncoder):
+    """Serializa fechas con microsegundos completos para no perder precisión"""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.date)):
+            return o.isoformat()
+        if isinstance(o, decimal.Decimal):
+            return str(o)
+        return super().default(o)
+
+
+def encode_cursor(values):
+    """Codifica una lista de valores de ordenamiento como cadena segura para URL"""
+    raw = json.dumps(values, cls=_CursorEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, expected_length):
+    """Decodifica un cursor generado por encode_cursor"""
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(cursor + padding).decode('utf-8'))
+    except (ValueError, TypeError, UnicodeDecodeError) as e:
+        raise InvalidCursor(str(e))
+    if not isinstance(values, list) or len(values) != expected_length:
+        raise InvalidCursor('El cursor no corresponde al ordenamiento actual')
+    if not all(isinstance(value, (str, int, float, bool)) for value in values):
+        raise InvalidCursor('El cursor contiene valores que no son escalares')
+    return values
+
+
+def _resolve_value(obj, field):
+    """Obtiene el valor de `field` (admite rutas con '__') desde una instancia"""
+    value = obj
+    for part in field.split('__'):
+        value = getattr(value, part)
+    return value
+
+
+class KeysetPage:
+    """Página de resultados con cursores para avanzar y retroceder"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+class KeysetPaginator:
+    """
+    Paginador por cursor sobre un queryset.
+
+    `keys` es la lista de columnas de ordenamiento, con prefijo '-' para orden
+    descendente, y debe terminar en una columna única (normalmente 'id') para que
+    el orden sea total. Las columnas pueden ser anotaciones del queryset.
+    """
+
+    def __init__(self, queryset, keys, per_page):
+        self.queryset = queryset
+        self.keys = [(key.lstrip('-'), key.startswith('-')) for key in keys]
+        self.per_page = per_page
+
+    def _ordering(self, reverse=False):
+        return [
+            f"{'-' if descending != reverse else ''}{field}"
+            for field, descending in self.keys
+        ]
+
+    def _seek_filter(self, values, reverse=False):
+        """
+        Construye la condición "fila posterior al cursor":
+        (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ...
+        respetando la dirección de cada columna.
+        """
+        condition = Q()
+        equal_prefix = Q()
+        for (field, descending), value in zip(self.keys, values):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= equal_prefix & Q(**{f'{field}__{lookup}': value})
+            equal_prefix &= Q(**{field: value})
+        return condition
+
+    def _cursor_for(self, obj):
+        return encode_cursor([_resolve_value(obj, field) for field, _ in self.keys])
+
+    def get_page(self, after=None, before=None):
+        """
+        Retorna la página posterior a `after` o anterior a `before`.
+        Sin cursores retorna la primera página. Un cursor inválido también
+        retorna la primera página en lugar de fallar.
+        """
+        reverse = False
+        queryset = self.queryset
+        try:
+            if before:
+                reverse = True
+                queryset = queryset.filter(
+                    self._seek_filter(decode_cursor(before, len(self.keys)), reverse=True)
+                )
+            elif after:
+                queryset = queryset.filter(
+                    self._seek_filter(decode_cursor(after, len(self.keys)))
+                )
+        except (InvalidCursor, ValidationError, ValueError, TypeError):
+            reverse = False
+            queryset = self.queryset
+            after = before = None
+
+        # Pedir una fila extra para saber si hay más resultados en esa dirección
+        rows = list(queryset.order_by(*self._ordering(reverse))[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        if not rows:
+            return KeysetPage([])
+
+        if reverse:
+            next_cursor = self._cursor_for(rows[-1])
+            previous_cursor = self._cursor_for(rows[0]) if has_more else None
+        else:
+            next_cursor = self._cursor_for(rows[-1]) if has_more else None
+            previous_cursor = self._cursor_for(rows[0]) if after else None
+
+        return KeysetPage(rows, next_cursor=next_cursor, previous_cursor=previous_cursor)
+
+
+def cursor_querystring(request):
+    """Parámetros GET actuales sin los cursores, para los enlaces de paginación"""
+    params = request.GET.copy()
+    params.pop('after', None)
+    params.pop('before', None)
+    return params.urlencode()
@@ -0,0 +1,187 @@
+"""
+Cola de tareas en segundo plano guardada en la base de datos.
+
+Las funciones marcadas con @task se pueden llamar normalmente o encolar con
+.delay(); la fila Task se inserta cuando la transacción en curso hace commit
+(si se revierte, la tarea no existe). Los argumentos deben ser serializables a
+JSON: se pasan ids, no instancias.
+
+    @task(priority=5, max_attempts=3)
+    def enviar_recibo(order_id):
+        ...
+
+    enviar_recibo.delay(order.id)
+
+El comando run_workers toma tareas con SELECT ... FOR UPDATE SKIP LOCKED (en
+SQLite, que no lo soporta, con un UPDATE condicional por tarea) y las ejecuta
+en un pool de hilos. Si una tarea falla se reintenta con backoff exponencial;
+al agotar max_attempts queda en estado 'dead' con el último error. Las tareas
+'running' de un worker caído se liberan pasado TASK_LOCK_TIMEOUT.
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+from functools import update_wrapper
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import Avg, Count, F, Min, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Segundos antes del primer reintento; se duplica en cada intento
+RETRY_DELAY = 30
+MAX_RETRY_DELAY = 60 * 60
+
+
+def _lock_timeout():
+    return timedelta(seconds=getattr(settings, 'TASK_LOCK_TIMEOUT', 15 * 60))
+
+
+class TaskFunction:
+    """Función registrada como tarea; se puede llamar directamente o encolar con delay()"""
+
+    def __init__(self, func, priority=0, max_attempts=5, retry_delay=RETRY_DELAY):
+        update_wrapper(self, func)
+        self.func = func
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, priority=None, run_at=None, **kwargs):
+        """Inserta la tarea ya mismo (dentro de la transacción en curso, si hay una)"""
+        from .models import Task
+        return Task.objects.create(
+            name=self.name,
+            args=list(args),
+            kwargs=kwargs,
+            priority=self.priority if priority is None else priority,
+            max_attempts=self.max_attempts,
+            run_at=run_at or timezone.now(),
+        )
+
+    def delay(self, *args, **kwargs):
+        """Encola la tarea cuando la transacción en curso hace commit"""
+        transaction.on_commit(lambda: self.enqueue(*args, **kwargs))
+
+    def delay_many(self, args_list):
+        """Como delay() para muchas llamadas (una tupla de argumentos por llamada), en un solo INSERT"""
+        from .models import Task
+        args_list = [list(args) for args in args_list]
+        if not args_list:
+            return
+
+        def insertar():
+            now = timezone.now()
+            Task.objects.bulk_create([
+                Task(name=self.name, args=args, priority=self.priority,
+                     max_attempts=self.max_attempts, run_at=now)
+                for args in args_list
+            ])
+        transaction.on_commit(insertar)
+
+    def backoff(self, attempts):
+        """Espera antes del siguiente intento, con algo de azar para no reintentar en bloque"""
+        segundos = min(self.retry_delay * 2 ** max(attempts - 1, 0), MAX_RETRY_DELAY)
+        return timedelta(seconds=segundos * random.uniform(0.8, 1.2))
+
+
+def task(func=None, *, priority=0, max_attempts=5, retry_delay=RETRY_DELAY):
+    """Decorador que registra una función como tarea en segundo plano"""
+    def decorator(f):
+        return TaskFunction(f, priority=priority, max_attempts=max_attempts, retry_delay=retry_delay)
+    return decorator(func) if func is not None else decorator
+
+
+def claim_tasks(worker_id, limit):
+    """Marca como 'running' hasta `limit` tareas listas y las retorna"""
+    from .models import Task
+    now = timezone.now()
+
+    # Liberar las tareas de workers que murieron a mitad de ejecución
+    Task.objects.filter(status='running', locked_at__lt=now - _lock_timeout()).update(
+        status='pending', locked_by='',
+    )
+
+    listas = Task.objects.filter(status='pending', run_at__lte=now).order_by('-priority', 'run_at', 'id')
+    tomar = dict(
+        status='running', locked_by=worker_id, locked_at=now, started_at=now,
+        attempts=F('attempts') + 1,
+    )
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            # Cada worker ve solo las filas que nadie más tiene bloqueadas
+            ids = list(listas.select_for_update(skip_locked=True).values_list('id', flat=True)[:limit])
+            Task.objects.filter(id__in=ids).update(**tomar)
+        else:
+            # SQLite: sin SKIP LOCKED; el UPDATE condicional evita que dos workers
+            # tomen la misma tarea (las escrituras están serializadas)
+            ids = [
+                pk for pk in listas.values_list('id', flat=True)[:limit]
+                if Task.objects.filter(pk=pk, status='pending').update(**tomar)
+            ]
+    return list(Task.objects.filter(id__in=ids).order_by('-priority', 'run_at', 'id'))
+
+
+def run_task(task_obj):
+    """Ejecuta una tarea tomada y registra el resultado; retorna True si terminó bien"""
+    from .models import Task
+    func = None
+    try:
+        func = import_string(task_obj.name)
+        if not isinstance(func, TaskFunction):
+            raise TypeError(f'{task_obj.name} no está registrada con @task')
+        func(*task_obj.args, **task_obj.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        if not isinstance(func, TaskFunction) or task_obj.attempts >= task_obj.max_attempts:
+            logger.error(f"Task {task_obj.pk} ({task_obj.name}) failed permanently:\n{error}")
+            Task.objects.filter(pk=task_obj.pk).update(
+                status='dead', last_error=error, finished_at=timezone.now(), locked_by='',
+            )
+        else:
+            logger.warning(f"Task {task_obj.pk} ({task_obj.name}) failed, retrying:\n{error}")
+            Task.objects.filter(pk=task_obj.pk).update(
+                status='pending', last_error=error, locked_by='',
+                run_at=timezone.now() + func.backoff(task_obj.attempts),
+            )
+        return False
+    else:
+        Task.objects.filter(pk=task_obj.pk).update(status='done', finished_at=timezone.now(), locked_by='')
+        return True
+    finally:
+        # Cada hilo del pool tiene su propia conexión; no dejarla abierta entre tareas
+        connections.close_all()
+
+
+def queue_stats(window=timedelta(hours=1)):
+    """Métricas de la cola para monitoreo"""
+    from .models import OutboxEvent, Task
+    now = timezone.now()
+    desde = now - window
+    stats = Task.objects.aggregate(
+        pending=Count('id', filter=Q(status='pending', run_at__lte=now)),
+        scheduled=Count('id', filter=Q(status='pending', run_at__gt=now)),
+        retrying=Count('id', filter=Q(status='pending', attempts__gt=0)),
+        running=Count('id', filter=Q(status='running')),
+        dead=Count('id', filter=Q(status='dead')),
+        done_recent=Count('id', filter=Q(status='done', finished_at__gte=desde)),
+        dead_recent=Count('id', filter=Q(status='dead', finished_at__gte=desde)),
+        oldest_pending=Min('run_at', filter=Q(status='pending', run_at__lte=now)),
+    )
+    espera = Task.objects.filter(status='done', finished_at__gte=desde).aggregate(
+        promedio=Avg(F('started_at') - F('run_at'))
+    )['promedio']
+    oldest = stats.pop('oldest_pending')
+    stats['oldest_pending_seconds'] = round((now - oldest).total_seconds(), 1) if oldest else 0
+    stats['avg_wait_seconds'] = round(espera.total_seconds(), 1) if espera else 0
+    stats['outbox_pending'] = OutboxEvent.objects.count()
+    stats['window_seconds'] = int(window.total_seconds())
+    return stats
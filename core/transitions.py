@@ -0,0 +1,89 @@
+"""
+Despacho de handlers por transición de estado de un modelo.
+
+track_field(Model, 'estado') recuerda el valor del campo al cargar la instancia
+(post_init, leyendo __dict__ para no consultar campos diferidos) y, tras cada
+save, ejecuta solo los handlers registrados para ese cambio concreto:
+
+    @transition(Order, target='completado')
+    def sumar_venta(order, source):
+        ...
+
+    @transition(Order, source=CREATED)
+    def pedido_nuevo(order, source):
+        ...
+
+Guardar una instancia sin cambiar el campo no ejecuta nada, así que volver a
+guardar un pedido completado no repite estadísticas ni notificaciones. Los
+handlers reciben la instancia y el valor anterior (CREATED si se acaba de crear).
+"""
+from django.db.models.signals import post_init, post_save, pre_save
+
+# Comodín: cualquier valor anterior (excepto la creación) o cualquier valor nuevo
+ANY = object()
+# Valor anterior de una instancia recién creada
+CREATED = object()
+# Valor anterior desconocido (campo diferido al cargar)
+_UNKNOWN = object()
+
+_tracked = {}
+_handlers = []
+
+
+def _original_attr(field):
+    return f'_{field}_original'
+
+
+def track_field(model, field):
+    """Registra `field` de `model` como campo de estado con transiciones"""
+    attr = _original_attr(field)
+    _tracked[model] = field
+
+    def remember(sender, instance, **kwargs):
+        if instance.pk is None:
+            instance.__dict__[attr] = CREATED
+        else:
+            # Si el campo está diferido se lee de la BD en pre_save
+            instance.__dict__[attr] = instance.__dict__.get(field, _UNKNOWN)
+
+    def load_deferred(sender, instance, raw=False, **kwargs):
+        if raw or instance._state.adding or instance.__dict__.get(attr, _UNKNOWN) is not _UNKNOWN:
+            return
+        instance.__dict__[attr] = sender._default_manager.filter(pk=instance.pk).values_list(
+            field, flat=True
+        ).first()
+
+    def dispatch(sender, instance, created, raw=False, update_fields=None, **kwargs):
+        if raw or (update_fields is not None and field not in update_fields):
+            return
+        source = CREATED if created else instance.__dict__.get(attr)
+        target = getattr(instance, field)
+        # Lo guardado pasa a ser el nuevo estado original
+        instance.__dict__[attr] = target
+        if source == target:
+            return
+        for handler_model, handler_source, handler_target, handler in _handlers:
+            if handler_model is not sender:
+                continue
+            if handler_source is ANY and source is CREATED:
+                continue
+            if handler_source is not ANY and handler_source != source:
+                continue
+            if handler_target is not ANY and handler_target != target:
+                continue
+            handler(instance, source)
+
+    post_init.connect(remember, sender=model, weak=False, dispatch_uid=f'track_{model._meta.label}_{field}')
+    pre_save.connect(load_deferred, sender=model, weak=False, dispatch_uid=f'load_{model._meta.label}_{field}')
+    post_save.connect(dispatch, sender=model, weak=False, dispatch_uid=f'dispatch_{model._meta.label}_{field}')
+
+
+def transition(model, source=ANY, target=ANY):
+    """Registra un handler para el cambio source→target del campo de estado de `model`"""
+    if model not in _tracked:
+        raise ValueError(f'{model.__name__} no tiene un campo de estado registrado con track_field')
+
+    def decorator(func):
+        _handlers.append((model, source, target, func))
+        return func
+    return decorator
@@ -0,0 +1,156 @@
+"""
+Conversión exacta de unidades de medida con Decimal.
+
+Todas las unidades de peso se expresan respecto al kilogramo. Al importar el
+módulo se precalcula la matriz de factores para cada par (origen, destino), de
+modo que convertir es una búsqueda en un diccionario y una multiplicación
+Decimal, sin pasar por float. Las unidades discretas (unidades, cajas, bultos)
+solo se convierten a sí mismas.
+
+Además de las funciones escalares hay una API por lotes (convertir_lote,
+convertir_precios_lote) y una expresión de base de datos (expresion_a_kg) para
+sumar cantidades en kg con aggregate().
+"""
+from decimal import Decimal, ROUND_HALF_UP, localcontext
+
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, Value, When
+
+# Kilogramos por unidad de peso
+FACTORES_A_KG = {
+    'kg': Decimal('1'),
+    'libras': Decimal('0.453592'),
+    'arrobas': Decimal('11.502'),  # 1 arroba = 25 libras = 11.502 kg
+    'toneladas': Decimal('1000'),
+}
+
+# Unidades sin conversión
+UNIDADES_DISCRETAS = ('unidades', 'cajas', 'bultos')
+
+# Tabla completa: factor a kg o None si la unidad no es convertible
+CONVERSION_TO_KG = {
+    **FACTORES_A_KG,
+    **{unidad: None for unidad in UNIDADES_DISCRETAS},
+}
+
+# Decimales de las cantidades y precios convertidos
+CANTIDAD_DECIMALES = Decimal('0.001')
+PRECIO_DECIMALES = Decimal('0.01')
+
+# Precisión usada para calcular los factores (mayor a la de los campos)
+_PRECISION_FACTORES = 40
+
+
+def _construir_matriz():
+    """Factor por el que se multiplica una cantidad en `origen` para llevarla a `destino`"""
+    matriz = {}
+    with localcontext() as ctx:
+        ctx.prec = _PRECISION_FACTORES
+        for origen, kg_origen in FACTORES_A_KG.items():
+            for destino, kg_destino in FACTORES_A_KG.items():
+                matriz[(origen, destino)] = kg_origen / kg_destino
+    for unidad in UNIDADES_DISCRETAS:
+        matriz[(unidad, unidad)] = Decimal('1')
+    return matriz
+
+
+FACTORES = _construir_matriz()
+
+
+def _decimal(valor):
+    if isinstance(valor, Decimal):
+        return valor
+    # str() evita arrastrar el error binario de los float
+    return Decimal(str(valor))
+
+
+def es_convertible(unidad):
+    return unidad in FACTORES_A_KG
+
+
+def factor(origen, destino):
+    """Factor de conversión entre dos unidades, o None si no es posible"""
+    if origen == destino:
+        return Decimal('1')
+    return FACTORES.get((origen, destino))
+
+
+def convertir(cantidad, origen, destino, decimales=CANTIDAD_DECIMALES):
+    """
+    Convierte una cantidad de `origen` a `destino`.
+    Retorna un Decimal redondeado a `decimales` (None para no redondear) o
+    None si las unidades no son convertibles entre sí.
+    """
+    f = factor(origen, destino)
+    if f is None:
+        return None
+    resultado = _decimal(cantidad) * f
+    if decimales is None:
+        return resultado
+    return resultado.quantize(decimales, rounding=ROUND_HALF_UP)
+
+
+def convertir_precio(precio, origen, destino, decimales=PRECIO_DECIMALES):
+    """
+    Convierte un precio por unidad de `origen` a precio por unidad de `destino`.
+    Ejemplo: $50.000/arroba equivale a $4.347,07/kg.
+    """
+    # El precio va en sentido inverso a la cantidad
+    return convertir(precio, destino, origen, decimales)
+
+
+def convertir_lote(valores, destino, decimales=CANTIDAD_DECIMALES):
+    """
+    Convierte muchas cantidades de una vez. `valores` es un iterable de pares
+    (cantidad, unidad_origen), por ejemplo
+    queryset.values_list('cantidad_disponible', 'unidad_medida').
+    Retorna una lista de Decimal (o None donde no hay conversión), en orden.
+    """
+    factores = {}
+    resultado = []
+    for cantidad, origen in valores:
+        if origen not in factores:
+            factores[origen] = factor(origen, destino)
+        f = factores[origen]
+        if f is None or cantidad is None:
+            resultado.append(None)
+            continue
+        valor = _decimal(cantidad) * f
+        resultado.append(valor.quantize(decimales, rounding=ROUND_HALF_UP) if decimales is not None else valor)
+    return resultado
+
+
+def convertir_precios_lote(valores, destino, decimales=PRECIO_DECIMALES):
+    """Como convertir_lote, para pares (precio por unidad_origen, unidad_origen)"""
+    factores = {}
+    resultado = []
+    for precio, origen in valores:
+        if origen not in factores:
+            factores[origen] = factor(destino, origen)
+        f = factores[origen]
+        if f is None or precio is None:
+            resultado.append(None)
+            continue
+        valor = _decimal(precio) * f
+        resultado.append(valor.quantize(decimales, rounding=ROUND_HALF_UP) if decimales is not None else valor)
+    return resultado
+
+
+def expresion_a_kg(campo_cantidad, campo_unidad='unidad_medida', decimal_places=3):
+    """
+    Expresión Case/When que convierte `campo_cantidad` a kg en la base de datos.
+    Las unidades discretas dan NULL, así que Sum() las ignora:
+
+        Crop.objects.aggregate(cantidad_total_kg=Sum(expresion_a_kg('cantidad_estimada')))
+    """
+    output_field = DecimalField(max_digits=20, decimal_places=decimal_places)
+    return Case(
+        *[
+            When(**{campo_unidad: unidad}, then=ExpressionWrapper(
+                F(campo_cantidad) * Value(factor_kg, output_field=output_field),
+                output_field=output_field,
+            ))
+            for unidad, factor_kg in FACTORES_A_KG.items()
+        ],
+        default=Value(None, output_field=output_field),
+        output_field=output_field,
+    )
@@ -8,6 +8,7 @@ app_name = 'core'
 urlpatterns = [
     # Notifications API (sin WebSockets)
     path('notifications/list/', views.notifications_list, name='notifications_list'),
+    path('notifications/wait/', views.notifications_wait, name='notifications_wait'),
     path('notifications/mark-all-read/', views.notifications_mark_all_read, name='notifications_mark_all_read'),
     path('notifications/mark-all-unread/', views.notifications_mark_all_unread, name='notifications_mark_all_unread'),
     path('notifications/mark-read/', views.notifications_mark_read, name='notifications_mark_read'),
@@ -30,6 +31,9 @@ urlpatterns = [
     path('assistant/reply/', views.assistant_reply, name='assistant_reply'),
     # AI Suggestions para publicaciones
     path('ai/suggestions/', views.ai_publication_suggestions, name='ai_publication_suggestions'),
+
+    # Monitoreo de la cola de tareas
+    path('tasks/stats/', views.task_queue_stats, name='task_queue_stats'),
     
 ]
 
@@ -1,9 +1,14 @@
-from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
-from django.views.decorators.http import require_GET, require_POST
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET, require_POST
+from asgiref.sync import sync_to_async
 from django.utils import timezone
 from django.core.paginator import Paginator
 from .models import Notification
+from .notifications import bump_notifications_version, read_notifications_version, wait_for_change
+from .tasks import queue_stats
 from django.shortcuts import render
 from decouple import config
 import logging
@@ -11,9 +16,27 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+def _notifications_version(request):
+    # La leen el ETag y la vista: una sola consulta por petición
+    if not hasattr(request, '_notifications_version'):
+        request._notifications_version = str(read_notifications_version(request.user.pk))
+    return request._notifications_version
+
+
 @login_required
 @require_GET
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_notifications_version)
 def notifications_list(request):
+    """
+    Últimas 20 notificaciones del usuario y su versión (core/notifications.py).
+    Si `version` (o If-None-Match) coincide con la actual responde
+    {"changed": false} (o 304) sin consultar Notification.
+    """
+    version = _notifications_version(request)
+    if request.GET.get('version') == version:
+        return JsonResponse({'success': True, 'changed': False, 'version': version})
+
     notifications = Notification.objects.filter(recipient=request.user).order_by('-created_at')[:20]
     data = [
         {
@@ -28,19 +51,43 @@ def notifications_list(request):
         }
         for n in notifications
     ]
-    return JsonResponse({'success': True, 'notifications': data})
+    return JsonResponse({'success': True, 'changed': True, 'version': version, 'notifications': data})
+
+
+async def notifications_wait(request):
+    """
+    Long-poll: responde cuando la versión de las notificaciones deja de ser
+    `version` o tras NOTIFICATIONS_LONG_POLL_TIMEOUT segundos, sin consultar
+    Notification. Solo con ASGI; bajo WSGI responde 204 para no ocupar un
+    worker esperando (el cliente sigue con notifications_list).
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    user = await sync_to_async(lambda: request.user if request.user.is_authenticated else None)()
+    if user is None:
+        return JsonResponse({'success': False, 'error': 'No autenticado'}, status=401)
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    anterior = request.GET.get('version')
+    version = str(await wait_for_change(user.pk, anterior))
+    response = JsonResponse({'success': True, 'changed': version != anterior, 'version': version})
+    response['Cache-Control'] = 'no-store'
+    return response
 
 
 @login_required
 @require_POST
 def notifications_mark_all_read(request):
     Notification.objects.filter(recipient=request.user, is_read=False).update(is_read=True, read_at=timezone.now())
+    bump_notifications_version(request.user.pk)
     return JsonResponse({'success': True})
 
 @login_required
 @require_POST
 def notifications_mark_all_unread(request):
     Notification.objects.filter(recipient=request.user, is_read=True).update(is_read=False, read_at=None)
+    bump_notifications_version(request.user.pk)
     return JsonResponse({'success': True})
 
 
@@ -51,7 +98,8 @@ def notifications_mark_read(request):
     data = json.loads(request.body)
     notification_id = data.get('notification_id')
     if notification_id:
-        Notification.objects.filter(id=notification_id, recipient=request.user).update(is_read=True)
+        if Notification.objects.filter(id=notification_id, recipient=request.user).update(is_read=True):
+            bump_notifications_version(request.user.pk)
     return JsonResponse({'success': True})
 
 @login_required
@@ -60,6 +108,8 @@ def notifications_delete_all(request):
     """Eliminar todas las notificaciones del usuario"""
     deleted_count = Notification.objects.filter(recipient=request.user).count()
     Notification.objects.filter(recipient=request.user).delete()
+    if deleted_count:
+        bump_notifications_version(request.user.pk)
     return JsonResponse({'success': True, 'deleted_count': deleted_count})
 
 @login_required
@@ -68,6 +118,8 @@ def notifications_delete_read(request):
     """Eliminar solo las notificaciones leídas del usuario"""
     deleted_count = Notification.objects.filter(recipient=request.user, is_read=True).count()
     Notification.objects.filter(recipient=request.user, is_read=True).delete()
+    if deleted_count:
+        bump_notifications_version(request.user.pk)
     return JsonResponse({'success': True, 'deleted_count': deleted_count})
 
 from django.shortcuts import render
@@ -565,6 +617,8 @@ def notifications_delete_read(request):
         from .models import Notification
         deleted_count = Notification.objects.filter(recipient=request.user, is_read=True).count()
         Notification.objects.filter(recipient=request.user, is_read=True).delete()
+        if deleted_count:
+            bump_notifications_version(request.user.pk)
         
         return JsonResponse({
             'success': True,
@@ -592,3 +646,11 @@ def handler404(request, exception):
 def handler500(request):
     """Maneja errores 500 (error interno del servidor)"""
     return render(request, '500.html', status=500)
+
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+@require_GET
+def task_queue_stats(request):
+    """Métricas de la cola de tareas en segundo plano (para monitoreo)"""
+    return JsonResponse({'success': True, 'stats': queue_stats()})
@@ -3,9 +3,11 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db.models import Sum, Count, Q
 from .models import Crop
+from core import units
 from .forms import CropForm
 from marketplace.models import Publication
-from sales.models import Order
+from sales.models import DailyStats, Order
+from sales.rollups import amount_in, count_in, monthly, totals_by_estado
 
 # Create your views here.
 
@@ -18,19 +20,20 @@ def producer_dashboard(request):
     
     # Estadísticas de producción/ventas
     total_crops = request.user.cultivos.count()
-    active_publications = Publication.objects.filter(cultivo__productor=request.user, estado='Activa').count()
+    active_publications = Publication.objects.filter(productor=request.user, estado='Activa').count()
     
-    # Estadísticas de VENTAS (donde soy el vendedor)
-    sales_orders = Order.objects.filter(publicacion__cultivo__productor=request.user)
-    total_sales = sales_orders.count()
-    total_revenue = sales_orders.filter(estado='entregado').aggregate(total=Sum('precio_total'))['total'] or 0
-    pending_sales = sales_orders.filter(estado='pendiente').count()
+    # Estadísticas de VENTAS y COMPRAS desde el resumen diario (sales/rollups.py)
+    sales_orders = Order.objects.filter(vendedor=request.user)
+    ventas = totals_by_estado(DailyStats.objects.filter(vendedor=request.user))
+    total_sales = count_in(ventas)
+    total_revenue = amount_in(ventas, 'entregado')
+    pending_sales = count_in(ventas, 'pendiente')
     
-    # Estadísticas de COMPRAS (donde soy el comprador)
     purchase_orders = Order.objects.filter(comprador=request.user)
-    total_purchases = purchase_orders.count()
-    total_spent = purchase_orders.filter(estado='entregado').aggregate(total=Sum('precio_total'))['total'] or 0
-    pending_purchases = purchase_orders.filter(estado='pendiente').count()
+    compras = totals_by_estado(DailyStats.objects.filter(comprador=request.user))
+    total_purchases = count_in(compras)
+    total_spent = amount_in(compras, 'entregado')
+    pending_purchases = count_in(compras, 'pendiente')
     
     # Cultivos recientes
     recent_crops = request.user.cultivos.order_by('-created_at')[:5]
@@ -39,30 +42,20 @@ def producer_dashboard(request):
     recent_sales = sales_orders.select_related('publicacion__cultivo', 'comprador').order_by('-created_at')[:5]
     
     # Pedidos recientes de COMPRAS
-    recent_purchases = purchase_orders.select_related('publicacion__cultivo__productor', 'publicacion__cultivo').order_by('-created_at')[:5]
+    recent_purchases = purchase_orders.select_related('publicacion__cultivo', 'vendedor').order_by('-created_at')[:5]
     
     # Datos para gráficos - Ventas por mes (últimos 6 meses)
-    from django.utils import timezone
-    from datetime import timedelta
-    from django.db.models.functions import TruncMonth
-    
-    sales_by_month = sales_orders.filter(
-        created_at__gte=timezone.now() - timedelta(days=180)
-    ).annotate(
-        month=TruncMonth('created_at')
-    ).values('month').annotate(
-        count=Count('id'),
-        revenue=Sum('precio_total')
-    ).order_by('month')
+    sales_by_month = monthly(DailyStats.objects.filter(vendedor=request.user))
     
     # Preparar datos para JSON
     sales_chart_labels = [data['month'].strftime('%b %Y') for data in sales_by_month]
     sales_chart_revenue = [float(data['revenue'] or 0) for data in sales_by_month]
     
     # Datos para gráfico de estados de pedidos
-    orders_by_status = sales_orders.values('estado').annotate(
-        count=Count('id')
-    ).order_by('estado')
+    orders_by_status = [
+        {'estado': estado, 'count': fila['pedidos']}
+        for estado, fila in sorted(ventas.items()) if fila['pedidos']
+    ]
     
     # Datos para gráfico de cultivos por categoría
     from inventory.models import Crop
@@ -95,10 +88,10 @@ def producer_dashboard(request):
         'recent_crops': recent_crops,
         
         # Datos para gráficos
-        'sales_by_month': list(sales_by_month),
+        'sales_by_month': sales_by_month,
         'sales_chart_labels': sales_chart_labels,
         'sales_chart_revenue': sales_chart_revenue,
-        'orders_by_status': list(orders_by_status),
+        'orders_by_status': orders_by_status,
         'crops_by_category': list(crops_by_category),
     }
     return render(request, 'inventory/producer_dashboard.html', context)
@@ -155,33 +148,18 @@ def crop_list_view(request):
     # Contar publicaciones
     total_publicaciones = sum(1 for crop in crops if crop.publicacion)
     
-    # Calcular cantidad total en kg (convertir todas las unidades)
-    from marketplace.models import Publication
-    CONVERSION_TO_KG = {
-        'kg': 1,
-        'toneladas': 1000,
-        'libras': 0.453592,
-        'arrobas': 11.502,
-        'unidades': None,  # No convertible
-        'cajas': None,     # No convertible
-        'bultos': None,    # No convertible
-    }
-    
-    cantidad_total_kg = 0
-    cantidad_no_convertible = {}
-    
-    for crop in crops:
-        factor = CONVERSION_TO_KG.get(crop.unidad_medida)
-        if factor is not None:
-            # Unidad convertible a kg
-            cantidad_total_kg += float(crop.cantidad_estimada) * factor
-        else:
-            # Unidad no convertible
-            unidad = crop.unidad_medida
-            cantidad = float(crop.cantidad_estimada)
-            if unidad not in cantidad_no_convertible:
-                cantidad_no_convertible[unidad] = 0
-            cantidad_no_convertible[unidad] += cantidad
+    # Calcular cantidad total en kg en la base de datos (ver core/units.py)
+    cantidad_total_kg = crops.aggregate(
+        total=Sum(units.expresion_a_kg('cantidad_estimada'))
+    )['total'] or 0
+    
+    # Unidades no convertibles, sumadas por unidad
+    cantidad_no_convertible = dict(
+        crops.filter(unidad_medida__in=units.UNIDADES_DISCRETAS)
+        .values_list('unidad_medida')
+        .annotate(total=Sum('cantidad_estimada'))
+        .order_by('unidad_medida')
+    )
     
     # Formatear unidades no convertibles
     unidades_no_convertibles_str = ""
@@ -296,8 +274,10 @@ def producer_sales_view(request):
     
     # Todas las órdenes del productor
     orders = Order.objects.filter(
-        publicacion__cultivo__productor=request.user
-    ).select_related('publicacion__cultivo', 'comprador')
+        vendedor=request.user
+    ).select_related('publicacion__cultivo', 'comprador').with_available_actions()
+    # Y su resumen diario (sales/rollups.py), con los mismos filtros, para las estadísticas
+    resumen = DailyStats.objects.filter(vendedor=request.user)
     
     # Aplicar filtros
     if form.is_valid():
@@ -312,65 +292,58 @@ def producer_sales_view(request):
                 Q(comprador__first_name__icontains=search) |
                 Q(comprador__last_name__icontains=search)
             )
+            resumen = resumen.filter(
+                Q(cultivo__nombre__icontains=search) |
+                Q(comprador__first_name__icontains=search) |
+                Q(comprador__last_name__icontains=search)
+            )
         
         if estado:
             orders = orders.filter(estado=estado)
+            resumen = resumen.filter(estado=estado)
         
         if fecha_desde:
             orders = orders.filter(created_at__date__gte=fecha_desde)
+            resumen = resumen.filter(dia__gte=fecha_desde)
         
         if fecha_hasta:
             orders = orders.filter(created_at__date__lte=fecha_hasta)
+            resumen = resumen.filter(dia__lte=fecha_hasta)
     
-    # Agregar acciones disponibles para cada pedido
-    orders_with_actions = []
-    for order in orders.order_by('-created_at'):
-        order.available_actions = order.get_available_actions_for_user(request.user)
-        orders_with_actions.append(order)
-    
-    # Estadísticas detalladas
-    total_orders = orders.count()
-    pending_orders = orders.filter(estado__in=['pendiente', 'confirmado']).count()
-    in_progress_orders = orders.filter(estado__in=['en_preparacion', 'enviado', 'en_transito']).count()
-    delivered_orders = orders.filter(estado='entregado').count()
-    completed_orders = orders.filter(estado='completado').count()
-    cancelled_orders = orders.filter(estado='cancelado').count()
+    # Estadísticas detalladas (una consulta agrupada sobre el resumen)
+    totales = totals_by_estado(resumen)
+    total_orders = count_in(totales)
+    pending_orders = count_in(totales, 'pendiente', 'confirmado')
+    in_progress_orders = count_in(totales, 'en_preparacion', 'enviado', 'en_transito')
+    delivered_orders = count_in(totales, 'entregado')
+    completed_orders = count_in(totales, 'completado')
+    cancelled_orders = count_in(totales, 'cancelado')
     
     # Ingresos
-    total_revenue = orders.filter(estado='completado').aggregate(total=Sum('precio_total'))['total'] or 0
-    pending_revenue = orders.filter(estado__in=['confirmado', 'en_preparacion', 'enviado', 'en_transito', 'entregado']).aggregate(total=Sum('precio_total'))['total'] or 0
+    total_revenue = amount_in(totales, 'completado')
+    pending_revenue = amount_in(totales, 'confirmado', 'en_preparacion', 'enviado', 'en_transito', 'entregado')
     
     # Estadísticas por producto
-    product_stats = orders.filter(estado='completado').values(
-        'publicacion__cultivo__nombre'
+    product_stats = resumen.filter(estado='completado').values(
+        'cultivo__nombre'
     ).annotate(
-        total_vendido=Sum('cantidad_acordada'),
-        total_ingresos=Sum('precio_total'),
-        num_pedidos=Count('id')
+        total_vendido=Sum('cantidad'),
+        total_ingresos=Sum('monto'),
+        num_pedidos=Sum('pedidos')
     ).order_by('-total_ingresos')[:5]
     
     # Estadísticas por mes (últimos 6 meses)
-    from datetime import timedelta
-    from django.utils import timezone
-    from django.db.models.functions import TruncMonth
-    
-    six_months_ago = timezone.now() - timedelta(days=180)
-    monthly_stats = orders.filter(
-        created_at__gte=six_months_ago,
-        estado='completado'
-    ).annotate(
-        month=TruncMonth('created_at')
-    ).values('month').annotate(
-        total_ventas=Count('id'),
-        total_ingresos=Sum('precio_total')
-    ).order_by('month')
+    monthly_stats = [
+        {'month': mes['month'], 'total_ventas': mes['count'], 'total_ingresos': mes['revenue']}
+        for mes in monthly(resumen, estado='completado')
+    ]
     
     # Top compradores
-    top_buyers = orders.filter(estado='completado').values(
+    top_buyers = resumen.filter(estado='completado').values(
         'comprador__first_name', 'comprador__last_name', 'comprador__id'
     ).annotate(
-        total_pedidos=Count('id'),
-        total_gastado=Sum('precio_total')
+        total_pedidos=Sum('pedidos'),
+        total_gastado=Sum('monto')
     ).order_by('-total_gastado')[:5]
     
     # Pedidos que requieren atención
@@ -388,14 +361,21 @@ def producer_sales_view(request):
         calificado=request.user
     ).select_related('calificador', 'pedido').order_by('-created_at')[:5]
     
-    # Paginación para todos los pedidos
-    from django.core.paginator import Paginator
-    paginator = Paginator(orders_with_actions, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Paginación por cursor para todos los pedidos; acciones solo para los de la página
+    from core.pagination import KeysetPaginator, cursor_querystring
+    from sales.models import ORDER_PAGE_KEYS, ORDER_PAGE_SIZE
+    page = KeysetPaginator(orders, ORDER_PAGE_KEYS, ORDER_PAGE_SIZE).get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    for order in page.object_list:
+        order.available_actions = order.get_available_actions_for_user(request.user)
     
     context = {
-        'orders': page_obj,
+        'orders': page.object_list,
+        'page': page,
+        'total_pedidos': total_orders,
+        'filter_querystring': cursor_querystring(request),
         'form': form,
         'profile': profile,
         
@@ -25,7 +25,7 @@ class PublicationImageInline(admin.TabularInline):
 class PublicationAdmin(admin.ModelAdmin):
     list_display = ('cultivo_info', 'productor_info', 'precio_por_unidad', 'cantidad_disponible', 'estado', 'estado_badge', 'created_at')
     list_filter = ('estado', 'created_at')
-    search_fields = ('cultivo__nombre', 'cultivo__productor__first_name', 'cultivo__productor__last_name')
+    search_fields = ('cultivo__nombre', 'productor__first_name', 'productor__last_name')
     list_editable = ('estado',)
     date_hierarchy = 'created_at'
     ordering = ('-created_at',)
@@ -49,7 +49,7 @@ class PublicationAdmin(admin.ModelAdmin):
     cultivo_info.short_description = 'Cultivo'
     
     def productor_info(self, obj):
-        return f"{obj.cultivo.productor.first_name} {obj.cultivo.productor.last_name}"
+        return f"{obj.productor.first_name} {obj.productor.last_name}"
     productor_info.short_description = 'Productor'
     
     def estado_badge(self, obj):
@@ -67,7 +67,7 @@ class PublicationAdmin(admin.ModelAdmin):
     estado_badge.short_description = 'Estado Visual'
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('cultivo__productor')
+        return super().get_queryset(request).select_related('cultivo', 'productor')
 
 # Acciones personalizadas
 @admin.action(description='Marcar publicaciones como disponibles')
@@ -0,0 +1,120 @@
+"""
+Caché de las tarjetas del marketplace ya renderizadas.
+
+Cada publicación tiene un sello de versión en la caché; la tarjeta se guarda
+bajo una clave que incluye ese sello. Las señales de Publication,
+PublicationImage, Crop, ProducerProfile y del usuario productor renuevan el
+sello (ver marketplace.signals), de modo que la tarjeta anterior deja de leerse
+sin tener que borrarla. Con la caché caliente una página se arma con dos
+lecturas de caché y sin recorrer cultivo, productor ni imágenes.
+
+Renovar cualquier sello renueva también el del listado, que usa la caché de
+páginas completas (ver marketplace.page_cache).
+
+Funciona con cualquier backend de caché de Django (memoria local o archivos).
+"""
+import time
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+CARD_TEMPLATE = 'marketplace/_publication_card.html'
+CARD_CACHE_TIMEOUT = 60 * 60 * 24
+CARD_VERSION_TIMEOUT = None  # El sello no expira; la tarjeta sí
+
+
+LISTING_VERSION_KEY = 'marketplace:listado-version'
+
+
+def _version_key(publication_id):
+    return f'marketplace:tarjeta-version:{publication_id}'
+
+
+def _card_key(publication_id, version):
+    return f'marketplace:tarjeta:{publication_id}:{version}'
+
+
+def _new_version():
+    # Un sello basado en el reloj nunca repite uno anterior, aunque la caché
+    # haya descartado el sello vigente
+    return time.time_ns()
+
+
+def bump_card_versions(publication_ids):
+    """Invalida las tarjetas de las publicaciones dadas"""
+    publication_ids = list(publication_ids)
+    if not publication_ids:
+        return
+    version = _new_version()
+    versiones = {_version_key(pk): version for pk in publication_ids}
+    versiones[LISTING_VERSION_KEY] = version
+    cache.set_many(versiones, CARD_VERSION_TIMEOUT)
+
+
+def bump_producer_card_versions(productor_id):
+    """
+    Invalida las tarjetas de todas las publicaciones del productor. Para los
+    cambios de su perfil hechos con update(), que no disparan post_save.
+    """
+    from .models import Publication
+
+    bump_card_versions(Publication.objects.filter(productor_id=productor_id).values_list('id', flat=True))
+
+
+def get_publication_versions(publication_ids):
+    """Sellos vigentes {id: versión}; asigna uno nuevo a las que no lo tienen"""
+    publication_ids = list(publication_ids)
+    guardadas = cache.get_many([_version_key(pk) for pk in publication_ids])
+    versiones = {}
+    nuevas = {}
+    for pk in publication_ids:
+        version = guardadas.get(_version_key(pk))
+        if version is None:
+            version = _new_version()
+            nuevas[_version_key(pk)] = version
+        versiones[pk] = version
+    if nuevas:
+        cache.set_many(nuevas, CARD_VERSION_TIMEOUT)
+    return versiones
+
+
+def get_listing_version():
+    """Sello del listado: cambia con cualquier publicación"""
+    version = cache.get(LISTING_VERSION_KEY)
+    if version is None:
+        version = _new_version()
+        cache.add(LISTING_VERSION_KEY, version, CARD_VERSION_TIMEOUT)
+        version = cache.get(LISTING_VERSION_KEY, version)
+    return version
+
+
+def render_publication_cards(publications, before_render=None):
+    """
+    Asigna `card_html` a cada publicación, leyendo de la caché las tarjetas
+    vigentes y renderizando solo las que faltan. `before_render` recibe la
+    lista de publicaciones a renderizar (p. ej. para precargar sus imágenes).
+    """
+    publications = list(publications)
+    if not publications:
+        return publications
+
+    versiones = get_publication_versions(p.pk for p in publications)
+    claves = {pk: _card_key(pk, version) for pk, version in versiones.items()}
+
+    tarjetas = cache.get_many(list(claves.values()))
+    faltantes = [p for p in publications if claves[p.pk] not in tarjetas]
+
+    if faltantes:
+        if before_render is not None:
+            before_render(faltantes)
+        renderizadas = {
+            claves[p.pk]: render_to_string(CARD_TEMPLATE, {'pub': p})
+            for p in faltantes
+        }
+        cache.set_many(renderizadas, CARD_CACHE_TIMEOUT)
+        tarjetas.update(renderizadas)
+
+    for publication in publications:
+        publication.card_html = mark_safe(tarjetas[claves[publication.pk]])
+    return publications
@@ -0,0 +1,173 @@
+"""
+Conteos por faceta para el panel de filtros del marketplace.
+
+PublicationFacet guarda, para las publicaciones activas con existencias, cuántas
+hay por categoría del cultivo, por departamento, por ciudad y por rango de
+precio normalizado. Los conteos se ajustan con incrementos atómicos desde las
+señales de Publication y Crop (ver marketplace.signals), y la vista los lee de
+la caché sin ejecutar agregaciones. El comando rebuild_facets corrige cualquier
+desviación recalculando todo.
+"""
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+FACETS_CACHE_KEY = 'marketplace:facetas'
+FACETS_CACHE_TIMEOUT = 60 * 60
+
+FACET_CATEGORIA = 'categoria'
+FACET_DEPARTAMENTO = 'departamento'
+FACET_CIUDAD = 'ciudad'
+FACET_PRECIO = 'precio'
+
+# Rangos de precio por kg (mínimo, máximo); las unidades discretas van aparte
+PRICE_BUCKETS = [
+    (Decimal('0'), Decimal('2000')),
+    (Decimal('2000'), Decimal('5000')),
+    (Decimal('5000'), Decimal('10000')),
+    (Decimal('10000'), Decimal('20000')),
+    (Decimal('20000'), None),
+]
+PRICE_BUCKET_DISCRETA = 'discreta'
+
+# Campos de Publication que determinan sus facetas
+TRACKED_FIELDS = (
+    'estado', 'cantidad_disponible', 'departamento', 'ciudad',
+    'precio_normalizado', 'es_unidad_discreta', 'cultivo_id',
+)
+
+
+def price_bucket_value(minimo, maximo):
+    if maximo is None:
+        return f'{minimo:f}+'
+    return f'{minimo:f}-{maximo:f}'
+
+
+def price_bucket(precio_normalizado, es_unidad_discreta):
+    """Rango de precio al que pertenece una publicación"""
+    if es_unidad_discreta:
+        return PRICE_BUCKET_DISCRETA
+    precio = Decimal(str(precio_normalizado or 0))
+    for minimo, maximo in PRICE_BUCKETS:
+        if maximo is None or precio < maximo:
+            return price_bucket_value(minimo, maximo)
+    return price_bucket_value(*PRICE_BUCKETS[-1])
+
+
+def is_listed(estado, cantidad_disponible):
+    """True si la publicación aparece en el marketplace"""
+    return estado == 'Activa' and Decimal(str(cantidad_disponible or 0)) > 0
+
+
+def facet_keys(state, categoria):
+    """Conjunto de (faceta, valor) a los que suma una publicación en el estado dado"""
+    if state is None or not is_listed(state['estado'], state['cantidad_disponible']):
+        return set()
+    keys = {(FACET_PRECIO, price_bucket(state['precio_normalizado'], state['es_unidad_discreta']))}
+    if categoria:
+        keys.add((FACET_CATEGORIA, categoria))
+    return keys | location_keys(state['departamento'], state['ciudad'])
+
+
+def location_keys(departamento, ciudad):
+    """Facetas de ubicación de un par (departamento, ciudad)"""
+    keys = set()
+    if departamento:
+        keys.add((FACET_DEPARTAMENTO, departamento))
+        if ciudad:
+            keys.add((FACET_CIUDAD, f"{ciudad}, {departamento}"))
+    return keys
+
+
+def publication_state(publication):
+    """Valores actuales de los campos que determinan las facetas"""
+    return {field: getattr(publication, field) for field in TRACKED_FIELDS}
+
+
+def increment_facet(facet, value, delta):
+    """Suma `delta` al conteo de una faceta de forma atómica"""
+    from .models import PublicationFacet
+
+    if not delta:
+        return
+    updated = PublicationFacet.objects.filter(facet=facet, value=value).update(total=F('total') + delta)
+    if not updated and delta > 0:
+        facet_row, created = PublicationFacet.objects.get_or_create(
+            facet=facet, value=value, defaults={'total': delta}
+        )
+        if not created:
+            PublicationFacet.objects.filter(pk=facet_row.pk).update(total=F('total') + delta)
+
+
+def apply_facet_changes(old_keys, new_keys, amount=1):
+    """Aplica la diferencia entre las facetas anteriores y las nuevas"""
+    if old_keys == new_keys:
+        return
+    for facet, value in old_keys - new_keys:
+        increment_facet(facet, value, -amount)
+    for facet, value in new_keys - old_keys:
+        increment_facet(facet, value, amount)
+    cache.delete(FACETS_CACHE_KEY)
+
+
+def rebuild_facets(Publication=None, PublicationFacet=None):
+    """
+    Recalcula todos los conteos desde las publicaciones. Retorna las filas creadas.
+    Las migraciones pasan sus modelos históricos.
+    """
+    if Publication is None or PublicationFacet is None:
+        from .models import Publication, PublicationFacet
+
+    activas = Publication.objects.filter(estado='Activa', cantidad_disponible__gt=0)
+    conteos = {}
+
+    for fila in activas.values('cultivo__categoria').annotate(total=Count('id')):
+        if fila['cultivo__categoria']:
+            conteos[(FACET_CATEGORIA, fila['cultivo__categoria'])] = fila['total']
+
+    ubicaciones = activas.exclude(departamento='').values('departamento', 'ciudad').annotate(total=Count('id'))
+    for fila in ubicaciones:
+        key = (FACET_DEPARTAMENTO, fila['departamento'])
+        conteos[key] = conteos.get(key, 0) + fila['total']
+        if fila['ciudad']:
+            conteos[(FACET_CIUDAD, f"{fila['ciudad']}, {fila['departamento']}")] = fila['total']
+
+    # Todos los rangos de precio en una sola agregación condicional
+    rangos = {PRICE_BUCKET_DISCRETA: Count('id', filter=Q(es_unidad_discreta=True))}
+    for minimo, maximo in PRICE_BUCKETS:
+        condicion = Q(es_unidad_discreta=False, precio_normalizado__gte=minimo)
+        if maximo is not None:
+            condicion &= Q(precio_normalizado__lt=maximo)
+        rangos[price_bucket_value(minimo, maximo)] = Count('id', filter=condicion)
+    for value, total in activas.aggregate(**rangos).items():
+        if total:
+            conteos[(FACET_PRECIO, value)] = total
+
+    with transaction.atomic():
+        PublicationFacet.objects.all().delete()
+        PublicationFacet.objects.bulk_create([
+            PublicationFacet(facet=facet, value=value, total=total)
+            for (facet, value), total in conteos.items()
+        ])
+    cache.delete(FACETS_CACHE_KEY)
+    return len(conteos)
+
+
+def get_facet_counts():
+    """Diccionario {faceta: {valor: total}} servido desde la caché"""
+    from .models import PublicationFacet
+
+    facetas = cache.get(FACETS_CACHE_KEY)
+    if facetas is None:
+        facetas = {
+            FACET_CATEGORIA: {},
+            FACET_DEPARTAMENTO: {},
+            FACET_CIUDAD: {},
+            FACET_PRECIO: {},
+        }
+        for facet, value, total in PublicationFacet.objects.filter(total__gt=0).values_list('facet', 'value', 'total'):
+            facetas.setdefault(facet, {})[value] = total
+        cache.set(FACETS_CACHE_KEY, facetas, FACETS_CACHE_TIMEOUT)
+    return facetas
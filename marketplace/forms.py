@@ -269,7 +269,7 @@ class AdminPublicationForm(forms.ModelForm):
         
         # Si estamos editando, cargar los cultivos y fincas del productor actual
         if self.instance and self.instance.pk and self.instance.cultivo:
-            producer = self.instance.cultivo.productor
+            producer = self.instance.productor
             crops = producer.cultivos.all()
             farms = Farm.objects.filter(propietario=producer, activa=True)
             
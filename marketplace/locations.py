@@ -0,0 +1,75 @@
+"""
+Ubicaciones disponibles para el filtro del marketplace.
+
+La tabla PublicationLocation guarda cada par (departamento, ciudad) con su
+cantidad de publicaciones activas. Se actualiza solo para los pares afectados
+cuando cambia una publicación o una finca, y la lista que ve el usuario se
+sirve desde la caché.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+LOCATIONS_CACHE_KEY = 'marketplace:ubicaciones'
+LOCATIONS_CACHE_TIMEOUT = 60 * 60
+
+
+def _publicaciones_activas():
+    from .models import Publication
+    return Publication.objects.filter(estado='Activa', cantidad_disponible__gt=0)
+
+
+def refresh_locations(pairs):
+    """Recalcula el conteo de los pares (departamento, ciudad) indicados"""
+    from .models import PublicationLocation
+
+    for departamento, ciudad in set(pairs):
+        if not departamento or not ciudad:
+            continue
+        total = _publicaciones_activas().filter(departamento=departamento, ciudad=ciudad).count()
+        if total:
+            PublicationLocation.objects.update_or_create(
+                departamento=departamento, ciudad=ciudad,
+                defaults={'total_publicaciones': total},
+            )
+        else:
+            PublicationLocation.objects.filter(departamento=departamento, ciudad=ciudad).delete()
+    cache.delete(LOCATIONS_CACHE_KEY)
+
+
+def rebuild_locations():
+    """Reconstruye toda la tabla de ubicaciones con una sola agregación"""
+    from .models import PublicationLocation
+
+    filas = (
+        _publicaciones_activas()
+        .exclude(departamento='').exclude(ciudad='')
+        .values('departamento', 'ciudad')
+        .annotate(total=Count('id'))
+    )
+    with transaction.atomic():
+        PublicationLocation.objects.all().delete()
+        PublicationLocation.objects.bulk_create([
+            PublicationLocation(
+                departamento=fila['departamento'],
+                ciudad=fila['ciudad'],
+                total_publicaciones=fila['total'],
+            )
+            for fila in filas
+        ])
+    cache.delete(LOCATIONS_CACHE_KEY)
+    return PublicationLocation.objects.count()
+
+
+def get_marketplace_locations():
+    """Lista de ubicaciones 'Ciudad, Departamento' con publicaciones activas"""
+    from .models import PublicationLocation
+
+    ubicaciones = cache.get(LOCATIONS_CACHE_KEY)
+    if ubicaciones is None:
+        ubicaciones = [
+            location.display
+            for location in PublicationLocation.objects.filter(total_publicaciones__gt=0)
+        ]
+        cache.set(LOCATIONS_CACHE_KEY, ubicaciones, LOCATIONS_CACHE_TIMEOUT)
+    return ubicaciones
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from marketplace.facets import rebuild_facets
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los conteos por faceta (categoría, ubicación y precio) del marketplace'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('Recalculando facetas del marketplace...'))
+        total = rebuild_facets()
+        self.stdout.write(self.style.SUCCESS(f'{total} valores de faceta con publicaciones activas.'))
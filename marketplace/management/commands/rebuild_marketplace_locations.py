@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from marketplace.locations import rebuild_locations
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye la tabla de ubicaciones usada por el filtro del marketplace'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('Reconstruyendo ubicaciones del marketplace...'))
+        total = rebuild_locations()
+        self.stdout.write(self.style.SUCCESS(f'{total} ubicaciones con publicaciones activas.'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from marketplace.models import Publication
+from marketplace.search import update_search_index
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda de las publicaciones del marketplace'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Cantidad de publicaciones procesadas por lote (por defecto 500)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('Reconstruyendo índice de búsqueda...'))
+        total = update_search_index(Publication.objects.all(), batch_size=options['batch_size'], force=True)
+        self.stdout.write(self.style.SUCCESS(f'Índice reconstruido para {total} publicaciones.'))
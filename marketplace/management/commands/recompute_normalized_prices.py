@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from marketplace.models import Publication
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el precio normalizado (por kg o por unidad discreta) de todas las publicaciones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Cantidad de publicaciones actualizadas por lote (por defecto 500)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        self.stdout.write(self.style.WARNING('Recalculando precios normalizados...'))
+
+        publications = Publication.objects.only(
+            'id', 'precio_por_unidad', 'unidad_medida', 'precio_normalizado', 'es_unidad_discreta'
+        )
+        pendientes = []
+        updated_count = 0
+        for publication in publications.iterator(chunk_size=batch_size):
+            precio, discreta = Publication.calcular_precio_normalizado(
+                publication.precio_por_unidad, publication.unidad_medida
+            )
+            if precio != publication.precio_normalizado or discreta != publication.es_unidad_discreta:
+                publication.precio_normalizado = precio
+                publication.es_unidad_discreta = discreta
+                pendientes.append(publication)
+            if len(pendientes) >= batch_size:
+                Publication.objects.bulk_update(pendientes, ['precio_normalizado', 'es_unidad_discreta'])
+                updated_count += len(pendientes)
+                pendientes = []
+
+        if pendientes:
+            Publication.objects.bulk_update(pendientes, ['precio_normalizado', 'es_unidad_discreta'])
+            updated_count += len(pendientes)
+
+        self.stdout.write(self.style.SUCCESS(f'{updated_count} publicaciones actualizadas.'))
@@ -0,0 +1,109 @@
+"""
+Prueba de carga del descuento atómico de stock (marketplace/stock.py).
+
+Crea una publicación temporal, lanza descuentos concurrentes desde varios hilos
+y/o procesos, verifica que el stock nunca quede negativo ni se venda de más y
+borra la publicación al terminar. Pensado para PostgreSQL; SQLite serializa
+las escrituras y puede responder "database is locked".
+"""
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from inventory.models import Crop
+from marketplace.models import Publication, StockMovement
+from marketplace.stock import descontar_stock
+
+
+def _trabajador(publication_id, intentos, cantidad):
+    """Descuenta `intentos` veces; retorna cuántos descuentos se aplicaron"""
+    aplicados = 0
+    try:
+        for _ in range(intentos):
+            if descontar_stock(publication_id, cantidad, tipo='ajuste'):
+                aplicados += 1
+    finally:
+        connections.close_all()
+    return aplicados
+
+
+def _hilos(publication_id, hilos, intentos, cantidad):
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        futuros = [
+            executor.submit(_trabajador, publication_id, intentos, cantidad)
+            for _ in range(hilos)
+        ]
+        return sum(f.result() for f in futuros)
+
+
+def _proceso(args):
+    return _hilos(*args)
+
+
+class Command(BaseCommand):
+    help = 'Descuenta stock en paralelo desde hilos y procesos y verifica que nunca quede negativo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cultivo', type=int, required=True,
+                            help='ID del cultivo para la publicación temporal')
+        parser.add_argument('--stock', type=Decimal, default=Decimal('100'))
+        parser.add_argument('--cantidad', type=Decimal, default=Decimal('1'),
+                            help='Cantidad de cada descuento')
+        parser.add_argument('--procesos', type=int, default=1)
+        parser.add_argument('--hilos', type=int, default=8, help='Hilos por proceso')
+        parser.add_argument('--intentos', type=int, default=50, help='Descuentos por hilo')
+
+    def handle(self, *args, **options):
+        try:
+            cultivo = Crop.objects.get(pk=options['cultivo'])
+        except Crop.DoesNotExist:
+            raise CommandError('El cultivo no existe')
+
+        publication = Publication.objects.create(
+            cultivo=cultivo,
+            unidad_medida=cultivo.unidad_medida,
+            precio_por_unidad=Decimal('1'),
+            cantidad_disponible=options['stock'],
+            cantidad_minima=Decimal('0.01'),
+            estado='Pausada',  # No aparece en el marketplace durante la prueba
+        )
+        procesos, hilos, intentos = options['procesos'], options['hilos'], options['intentos']
+        cantidad = options['cantidad']
+        solicitados = procesos * hilos * intentos
+
+        self.stdout.write(self.style.WARNING(
+            f'{procesos} proceso(s) x {hilos} hilo(s) x {intentos} descuentos de {cantidad} '
+            f'sobre un stock de {options["stock"]}...'
+        ))
+        try:
+            inicio = time.perf_counter()
+            if procesos == 1:
+                aplicados = _hilos(publication.pk, hilos, intentos, cantidad)
+            else:
+                # Cada proceso abre sus propias conexiones
+                connections.close_all()
+                with multiprocessing.get_context('fork').Pool(procesos) as pool:
+                    aplicados = sum(pool.map(
+                        _proceso, [(publication.pk, hilos, intentos, cantidad)] * procesos
+                    ))
+            duracion = time.perf_counter() - inicio
+
+            publication.refresh_from_db()
+            esperados = min(solicitados, int(options['stock'] // cantidad))
+            movimientos = StockMovement.objects.filter(publication=publication).count()
+
+            self.stdout.write(
+                f'Descuentos aplicados: {aplicados} de {solicitados} '
+                f'({solicitados / duracion:.0f} intentos/s)\n'
+                f'Stock final: {publication.cantidad_disponible} | Estado: {publication.estado} | '
+                f'Movimientos registrados: {movimientos}'
+            )
+            if publication.cantidad_disponible < 0 or aplicados != esperados or movimientos != aplicados:
+                raise CommandError(f'Inconsistencia: se esperaban {esperados} descuentos')
+            self.stdout.write(self.style.SUCCESS('El stock nunca quedó negativo ni se vendió de más.'))
+        finally:
+            publication.delete()
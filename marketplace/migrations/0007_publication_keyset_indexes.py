@@ -0,0 +1,21 @@
+# Generated by Django 4.2.24 on 2026-10-18 04:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0006_migrate_existing_images'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='publication',
+            index=models.Index(fields=['estado', '-created_at', '-id'], name='marketplace_estado_76b4dd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publication',
+            index=models.Index(fields=['estado', 'precio_por_unidad', 'id'], name='marketplace_estado_761b7a_idx'),
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 4.2.24 on 2026-10-18 04:50
+
+import unicodedata
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+def _normalizar(texto):
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.split()).lower()
+
+
+def create_search_indexes(apps, schema_editor):
+    """Crea los índices GIN (tsvector y pg_trgm) solo en PostgreSQL"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS marketplace_pub_search_vector_gin '
+        'ON marketplace_publication USING gin (search_vector);'
+    )
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS marketplace_pub_search_document_trgm '
+        'ON marketplace_publication USING gin (search_document gin_trgm_ops);'
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS marketplace_pub_search_vector_gin;')
+    schema_editor.execute('DROP INDEX IF EXISTS marketplace_pub_search_document_trgm;')
+
+
+def populate_search_documents(apps, schema_editor):
+    """Construye el documento de búsqueda de las publicaciones existentes"""
+    Publication = apps.get_model('marketplace', 'Publication')
+
+    publications = Publication.objects.select_related('cultivo__productor')
+    for publication in publications.iterator():
+        cultivo = publication.cultivo
+        productor = cultivo.productor if cultivo else None
+        partes = [
+            cultivo.nombre if cultivo else '',
+            productor.first_name if productor else '',
+            productor.last_name if productor else '',
+            publication.descripcion,
+        ]
+        publication.search_document = _normalizar(' '.join(p for p in partes if p))
+        publication.save(update_fields=['search_document'])
+
+    if schema_editor.connection.vendor == 'postgresql':
+        Publication.objects.update(
+            search_vector=django.contrib.postgres.search.SearchVector('search_document', config='spanish')
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0007_publication_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publication',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Documento de Búsqueda'),
+        ),
+        migrations.AddField(
+            model_name='publication',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        # pg_trgm solo se instala en PostgreSQL (la operación no hace nada en otros motores)
+        TrigramExtension(),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+        migrations.RunPython(populate_search_documents, migrations.RunPython.noop),
+    ]
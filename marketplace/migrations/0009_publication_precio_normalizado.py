@@ -0,0 +1,54 @@
+# Generated by Django 4.2.24 on 2026-10-18 04:36
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+
+# Copia de Publication.CONVERSION_TO_KG al momento de la migración
+CONVERSION_TO_KG = {
+    'kg': 1,
+    'libras': 0.453592,
+    'arrobas': 11.502,
+    'toneladas': 1000,
+}
+
+
+def populate_precio_normalizado(apps, schema_editor):
+    """Calcula el precio normalizado de las publicaciones existentes"""
+    Publication = apps.get_model('marketplace', 'Publication')
+
+    for publication in Publication.objects.only('id', 'precio_por_unidad', 'unidad_medida').iterator():
+        precio = Decimal(str(publication.precio_por_unidad or 0))
+        factor = CONVERSION_TO_KG.get(publication.unidad_medida)
+        if factor is None:
+            publication.es_unidad_discreta = True
+        else:
+            precio = precio / Decimal(str(factor))
+            publication.es_unidad_discreta = False
+        publication.precio_normalizado = precio.quantize(Decimal('0.0001'), rounding=ROUND_HALF_UP)
+        publication.save(update_fields=['precio_normalizado', 'es_unidad_discreta'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0008_publication_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publication',
+            name='es_unidad_discreta',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Unidad Discreta'),
+        ),
+        migrations.AddField(
+            model_name='publication',
+            name='precio_normalizado',
+            field=models.DecimalField(decimal_places=4, default=0, editable=False, max_digits=14, verbose_name='Precio Normalizado (por kg o por unidad)'),
+        ),
+        migrations.AddIndex(
+            model_name='publication',
+            index=models.Index(fields=['estado', 'es_unidad_discreta', 'precio_normalizado', 'id'], name='marketplace_estado_479a59_idx'),
+        ),
+        migrations.RunPython(populate_precio_normalizado, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 4.2.24 on 2026-10-18 04:38
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_locations(apps, schema_editor):
+    """Calcula la ubicación para mostrar y la tabla de ubicaciones existentes"""
+    Publication = apps.get_model('marketplace', 'Publication')
+    PublicationLocation = apps.get_model('marketplace', 'PublicationLocation')
+    ProducerProfile = apps.get_model('accounts', 'ProducerProfile')
+
+    perfiles = {
+        profile.user_id: profile
+        for profile in ProducerProfile.objects.only('user_id', 'ciudad', 'departamento')
+    }
+    for publication in Publication.objects.select_related('cultivo').iterator():
+        if publication.ciudad and publication.departamento:
+            ubicacion = f"{publication.ciudad}, {publication.departamento}"
+        else:
+            profile = perfiles.get(publication.cultivo.productor_id) if publication.cultivo else None
+            if profile is None:
+                ubicacion = "Productor sin perfil"
+            elif profile.ciudad and profile.departamento:
+                ubicacion = f"{profile.ciudad}, {profile.departamento}"
+            else:
+                ubicacion = "Ubicación no especificada"
+        publication.ubicacion_display = ubicacion
+        publication.save(update_fields=['ubicacion_display'])
+
+    filas = (
+        Publication.objects.filter(estado='Activa', cantidad_disponible__gt=0)
+        .exclude(departamento='').exclude(ciudad='')
+        .values('departamento', 'ciudad')
+        .annotate(total=Count('id'))
+    )
+    PublicationLocation.objects.bulk_create([
+        PublicationLocation(
+            departamento=fila['departamento'],
+            ciudad=fila['ciudad'],
+            total_publicaciones=fila['total'],
+        )
+        for fila in filas
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_add_pais_field'),
+        ('marketplace', '0009_publication_precio_normalizado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PublicationLocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('departamento', models.CharField(max_length=100, verbose_name='Departamento')),
+                ('ciudad', models.CharField(max_length=100, verbose_name='Ciudad/Municipio')),
+                ('total_publicaciones', models.PositiveIntegerField(default=0, verbose_name='Publicaciones Activas')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Ubicación del Marketplace',
+                'verbose_name_plural': 'Ubicaciones del Marketplace',
+                'ordering': ['departamento', 'ciudad'],
+            },
+        ),
+        migrations.AddField(
+            model_name='publication',
+            name='ubicacion_display',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255, verbose_name='Ubicación para Mostrar'),
+        ),
+        migrations.AddIndex(
+            model_name='publication',
+            index=models.Index(fields=['departamento', 'ciudad'], name='marketplace_departa_653055_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='publicationlocation',
+            unique_together={('departamento', 'ciudad')},
+        ),
+        migrations.RunPython(populate_locations, migrations.RunPython.noop),
+    ]
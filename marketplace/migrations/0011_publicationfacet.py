@@ -0,0 +1,39 @@
+# Generated by Django 4.2.24 on 2026-10-18 04:41
+
+from django.db import migrations, models
+
+
+def populate_facets(apps, schema_editor):
+    """Calcula los conteos por faceta de las publicaciones existentes"""
+    from marketplace.facets import rebuild_facets
+
+    rebuild_facets(
+        apps.get_model('marketplace', 'Publication'),
+        apps.get_model('marketplace', 'PublicationFacet'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0010_publication_ubicacion_display'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PublicationFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(choices=[('categoria', 'Categoría'), ('departamento', 'Departamento'), ('ciudad', 'Ciudad'), ('precio', 'Rango de Precio')], max_length=20, verbose_name='Faceta')),
+                ('value', models.CharField(max_length=255, verbose_name='Valor')),
+                ('total', models.IntegerField(default=0, verbose_name='Publicaciones')),
+            ],
+            options={
+                'verbose_name': 'Faceta del Marketplace',
+                'verbose_name_plural': 'Facetas del Marketplace',
+                'ordering': ['facet', 'value'],
+                'unique_together': {('facet', 'value')},
+            },
+        ),
+        migrations.RunPython(populate_facets, migrations.RunPython.noop),
+    ]
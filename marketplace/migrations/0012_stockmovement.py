@@ -0,0 +1,56 @@
+# Generated by Django 4.2.24 on 2026-10-18 04:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_sales(apps, schema_editor):
+    """
+    Registra como venta los pedidos con pago aprobado anteriores al registro de
+    movimientos, para que al cancelarlos se restaure su stock.
+    """
+    Order = apps.get_model('sales', 'Order')
+    StockMovement = apps.get_model('marketplace', 'StockMovement')
+
+    pedidos = Order.objects.filter(
+        payment__status='approved', publicacion__isnull=False
+    ).exclude(estado='cancelado').values_list('id', 'publicacion_id', 'cantidad_acordada')
+    StockMovement.objects.bulk_create([
+        StockMovement(order_id=order_id, publication_id=publication_id, tipo='venta', cantidad=-cantidad)
+        for order_id, publication_id, cantidad in pedidos.iterator()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0004_add_qr_tokens'),
+        ('payments', '0002_migrate_to_mercadopago'),
+        ('marketplace', '0011_publicationfacet'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('venta', 'Venta'), ('restauracion', 'Restauración'), ('ajuste', 'Ajuste')], max_length=20, verbose_name='Tipo')),
+                ('cantidad', models.DecimalField(decimal_places=2, help_text='Negativa para salidas, positiva para entradas', max_digits=10, verbose_name='Cantidad')),
+                ('saldo', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Cantidad Disponible Resultante')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movimientos_stock', to='sales.order', verbose_name='Pedido')),
+                ('publication', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimientos_stock', to='marketplace.publication', verbose_name='Publicación')),
+            ],
+            options={
+                'verbose_name': 'Movimiento de Stock',
+                'verbose_name_plural': 'Movimientos de Stock',
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['publication', '-created_at'], name='marketplace_publica_8c4a8c_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='stockmovement',
+            constraint=models.UniqueConstraint(condition=models.Q(('order__isnull', False)), fields=('order', 'tipo'), name='unique_stock_movement_per_order'),
+        ),
+        migrations.RunPython(backfill_sales, migrations.RunPython.noop),
+    ]
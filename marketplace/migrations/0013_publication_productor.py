@@ -0,0 +1,35 @@
+# Generated by Django 4.2.24 on 2026-10-18 05:11
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_productor(apps, schema_editor):
+    Crop = apps.get_model('inventory', 'Crop')
+    Publication = apps.get_model('marketplace', 'Publication')
+    Publication.objects.update(
+        productor=models.Subquery(Crop.objects.filter(pk=models.OuterRef('cultivo_id')).values('productor_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('inventory', '0008_alter_crop_notas'),
+        ('marketplace', '0012_stockmovement'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publication',
+            name='productor',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='publicaciones', to=settings.AUTH_USER_MODEL, verbose_name='Productor'),
+        ),
+        migrations.AddIndex(
+            model_name='publication',
+            index=models.Index(fields=['productor', 'estado', '-created_at'], name='marketplace_product_b5a988_idx'),
+        ),
+        migrations.RunPython(backfill_productor, migrations.RunPython.noop),
+    ]
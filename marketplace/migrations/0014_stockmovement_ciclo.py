@@ -0,0 +1,31 @@
+# Generated by Django 4.2.24 on 2026-10-18 05:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0013_publication_productor'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='stockmovement',
+            name='unique_stock_movement_per_order',
+        ),
+        migrations.AddField(
+            model_name='stockmovement',
+            name='agoto_publicacion',
+            field=models.BooleanField(default=False, help_text='La venta pasó la publicación de Activa a Agotada', verbose_name='Agotó la publicación'),
+        ),
+        migrations.AddField(
+            model_name='stockmovement',
+            name='ciclo',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Restauraciones previas del pedido', verbose_name='Ciclo'),
+        ),
+        migrations.AddConstraint(
+            model_name='stockmovement',
+            constraint=models.UniqueConstraint(condition=models.Q(('order__isnull', False)), fields=('order', 'tipo', 'ciclo'), name='unique_stock_movement_per_order_cycle'),
+        ),
+    ]
@@ -1,11 +1,20 @@
+from decimal import Decimal, ROUND_HALF_UP
 from django.db import models
+from django.db.models import Prefetch, prefetch_related_objects
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
+from django.core.exceptions import ObjectDoesNotExist
 from core.models import BaseModel, Farm
+from core import units
 from inventory.models import Crop
 
 # Create your models here.
 class Publication(BaseModel):
     cultivo = models.ForeignKey(Crop, on_delete=models.CASCADE, related_name='publicaciones')
+    # Productor del cultivo (denormalizado, se copia en save() y se sincroniza
+    # desde el cultivo en marketplace.signals) para filtrar sin joins
+    productor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True,
+                                  editable=False, related_name='publicaciones', verbose_name="Productor")
     finca = models.ForeignKey(Farm, on_delete=models.SET_NULL, null=True, blank=True, 
                              related_name='publicaciones', verbose_name="Finca de Origen")
     
@@ -59,61 +68,115 @@ class Publication(BaseModel):
     
     imagen = models.ImageField(upload_to='publications/', blank=True, null=True, verbose_name="Imagen del Producto")
 
-    # Tabla de conversión a kilogramos (unidad base)
-    # Solo para unidades de peso
-    CONVERSION_TO_KG = {
-        'kg': 1,
-        'libras': 0.453592,
-        'arrobas': 11.502,  # 1 arroba = 25 libras = 11.502 kg
-        'toneladas': 1000,
-        # Unidades discretas no tienen conversión
-        'unidades': None,
-        'cajas': None,
-        'bultos': None,
-    }
+    # Índice de búsqueda (mantenido por marketplace.signals, ver marketplace/search.py).
+    # Los índices GIN solo existen en PostgreSQL y se crean en la migración 0008.
+    search_document = models.TextField(blank=True, default='', editable=False,
+                                       verbose_name="Documento de Búsqueda")
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
+
+    # Precio normalizado (denormalizado, se recalcula en save()): precio por kg para
+    # unidades de peso y precio por unidad para las discretas, que se ordenan aparte
+    precio_normalizado = models.DecimalField(max_digits=14, decimal_places=4, default=0, editable=False,
+                                             verbose_name="Precio Normalizado (por kg o por unidad)")
+    es_unidad_discreta = models.BooleanField(default=False, editable=False,
+                                             verbose_name="Unidad Discreta")
+
+    # Ubicación para mostrar (denormalizada, se recalcula en save() y se sincroniza
+    # desde la finca y el perfil del productor en marketplace.signals)
+    ubicacion_display = models.CharField(max_length=255, blank=True, default='', editable=False,
+                                         verbose_name="Ubicación para Mostrar")
+
+    class Meta:
+        indexes = [
+            # Índices para la paginación por cursor del marketplace
+            models.Index(fields=['estado', '-created_at', '-id']),
+            models.Index(fields=['estado', 'precio_por_unidad', 'id']),
+            # Filtros y orden de precio comparables entre unidades
+            models.Index(fields=['estado', 'es_unidad_discreta', 'precio_normalizado', 'id']),
+            models.Index(fields=['departamento', 'ciudad']),
+            # Listados del productor ("mis publicaciones")
+            models.Index(fields=['productor', 'estado', '-created_at']),
+        ]
+
+    # Tabla de conversión a kilogramos (unidad base), ver core/units.py
+    CONVERSION_TO_KG = units.CONVERSION_TO_KG
     
+    @classmethod
+    def calcular_precio_normalizado(cls, precio, unidad):
+        """
+        Retorna (precio_normalizado, es_unidad_discreta).
+        Para unidades de peso el precio se expresa por kg; las unidades discretas
+        conservan su precio por unidad.
+        """
+        precio = Decimal(str(precio or 0))
+        if not units.es_convertible(unidad):
+            return precio.quantize(Decimal('0.0001'), rounding=ROUND_HALF_UP), True
+        return units.convertir_precio(precio, unidad, 'kg', Decimal('0.0001')), False
+
+    def calcular_ubicacion_display(self):
+        """
+        Ubicación que se muestra en el marketplace: la de la finca de origen
+        (copiada en departamento/ciudad) o, si falta, la del perfil del productor.
+        """
+        if self.ciudad and self.departamento:
+            return f"{self.ciudad}, {self.departamento}"
+        productor = self.productor if self.productor_id else None
+        if productor is None:
+            return "Ubicación no especificada"
+        try:
+            profile = productor.producer_profile
+        except ObjectDoesNotExist:
+            return "Productor sin perfil"
+        if profile.ciudad and profile.departamento:
+            return profile.ciudad_departamento
+        return "Ubicación no especificada"
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+
+        # Recalcular los campos denormalizados solo si cambian sus fuentes
+        if update_fields is None or {'precio_por_unidad', 'unidad_medida'}.intersection(update_fields):
+            self.precio_normalizado, self.es_unidad_discreta = self.calcular_precio_normalizado(
+                self.precio_por_unidad, self.unidad_medida
+            )
+            if update_fields is not None:
+                update_fields |= {'precio_normalizado', 'es_unidad_discreta'}
+        if update_fields is None or 'cultivo' in update_fields:
+            productor_id = self.cultivo.productor_id if self.cultivo_id else None
+            # Los pedidos de la publicación copian este vendedor (sales.signals)
+            self._productor_cambiado = self.pk is not None and productor_id != self.productor_id
+            self.productor_id = productor_id
+            if update_fields is not None:
+                update_fields.add('productor')
+        if update_fields is None or {'departamento', 'ciudad', 'cultivo'}.intersection(update_fields):
+            self.ubicacion_display = self.calcular_ubicacion_display()
+            if update_fields is not None:
+                update_fields.add('ubicacion_display')
+
+        if update_fields is not None:
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
     @staticmethod
     def convertir_unidad(cantidad, unidad_origen, unidad_destino):
         """
         Convierte una cantidad de una unidad a otra.
-        Retorna cantidad_convertida o None si no es posible
+        Retorna cantidad_convertida (Decimal, 3 decimales) o None si no es posible
         """
-        # Si son la misma unidad, no hay conversión
-        if unidad_origen == unidad_destino:
-            return float(cantidad)
-        
-        # Obtener factores de conversión
-        factor_origen = Publication.CONVERSION_TO_KG.get(unidad_origen)
-        factor_destino = Publication.CONVERSION_TO_KG.get(unidad_destino)
-        
-        # Si alguna unidad no es convertible, retornar None
-        if factor_origen is None or factor_destino is None:
-            return None
-        
-        # Convertir a kg primero, luego a unidad destino
-        cantidad_kg = float(cantidad) * factor_origen
-        cantidad_convertida = cantidad_kg / factor_destino
-        
-        return round(cantidad_convertida, 3)
+        return units.convertir(cantidad, unidad_origen, unidad_destino)
     
     def obtener_precio_en_unidad(self, unidad_destino):
         """
         Retorna el precio por unidad convertido a la unidad destino.
         Ejemplo: Si vendo a $50,000/arroba y convierto a kg:
         1 arroba = 11.502 kg
-        Precio por kg = $50,000 / 11.502 = $4,346/kg
+        Precio por kg = $50,000 / 11.502 = $4,347.07/kg
         """
         if self.unidad_medida == unidad_destino:
-            return float(self.precio_por_unidad)
-        
-        # Convertir 1 unidad de origen a unidad destino
-        cantidad_convertida = self.convertir_unidad(1, self.unidad_medida, unidad_destino)
-        if cantidad_convertida is None:
-            return None
-        
-        # Precio en nueva unidad = precio original / cuántas unidades destino hay en 1 unidad origen
-        precio_convertido = float(self.precio_por_unidad) / cantidad_convertida
-        return round(precio_convertido, 2)
+            return self.precio_por_unidad
+        return units.convertir_precio(self.precio_por_unidad, self.unidad_medida, unidad_destino)
     
     def es_unidad_convertible(self):
         """
@@ -138,7 +201,7 @@ class Publication(BaseModel):
         Verifica si hay suficiente cantidad disponible.
         Convierte la cantidad solicitada a la unidad del vendedor para comparar.
         
-        Retorna (disponible: bool, cantidad_disponible_en_unidad_solicitada: float)
+        Retorna (disponible: bool, cantidad_disponible_en_unidad_solicitada: Decimal)
         """
         # Convertir cantidad solicitada a la unidad del vendedor
         cantidad_en_unidad_vendedor = self.convertir_unidad(
@@ -151,7 +214,7 @@ class Publication(BaseModel):
             return False, 0
         
         # Verificar si hay suficiente
-        disponible = cantidad_en_unidad_vendedor <= float(self.cantidad_disponible)
+        disponible = cantidad_en_unidad_vendedor <= self.cantidad_disponible
         
         # Convertir cantidad disponible a la unidad solicitada para mostrar al usuario
         cantidad_disponible_convertida = self.convertir_unidad(
@@ -170,10 +233,23 @@ class Publication(BaseModel):
     @property
     def ciudad_display(self):
         return f"{self.ciudad}, {self.departamento}"
+
+    @property
+    def display_location(self):
+        return self.ubicacion_display or "Ubicación no especificada"
     
+    @property
+    def _images_prefetched(self):
+        """True si las imágenes ya se cargaron con prefetch_images()"""
+        return 'images' in getattr(self, '_prefetched_objects_cache', {})
+
     @property
     def primary_image(self):
         """Retorna la imagen principal de la publicación"""
+        if self._images_prefetched:
+            images = list(self.images.all())
+            primary = next((image for image in images if image.is_primary), None)
+            return primary or (images[0] if images else None)
         primary = self.images.filter(is_primary=True).first()
         if primary:
             return primary
@@ -183,10 +259,18 @@ class Publication(BaseModel):
     @property
     def all_images(self):
         """Retorna todas las imágenes ordenadas"""
+        if self._images_prefetched:
+            # Queryset ya evaluado: .first, .count e iteración no consultan la BD
+            return self.images.all()
         return self.images.all().order_by('order', 'id')
 
+    @property
+    def image_count(self):
+        """Cantidad de imágenes de la publicación"""
+        return self.all_images.count()
+
     def __str__(self):
-        return f'{self.cultivo.nombre} por {self.cultivo.productor.username}'
+        return f'{self.cultivo.nombre} por {self.productor.username}'
 
 
 class PublicationImage(BaseModel):
@@ -233,3 +317,127 @@ class PublicationImage(BaseModel):
                 is_primary=True
             ).exclude(pk=self.pk).update(is_primary=False)
         super().save(*args, **kwargs)
+
+
+
+class PublicationLocation(models.Model):
+    """
+    Ubicaciones distintas (departamento, ciudad) con publicaciones activas.
+    Alimenta el filtro de ubicación del marketplace sin un DISTINCT sobre las
+    publicaciones; se mantiene desde marketplace.signals (ver marketplace/locations.py).
+    """
+    departamento = models.CharField(max_length=100, verbose_name="Departamento")
+    ciudad = models.CharField(max_length=100, verbose_name="Ciudad/Municipio")
+    total_publicaciones = models.PositiveIntegerField(default=0, verbose_name="Publicaciones Activas")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Ubicación del Marketplace"
+        verbose_name_plural = "Ubicaciones del Marketplace"
+        ordering = ['departamento', 'ciudad']
+        unique_together = ['departamento', 'ciudad']
+
+    def __str__(self):
+        return f"{self.ciudad}, {self.departamento} ({self.total_publicaciones})"
+
+    @property
+    def display(self):
+        return f"{self.ciudad}, {self.departamento}"
+
+
+
+class PublicationFacet(models.Model):
+    """
+    Conteo de publicaciones activas con existencias por valor de faceta
+    (categoría, departamento, ciudad o rango de precio). Se mantiene de forma
+    incremental desde marketplace.signals (ver marketplace/facets.py).
+    """
+    FACET_CHOICES = [
+        ('categoria', 'Categoría'),
+        ('departamento', 'Departamento'),
+        ('ciudad', 'Ciudad'),
+        ('precio', 'Rango de Precio'),
+    ]
+
+    facet = models.CharField(max_length=20, choices=FACET_CHOICES, verbose_name="Faceta")
+    value = models.CharField(max_length=255, verbose_name="Valor")
+    total = models.IntegerField(default=0, verbose_name="Publicaciones")
+
+    class Meta:
+        verbose_name = "Faceta del Marketplace"
+        verbose_name_plural = "Facetas del Marketplace"
+        ordering = ['facet', 'value']
+        unique_together = ['facet', 'value']
+
+    def __str__(self):
+        return f"{self.get_facet_display()}: {self.value} ({self.total})"
+
+
+class StockMovement(models.Model):
+    """
+    Registro de cada cambio de cantidad_disponible hecho por marketplace.stock.
+    Un pedido tiene a lo sumo una venta y una restauración por ciclo, lo que
+    evita descontar dos veces el mismo pago; restaurar cierra el ciclo y una
+    nueva aprobación abre el siguiente.
+    """
+    TIPO_CHOICES = [
+        ('venta', 'Venta'),
+        ('restauracion', 'Restauración'),
+        ('ajuste', 'Ajuste'),
+    ]
+
+    publication = models.ForeignKey(
+        Publication,
+        on_delete=models.CASCADE,
+        related_name='movimientos_stock',
+        verbose_name="Publicación"
+    )
+    order = models.ForeignKey(
+        'sales.Order',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='movimientos_stock',
+        verbose_name="Pedido"
+    )
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES, verbose_name="Tipo")
+    cantidad = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Cantidad",
+                                   help_text="Negativa para salidas, positiva para entradas")
+    saldo = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True,
+                                verbose_name="Cantidad Disponible Resultante")
+    ciclo = models.PositiveSmallIntegerField(default=0, verbose_name="Ciclo",
+                                             help_text="Restauraciones previas del pedido")
+    agoto_publicacion = models.BooleanField(default=False, verbose_name="Agotó la publicación",
+                                            help_text="La venta pasó la publicación de Activa a Agotada")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Movimiento de Stock"
+        verbose_name_plural = "Movimientos de Stock"
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['publication', '-created_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['order', 'tipo', 'ciclo'],
+                condition=models.Q(order__isnull=False),
+                name='unique_stock_movement_per_order_cycle',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} {self.cantidad} - Publicación #{self.publication_id}"
+
+
+def prefetch_images(publications):
+    """
+    Carga en una sola consulta las imágenes ordenadas de un lote de publicaciones
+    (una lista o un queryset ya evaluado, p. ej. una página del marketplace).
+    Después, all_images, primary_image e image_count no consultan la base de datos.
+    """
+    prefetch_related_objects(
+        list(publications),
+        Prefetch('images', queryset=PublicationImage.objects.order_by('order', 'id')),
+    )
+    return publications
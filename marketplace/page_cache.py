@@ -0,0 +1,106 @@
+"""
+Caché de páginas completas del marketplace para visitantes anónimos.
+
+Las respuestas GET de usuarios anónimos se guardan por vista y por query string
+normalizada. La clave incluye el sello de versión del listado o de la
+publicación (ver marketplace.cards), así que cualquier cambio que renueve el
+sello deja de servir la página anterior. Los usuarios autenticados siempre
+pasan directo a la vista.
+
+Las respuestas llevan ETag y Last-Modified para que el navegador o un proxy
+revaliden con 304 sin descargar la página.
+"""
+import hashlib
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers,
+)
+from django.utils.http import http_date
+
+from .cards import get_listing_version, get_publication_versions
+
+PAGE_CACHE_TIMEOUT = 60 * 10
+
+
+def normalize_query_string(query_dict):
+    """Query string con parámetros ordenados, sin valores vacíos ni espacios extra"""
+    pares = []
+    for key in sorted(query_dict.keys()):
+        for value in query_dict.getlist(key):
+            value = value.strip()
+            if value:
+                pares.append((key, value))
+    return urlencode(pares)
+
+
+def _can_use_cache(request):
+    if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+        return False
+    # Los mensajes pendientes se muestran una sola vez en la página
+    return not len(get_messages(request))
+
+
+def _set_validators(request, response, etag, last_modified):
+    """Agrega ETag/Last-Modified y responde 304 si el cliente ya tiene la página"""
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, public=True, max_age=0, must_revalidate=True)
+    # La misma URL se muestra distinta a un usuario con sesión iniciada
+    patch_vary_headers(response, ['Cookie'])
+    return get_conditional_response(
+        request, etag=etag, last_modified=last_modified, response=response,
+    )
+
+
+def anonymous_page_cache(version_func):
+    """
+    Cachea la respuesta de la vista para anónimos. `version_func(request,
+    *args, **kwargs)` retorna el sello que forma parte de la clave.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            if not _can_use_cache(request):
+                return view_func(request, *args, **kwargs)
+
+            version = version_func(request, *args, **kwargs)
+            query = hashlib.md5(
+                normalize_query_string(request.GET).encode('utf-8')
+            ).hexdigest()
+            key = f'marketplace:pagina:{view_func.__name__}:{version}:{request.path}:{query}'
+
+            entry = cache.get(key)
+            if entry is not None:
+                response = HttpResponse(entry['content'], content_type=entry['content_type'])
+                return _set_validators(request, response, entry['etag'], entry['last_modified'])
+
+            response = view_func(request, *args, **kwargs)
+            if response.status_code != 200 or response.cookies or getattr(response, 'streaming', False):
+                return response
+
+            if hasattr(response, 'render') and callable(response.render):
+                response.render()
+            entry = {
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'etag': f'"{hashlib.md5(response.content).hexdigest()}"',
+                # Segundos enteros: Last-Modified no tiene más resolución
+                'last_modified': int(version // 1_000_000_000),
+            }
+            cache.set(key, entry, PAGE_CACHE_TIMEOUT)
+            return _set_validators(request, response, entry['etag'], entry['last_modified'])
+        return _wrapped
+    return decorator
+
+
+def listing_version(request, *args, **kwargs):
+    return get_listing_version()
+
+
+def publication_version(request, publication_id, *args, **kwargs):
+    return get_publication_versions([publication_id])[publication_id]
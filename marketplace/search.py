@@ -0,0 +1,135 @@
+"""
+Índice de búsqueda de publicaciones del marketplace.
+
+Cada publicación guarda en `search_document` el texto buscable (nombre del
+cultivo, nombre del productor y descripción) en minúsculas y sin tildes.
+
+- En PostgreSQL, `search_vector` contiene el tsvector en español (con stemming)
+  de ese documento y ambos campos tienen índices GIN (tsvector y pg_trgm), así
+  que la búsqueda y la tolerancia a errores de escritura usan índices.
+- En SQLite (desarrollo local) se busca cada término, con un stemming liviano,
+  dentro de `search_document`.
+"""
+import re
+import unicodedata
+
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity,
+)
+from django.db import connection
+from django.db.models import Case, When, Value, IntegerField, F, Q
+from django.db.models.functions import Cast
+
+SEARCH_CONFIG = 'spanish'
+
+# Sufijos plurales comunes en español para el stemming liviano de SQLite
+_SUFIJOS_PLURALES = ('es', 's')
+
+
+def normalizar_texto(texto):
+    """Pasa a minúsculas, elimina tildes y colapsa espacios"""
+    if not texto:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return re.sub(r'\s+', ' ', texto).strip().lower()
+
+
+def _raiz(termino):
+    """Stemming liviano: quita el plural para que 'papas' encuentre 'papa'"""
+    for sufijo in _SUFIJOS_PLURALES:
+        if len(termino) > len(sufijo) + 2 and termino.endswith(sufijo):
+            return termino[:-len(sufijo)]
+    return termino
+
+
+def build_search_document(publication):
+    """Construye el texto buscable de una publicación"""
+    cultivo = publication.cultivo
+    productor = publication.productor
+    partes = [
+        cultivo.nombre if cultivo else '',
+        productor.first_name if productor else '',
+        productor.last_name if productor else '',
+        publication.descripcion,
+    ]
+    return normalizar_texto(' '.join(p for p in partes if p))
+
+
+def uses_postgres_search():
+    return connection.vendor == 'postgresql'
+
+
+def update_search_index(queryset, batch_size=500, force=False):
+    """
+    Recalcula el documento de búsqueda de las publicaciones del queryset y
+    guarda solo los que cambiaron; con `force` reescribe documento y
+    search_vector de todas (p. ej. vectores nulos o tras cambiar SEARCH_CONFIG).
+    Retorna la cantidad de publicaciones procesadas.
+    """
+    publications = queryset.select_related('cultivo', 'productor').only(
+        'id', 'descripcion', 'search_document',
+        'cultivo__nombre', 'productor__first_name', 'productor__last_name',
+    )
+
+    cambiadas = []
+    total = 0
+    for publication in publications.iterator(chunk_size=batch_size):
+        total += 1
+        documento = build_search_document(publication)
+        if force or documento != publication.search_document:
+            publication.search_document = documento
+            cambiadas.append(publication)
+        if len(cambiadas) >= batch_size:
+            _guardar_documentos(cambiadas)
+            cambiadas = []
+    _guardar_documentos(cambiadas)
+    return total
+
+
+def _guardar_documentos(publications):
+    from .models import Publication
+
+    if not publications:
+        return
+    Publication.objects.bulk_update(publications, ['search_document'])
+    if uses_postgres_search():
+        Publication.objects.filter(pk__in=[p.pk for p in publications]).update(
+            search_vector=SearchVector('search_document', config=SEARCH_CONFIG)
+        )
+
+
+def search_publications(queryset, query):
+    """
+    Filtra el queryset por el texto `query` y lo anota con `relevancia`
+    (entero, mayor es más relevante) para poder ordenar por ella.
+    """
+    texto = normalizar_texto(query)
+    if not texto:
+        return queryset.annotate(relevancia=Value(0, output_field=IntegerField()))
+
+    if uses_postgres_search():
+        search_query = SearchQuery(texto, config=SEARCH_CONFIG, search_type='websearch')
+        return queryset.filter(
+            Q(search_vector=search_query) |
+            Q(search_document__trigram_word_similar=texto)
+        ).annotate(
+            # Entero para que el cursor de paginación compare valores exactos
+            relevancia=Cast(
+                (SearchRank(F('search_vector'), search_query) +
+                 TrigramWordSimilarity(texto, 'search_document')) * 10000,
+                output_field=IntegerField(),
+            )
+        )
+
+    # Fallback para SQLite: todos los términos deben aparecer en el documento
+    terminos = [_raiz(t) for t in texto.split(' ')]
+    for termino in terminos:
+        queryset = queryset.filter(search_document__contains=termino)
+    return queryset.annotate(
+        relevancia=Case(
+            When(search_document__contains=texto, then=Value(len(terminos) + 1)),
+            default=Value(len(terminos)),
+            output_field=IntegerField(),
+        )
+    )
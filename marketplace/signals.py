@@ -0,0 +1,237 @@
+from django.db.models import Count, Q
+from django.db.models.signals import post_init, pre_save, post_save, post_delete
+from django.conf import settings
+from django.dispatch import receiver
+from accounts.models import ProducerProfile
+from core.models import Farm
+from inventory.models import Crop
+from .models import Publication, PublicationImage
+from .search import update_search_index
+from .locations import refresh_locations
+from .cards import bump_card_versions
+from .facets import (
+    FACET_CATEGORIA, TRACKED_FIELDS, apply_facet_changes, facet_keys, location_keys, publication_state,
+)
+
+# Campos del usuario que forman parte del documento de búsqueda
+SEARCH_USER_FIELDS = {'first_name', 'last_name'}
+
+# Guardados parciales del usuario que no cambian lo que muestran sus publicaciones
+USER_BOOKKEEPING_FIELDS = {'last_login'}
+
+
+@receiver(post_save, sender=Publication)
+def update_publication_search_document(sender, instance, raw=False, **kwargs):
+    """Mantiene actualizado el documento de búsqueda de la publicación"""
+    if raw:
+        return
+    update_search_index(Publication.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def update_producer_publications_search_document(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """El nombre del productor forma parte del documento de sus publicaciones"""
+    if raw or created:
+        return
+    # Guardados parciales que no tocan el nombre (p. ej. last_login) no requieren reindexar
+    if update_fields is not None and not SEARCH_USER_FIELDS.intersection(update_fields):
+        return
+    update_search_index(Publication.objects.filter(productor=instance))
+
+
+def _crop_categoria(crop_id):
+    return Crop.objects.filter(pk=crop_id).values_list('categoria', flat=True).first()
+
+
+@receiver(post_init, sender=Publication)
+def remember_publication_state(sender, instance, **kwargs):
+    """Guarda los valores cargados para detectar cambios al guardar"""
+    # Leer de __dict__ para no disparar consultas en campos diferidos
+    if instance.pk is not None and any(field not in instance.__dict__ for field in TRACKED_FIELDS):
+        instance._estado_original = None
+    else:
+        instance._estado_original = {field: instance.__dict__.get(field) for field in TRACKED_FIELDS}
+
+
+@receiver(pre_save, sender=Publication)
+def load_publication_state(sender, instance, raw=False, **kwargs):
+    """Si la instancia se cargó con campos diferidos, leer el estado anterior de la BD"""
+    if raw or instance._state.adding or getattr(instance, '_estado_original', None) is not None:
+        return
+    instance._estado_original = Publication.objects.filter(pk=instance.pk).values(*TRACKED_FIELDS).first()
+
+
+@receiver(post_save, sender=Publication)
+def update_publication_aggregates(sender, instance, created, raw=False, **kwargs):
+    """Actualiza la tabla de ubicaciones y los conteos por faceta"""
+    if raw:
+        return
+    anterior = None if created else getattr(instance, '_estado_original', None)
+    actual = publication_state(instance)
+
+    # Ubicaciones: recontar el par anterior y el actual
+    pares = [(instance.departamento, instance.ciudad)]
+    if anterior:
+        pares.append((anterior['departamento'], anterior['ciudad']))
+    refresh_locations(pares)
+
+    # Facetas: solo si cambió algún campo que las determina
+    if anterior != actual:
+        categoria = instance.cultivo.categoria if instance.cultivo_id else None
+        categoria_anterior = categoria
+        if anterior and anterior['cultivo_id'] != instance.cultivo_id:
+            categoria_anterior = _crop_categoria(anterior['cultivo_id'])
+        apply_facet_changes(
+            facet_keys(anterior, categoria_anterior),
+            facet_keys(actual, categoria),
+        )
+    instance._estado_original = actual
+
+
+@receiver(post_delete, sender=Publication)
+def remove_publication_aggregates(sender, instance, **kwargs):
+    refresh_locations([(instance.departamento, instance.ciudad)])
+    apply_facet_changes(
+        facet_keys(publication_state(instance), _crop_categoria(instance.cultivo_id)),
+        set(),
+    )
+
+
+@receiver(post_init, sender=Crop)
+def remember_crop_categoria(sender, instance, **kwargs):
+    instance._categoria_original = instance.__dict__.get('categoria')
+    instance._productor_original = instance.__dict__.get('productor_id')
+    instance._nombre_original = instance.__dict__.get('nombre')
+
+
+@receiver(post_save, sender=Crop)
+def sync_crop_productor_to_publications(sender, instance, created, raw=False, **kwargs):
+    """Publication.productor copia el productor del cultivo"""
+    if raw or created or instance._productor_original == instance.productor_id:
+        return
+    Publication.objects.filter(cultivo=instance).exclude(
+        productor_id=instance.productor_id
+    ).update(productor_id=instance.productor_id)
+
+
+@receiver(post_save, sender=Crop)
+def update_crop_publications_search_document(sender, instance, created, raw=False, **kwargs):
+    """
+    El nombre del cultivo y el de su productor forman parte del documento de
+    sus publicaciones. Va después de sync_crop_productor_to_publications para
+    indexar ya con el productor nuevo.
+    """
+    if raw or created:
+        instance._nombre_original = instance.nombre
+        return
+    if instance._nombre_original == instance.nombre and instance._productor_original == instance.productor_id:
+        return
+    update_search_index(Publication.objects.filter(cultivo=instance))
+    instance._nombre_original = instance.nombre
+
+
+@receiver(post_save, sender=Crop)
+def update_crop_categoria_facets(sender, instance, created, raw=False, **kwargs):
+    """Mueve las publicaciones activas del cultivo a su nueva categoría"""
+    if raw or created:
+        instance._categoria_original = instance.categoria
+        return
+    anterior = instance._categoria_original
+    if anterior and anterior != instance.categoria:
+        activas = Publication.objects.filter(
+            cultivo=instance, estado='Activa', cantidad_disponible__gt=0
+        ).count()
+        if activas:
+            apply_facet_changes(
+                {(FACET_CATEGORIA, anterior)},
+                {(FACET_CATEGORIA, instance.categoria)},
+                amount=activas,
+            )
+    instance._categoria_original = instance.categoria
+
+
+@receiver(post_save, sender=Farm)
+def sync_farm_location_to_publications(sender, instance, created, raw=False, **kwargs):
+    """Propaga el cambio de ubicación de una finca a sus publicaciones"""
+    if raw or created:
+        return
+    publications = Publication.objects.filter(
+        Q(finca=instance) | Q(cultivo__finca=instance)
+    ).exclude(departamento=instance.departamento, ciudad=instance.ciudad)
+    pares_anteriores = set(publications.values_list('departamento', 'ciudad'))
+    if not pares_anteriores:
+        return
+    # Publicaciones activas que cambian de ubicación, por par anterior
+    activas_por_par = publications.filter(
+        estado='Activa', cantidad_disponible__gt=0
+    ).values('departamento', 'ciudad').annotate(total=Count('id'))
+    activas_por_par = list(activas_por_par)
+
+    publication_ids = list(publications.values_list('id', flat=True))
+
+    publications.update(
+        departamento=instance.departamento,
+        ciudad=instance.ciudad,
+        ubicacion_display=f"{instance.ciudad}, {instance.departamento}",
+    )
+    refresh_locations(pares_anteriores | {(instance.departamento, instance.ciudad)})
+    bump_card_versions(publication_ids)
+    for fila in activas_por_par:
+        apply_facet_changes(
+            location_keys(fila['departamento'], fila['ciudad']),
+            location_keys(instance.departamento, instance.ciudad),
+            amount=fila['total'],
+        )
+
+
+@receiver(post_save, sender=ProducerProfile)
+def sync_profile_location_to_publications(sender, instance, raw=False, **kwargs):
+    """Las publicaciones sin ubicación propia muestran la del perfil del productor"""
+    if raw:
+        return
+    ubicacion = instance.ciudad_departamento
+    Publication.objects.filter(
+        productor=instance.user
+    ).filter(
+        Q(departamento='') | Q(ciudad='')
+    ).exclude(ubicacion_display=ubicacion).update(ubicacion_display=ubicacion)
+    bump_card_versions(
+        Publication.objects.filter(productor=instance.user).values_list('id', flat=True)
+    )
+
+
+@receiver(post_save, sender=Publication)
+@receiver(post_delete, sender=Publication)
+def invalidate_publication_card(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    bump_card_versions([instance.pk])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_producer_publication_cards(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """El detalle de la publicación muestra el nombre y la foto del productor"""
+    if raw or created:
+        return
+    if update_fields is not None and set(update_fields) <= USER_BOOKKEEPING_FIELDS:
+        return
+    bump_card_versions(
+        Publication.objects.filter(productor=instance).values_list('id', flat=True)
+    )
+
+
+@receiver(post_save, sender=PublicationImage)
+@receiver(post_delete, sender=PublicationImage)
+def invalidate_publication_card_images(sender, instance, raw=False, **kwargs):
+    """El carrusel de la tarjeta muestra las imágenes de la publicación"""
+    if raw:
+        return
+    bump_card_versions([instance.publication_id])
+
+
+@receiver(post_save, sender=Crop)
+def invalidate_crop_publication_cards(sender, instance, created, raw=False, **kwargs):
+    """La tarjeta muestra nombre, categoría y unidad del cultivo"""
+    if raw or created:
+        return
+    bump_card_versions(Publication.objects.filter(cultivo=instance).values_list('id', flat=True))
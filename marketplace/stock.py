@@ -0,0 +1,161 @@
+"""
+Movimientos de stock de las publicaciones sin condiciones de carrera.
+
+Cada descuento es un único UPDATE condicional:
+
+    UPDATE ... SET cantidad_disponible = cantidad_disponible - x
+    WHERE id = ... AND cantidad_disponible >= x
+
+así que dos pagos simultáneos sobre la misma publicación no pierden
+actualizaciones ni dejan el stock en negativo, sin bloquear la fila antes de
+escribir. Al llegar a cero una publicación Activa pasa a Agotada; la venta lo
+anota (agoto_publicacion) y solo al restaurar esa venta vuelve a Activa, así
+una publicación que el productor marcó Agotada no se publica sola.
+
+Cada cambio queda en StockMovement. Por pedido y ciclo se registra a lo sumo
+una venta y una restauración (restricción única), lo que hace idempotente
+procesar dos veces el mismo pago. Restaurar cierra el ciclo: si el pedido se
+vuelve a aprobar, el descuento cuenta en el ciclo siguiente.
+
+Como .update() no dispara las señales de Publication, aquí mismo se ajustan
+las facetas, la tabla de ubicaciones y las versiones de las tarjetas.
+"""
+import logging
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .cards import bump_card_versions
+from .facets import TRACKED_FIELDS, apply_facet_changes, facet_keys, is_listed
+from .locations import refresh_locations
+from .models import Publication, StockMovement
+
+logger = logging.getLogger(__name__)
+
+
+def _decimal(valor):
+    return valor if isinstance(valor, Decimal) else Decimal(str(valor))
+
+
+def _actualizar_agregados(publication_id, anterior, actual):
+    """Facetas, ubicaciones y tarjetas tras un cambio de stock hecho con update()"""
+    antes = is_listed(anterior['estado'], anterior['cantidad_disponible'])
+    despues = is_listed(actual['estado'], actual['cantidad_disponible'])
+    if antes != despues:
+        categoria = Publication.objects.filter(pk=publication_id).values_list(
+            'cultivo__categoria', flat=True
+        ).first()
+        apply_facet_changes(facet_keys(anterior, categoria), facet_keys(actual, categoria))
+        refresh_locations([(actual['departamento'], actual['ciudad'])])
+    transaction.on_commit(lambda: bump_card_versions([publication_id]))
+
+
+def _ciclo(order):
+    """Ciclo actual del pedido: cuántas veces se restauró su stock"""
+    if order is None:
+        return 0
+    return StockMovement.objects.filter(order=order, tipo='restauracion').count()
+
+
+def _registrar(publication_id, tipo, cantidad, order=None, ciclo=0):
+    """Crea el movimiento; retorna None si el pedido ya tiene uno de ese tipo en el ciclo"""
+    try:
+        with transaction.atomic():
+            return StockMovement.objects.create(
+                publication_id=publication_id, order=order, tipo=tipo, cantidad=cantidad, ciclo=ciclo,
+            )
+    except IntegrityError:
+        return None
+
+
+def stock_descontado(order):
+    """True si el pedido tiene una venta todavía sin restaurar"""
+    return StockMovement.objects.filter(order=order, tipo='venta', ciclo=_ciclo(order)).exists()
+
+
+def descontar_stock(publication_id, cantidad, order=None, tipo='venta'):
+    """
+    Descuenta `cantidad` (en la unidad de la publicación) si hay suficiente.
+    Retorna True si se descontó; False si no alcanza el stock o si el pedido ya
+    tenía registrado el descuento.
+    """
+    cantidad = _decimal(cantidad)
+    with transaction.atomic():
+        movimiento = _registrar(publication_id, tipo, -cantidad, order, ciclo=_ciclo(order))
+        if movimiento is None:
+            logger.info(f"Stock del pedido {getattr(order, 'id', None)} ya descontado")
+            return False
+
+        descontado = Publication.objects.filter(
+            pk=publication_id, cantidad_disponible__gte=cantidad
+        ).update(cantidad_disponible=F('cantidad_disponible') - cantidad)
+        if not descontado:
+            # Sin stock suficiente: deshacer el registro del movimiento
+            movimiento.delete()
+            return False
+
+        agotada = Publication.objects.filter(
+            pk=publication_id, estado='Activa', cantidad_disponible__lte=0
+        ).update(estado='Agotada')
+
+        # La fila queda bloqueada por el UPDATE hasta el commit: esta lectura es consistente
+        actual = Publication.objects.filter(pk=publication_id).values(*TRACKED_FIELDS).get()
+        anterior = dict(
+            actual,
+            cantidad_disponible=actual['cantidad_disponible'] + cantidad,
+            estado='Activa' if agotada else actual['estado'],
+        )
+        StockMovement.objects.filter(pk=movimiento.pk).update(
+            saldo=actual['cantidad_disponible'], agoto_publicacion=bool(agotada),
+        )
+        _actualizar_agregados(publication_id, anterior, actual)
+    return True
+
+
+def restaurar_stock(publication_id, cantidad, order=None, tipo='restauracion'):
+    """
+    Devuelve `cantidad` al stock. Con pedido, solo si se le había descontado
+    en el ciclo actual, y reactiva la publicación si esa venta la agotó.
+    Retorna True si se restauró.
+    """
+    cantidad = _decimal(cantidad)
+    with transaction.atomic():
+        venta = None
+        ciclo = _ciclo(order)
+        if order is not None:
+            venta = StockMovement.objects.filter(order=order, tipo='venta', ciclo=ciclo).first()
+            if venta is None:
+                return False
+        movimiento = _registrar(publication_id, tipo, cantidad, order, ciclo=ciclo)
+        if movimiento is None:
+            return False
+
+        Publication.objects.filter(pk=publication_id).update(
+            cantidad_disponible=F('cantidad_disponible') + cantidad
+        )
+        reactivada = 0
+        if venta is not None and venta.agoto_publicacion:
+            reactivada = Publication.objects.filter(
+                pk=publication_id, estado='Agotada', cantidad_disponible__gt=0
+            ).update(estado='Activa')
+
+        actual = Publication.objects.filter(pk=publication_id).values(*TRACKED_FIELDS).get()
+        anterior = dict(
+            actual,
+            cantidad_disponible=actual['cantidad_disponible'] - cantidad,
+            estado='Agotada' if reactivada else actual['estado'],
+        )
+        StockMovement.objects.filter(pk=movimiento.pk).update(saldo=actual['cantidad_disponible'])
+        _actualizar_agregados(publication_id, anterior, actual)
+    return True
+
+
+def descontar_stock_de_pedido(order):
+    """Descuenta la cantidad acordada del pedido (una sola vez por pedido)"""
+    return descontar_stock(order.publicacion_id, order.cantidad_acordada, order=order)
+
+
+def restaurar_stock_de_pedido(order):
+    """Devuelve al stock lo descontado por el pedido (una sola vez por pedido)"""
+    return restaurar_stock(order.publicacion_id, order.cantidad_acordada, order=order)
@@ -0,0 +1,55 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import User
+from core.pagination import encode_cursor
+from inventory.models import Crop
+from marketplace.models import Publication, PublicationImage
+from marketplace.views import MARKETPLACE_PAGE_SIZE
+
+
+class MarketplaceQueryCountTests(TestCase):
+    """El marketplace hace las mismas consultas con pocas o muchas publicaciones"""
+
+    def setUp(self):
+        productor = User.objects.create_user('productor', role='Productor')
+        self.cultivo = Crop.objects.create(nombre='Papa', productor=productor, estado='cosechado')
+        self.client.force_login(User.objects.create_user('comprador', role='Comprador'))
+
+    def _publicar(self, cantidad):
+        for _ in range(cantidad):
+            publication = Publication.objects.create(
+                cultivo=self.cultivo, precio_por_unidad=1000, cantidad_disponible=100,
+            )
+            PublicationImage.objects.bulk_create([
+                PublicationImage(publication=publication, image='publications/a.jpg', is_primary=True, order=0),
+                PublicationImage(publication=publication, image='publications/b.jpg', order=1),
+            ])
+
+    def _render(self):
+        # Sin tarjetas, facetas ni ubicaciones en caché: todo sale de la base de datos
+        cache.clear()
+        return self.client.get(reverse('marketplace'))
+
+    def test_query_count_does_not_grow_with_publications(self):
+        self._publicar(5)
+        with CaptureQueriesContext(connection) as consultas:
+            response = self._render()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['publications']), 5)
+
+        self._publicar(35)
+        with self.assertNumQueries(len(consultas)):
+            response = self._render()
+        self.assertEqual(len(response.context['publications']), MARKETPLACE_PAGE_SIZE)
+
+    def test_malformed_cursor_falls_back_to_first_page(self):
+        self._publicar(3)
+        for valores in ([0, '2024-01-01T00:00:00', [1]], [0, {'a': 1}, 1]):
+            for parametro in ('after', 'before'):
+                response = self.client.get(reverse('marketplace'), {parametro: encode_cursor(valores)})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.context['publications']), 3)
@@ -1,23 +1,46 @@
+from decimal import Decimal, InvalidOperation
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .models import Publication, PublicationImage
+from .models import Publication, PublicationImage, prefetch_images
 from .forms import PublicationForm
 from inventory.models import Crop
-from accounts.models import User, ProducerProfile
-from django.db.models import Q, Max
+from accounts.models import User
+from django.db.models import Q, Max, Case, When, Value, IntegerField
 from django.core.paginator import Paginator
+from core.pagination import KeysetPaginator, cursor_querystring
+from .search import search_publications
+from .locations import get_marketplace_locations
+from .cards import render_publication_cards
+from .page_cache import anonymous_page_cache, listing_version, publication_version
+from .facets import (
+    FACET_CATEGORIA, FACET_CIUDAD, FACET_PRECIO, PRICE_BUCKETS,
+    get_facet_counts, price_bucket_value,
+)
+
+# Publicaciones por página en el marketplace
+MARKETPLACE_PAGE_SIZE = 24
+
+# Columnas de ordenamiento (y del cursor) para cada opción de 'orden'.
+# Los precios se comparan normalizados por kg; las unidades discretas
+# (unidades, cajas, bultos) van en su propio grupo, después de las de peso.
+MARKETPLACE_ORDER_KEYS = {
+    '-created_at': ['-created_at', '-id'],
+    'precio_por_unidad': ['es_unidad_discreta', 'precio_normalizado', 'id'],
+    '-precio_por_unidad': ['es_unidad_discreta', '-precio_normalizado', '-id'],
+    'cultivo__nombre': ['cultivo__nombre', 'id'],
+    '-relevancia': ['-relevancia', '-id'],
+}
 
 # Create your views here.
 
+@anonymous_page_cache(listing_version)
 def marketplace_view(request):
     """Vista principal del marketplace"""
     publications = Publication.objects.filter(
         estado='Activa', 
         cantidad_disponible__gt=0
-    ).select_related(
-        'cultivo__productor__producer_profile'
-    ).order_by('-created_at')
+    ).select_related('cultivo').order_by('-created_at')
     
     # Obtener todas las categorías disponibles
     categorias = Crop.CATEGORIA_CHOICES # Changed from Product.CATEGORIA_CHOICES
@@ -29,84 +52,99 @@ def marketplace_view(request):
     precio_max = request.GET.get('precio_max', '')
     ubicacion_filter = request.GET.get('ubicacion', '')
     vendedor_filter = request.GET.get('vendedor', '')
-    orden = request.GET.get('orden', '-created_at')
+    # Con búsqueda, por defecto se ordena por relevancia
+    orden = request.GET.get('orden', '-relevancia' if search_query else '-created_at')
     
     # Aplicar filtros
     if search_query:
-        publications = publications.filter(
-            Q(cultivo__nombre__icontains=search_query) |
-            Q(cultivo__productor__first_name__icontains=search_query) |
-            Q(cultivo__productor__last_name__icontains=search_query) |
-            Q(descripcion__icontains=search_query)
-        )
+        # Búsqueda sobre el índice de texto completo (ver marketplace/search.py)
+        publications = search_publications(publications, search_query)
     
     # Filtrar por categoría
     if categoria_filter:
         publications = publications.filter(cultivo__categoria=categoria_filter)
     
-    # Filtrar por rango de precios
+    # Filtrar por rango de precios (por kg en unidades de peso, por unidad en las discretas)
     if precio_min:
         try:
-            publications = publications.filter(precio_por_unidad__gte=float(precio_min))
-        except ValueError:
+            publications = publications.filter(precio_normalizado__gte=Decimal(precio_min))
+        except InvalidOperation:
             pass
     
     if precio_max:
         try:
-            publications = publications.filter(precio_por_unidad__lte=float(precio_max))
-        except ValueError:
+            publications = publications.filter(precio_normalizado__lte=Decimal(precio_max))
+        except InvalidOperation:
             pass
     
     # Filtrar por ubicación
     if ubicacion_filter:
-        publications = publications.filter(
-            cultivo__productor__producer_profile__location__icontains=ubicacion_filter
-        )
+        publications = publications.filter(ubicacion_display__icontains=ubicacion_filter)
     
     # Filtrar por vendedor
     if vendedor_filter:
         publications = publications.filter(
-            Q(cultivo__productor__username__icontains=vendedor_filter) |
-            Q(cultivo__productor__first_name__icontains=vendedor_filter) |
-            Q(cultivo__productor__last_name__icontains=vendedor_filter)
+            Q(productor__username__icontains=vendedor_filter) |
+            Q(productor__first_name__icontains=vendedor_filter) |
+            Q(productor__last_name__icontains=vendedor_filter)
         )
     
     # Ordenar resultados
-    valid_orders = ['-created_at', 'precio_por_unidad', '-precio_por_unidad', 'cultivo__nombre']
-    if orden in valid_orders:
-        publications = publications.order_by(orden)
-    
-    # Obtener ubicaciones únicas para el filtro
-    ubicaciones = publications.values_list(
-        'cultivo__productor__producer_profile__location', flat=True
-    ).distinct().exclude(cultivo__productor__producer_profile__location__isnull=True)
-    
-    # Convertir a lista para poder agregar atributos dinámicos
-    publications_list = list(publications)
-    
-    # Si el usuario está autenticado, mover sus propios productos al final
+    valid_orders = list(MARKETPLACE_ORDER_KEYS)
+    if not search_query:
+        valid_orders.remove('-relevancia')
+    if orden not in valid_orders:
+        orden = '-created_at'
+    
+    # Ubicaciones para el filtro (tabla precalculada servida desde caché)
+    ubicaciones = get_marketplace_locations()
+    
+    # Conteos por faceta para el panel de filtros (desde caché, sin agregaciones)
+    facetas = get_facet_counts()
+    categorias_facetas = [
+        (value, label, facetas[FACET_CATEGORIA].get(value, 0))
+        for value, label in categorias
+    ]
+    ubicaciones_facetas = [
+        (ubicacion, facetas[FACET_CIUDAD].get(ubicacion, 0))
+        for ubicacion in ubicaciones
+    ]
+    rangos_precio = [
+        {
+            'minimo': minimo,
+            'maximo': maximo,
+            'total': facetas[FACET_PRECIO].get(price_bucket_value(minimo, maximo), 0),
+        }
+        for minimo, maximo in PRICE_BUCKETS
+    ]
+    
+    total_productos = publications.count()
+    
+    # Columnas del cursor para el orden elegido
+    keys = list(MARKETPLACE_ORDER_KEYS[orden])
+    
+    # Si el usuario está autenticado, sus propios productos van al final
+    # (se resuelve en la consulta para no cargar todas las publicaciones)
     if request.user.is_authenticated:
-        own_publications = [p for p in publications_list if p.cultivo.productor == request.user]
-        other_publications = [p for p in publications_list if p.cultivo.productor != request.user]
-        publications_list = other_publications + own_publications
+        publications = publications.annotate(
+            es_propia=Case(
+                When(productor=request.user, then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+        )
+        keys.insert(0, 'es_propia')
     
-    # Procesar ubicación para cada publicación (la categoría ya viene en la consulta)
-    for publication in publications_list:
-        # Procesar ubicación para mostrar solo ciudad/región
-        try:
-            if publication.cultivo.productor.producer_profile and publication.cultivo.productor.producer_profile.location:
-                location = publication.cultivo.productor.producer_profile.location
-                # Extraer ciudad (asumiendo formato "Calle, Ciudad, País" o similar)
-                location_parts = [part.strip() for part in location.split(',')]
-                if len(location_parts) > 1:
-                    # Tomar la segunda parte (ciudad) y la primera (calle/sector)
-                    publication.display_location = f"{location_parts[1][:20]}, {location_parts[0][:15]}"
-                else:
-                    publication.display_location = location[:25]
-            else:
-                publication.display_location = "Ubicación no especificada"
-        except ProducerProfile.DoesNotExist:
-            publication.display_location = "Productor sin perfil"
+    # Paginación por cursor: solo se cargan las filas de la página actual
+    paginator = KeysetPaginator(publications, keys, MARKETPLACE_PAGE_SIZE)
+    page = paginator.get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    publications_list = page.object_list
+    
+    # Tarjetas desde la caché; solo las faltantes cargan imágenes (en una consulta)
+    render_publication_cards(publications_list, before_render=prefetch_images)
     
     context = {
         'publications': publications_list,
@@ -117,34 +155,26 @@ def marketplace_view(request):
         'precio_max': precio_max,
         'ubicacion_filter': ubicacion_filter,
         'ubicaciones': ubicaciones,
+        'categorias_facetas': categorias_facetas,
+        'ubicaciones_facetas': ubicaciones_facetas,
+        'rangos_precio': rangos_precio,
         'orden': orden,
-        'total_productos': len(publications_list),
+        'total_productos': total_productos,
+        'page': page,
+        'filter_querystring': cursor_querystring(request),
     }
     return render(request, 'marketplace/marketplace.html', context)
 
+@anonymous_page_cache(publication_version)
 def publication_detail_view(request, publication_id):
     """Detalle de una publicación"""
     publication = get_object_or_404(
         Publication.objects.select_related(
-            'cultivo__productor__producer_profile'
-        ), 
+            'cultivo', 'productor__producer_profile'
+        ).prefetch_related('images'), 
         pk=publication_id
     )
     
-    # Procesar ubicación para mostrar solo ciudad/región
-    try:
-        if publication.cultivo.productor.producer_profile and publication.cultivo.productor.producer_profile.location:
-            location = publication.cultivo.productor.producer_profile.location
-            location_parts = [part.strip() for part in location.split(',')]
-            if len(location_parts) > 1:
-                publication.display_location = f"{location_parts[1][:25]}, {location_parts[0][:20]}"
-            else:
-                publication.display_location = location[:30]
-        else:
-            publication.display_location = "Ubicación no especificada"
-    except ProducerProfile.DoesNotExist:
-        publication.display_location = "Productor sin perfil"
-    
     context = {
         'publication': publication
     }
@@ -212,7 +242,7 @@ def publication_create_view(request, crop_id):
 @login_required
 def publication_edit_view(request, pk):
     """Editar publicación existente"""
-    publication = get_object_or_404(Publication, pk=pk, cultivo__productor=request.user)
+    publication = get_object_or_404(Publication, pk=pk, productor=request.user)
     
     if request.method == 'POST':
         form = PublicationForm(request.POST, request.FILES, instance=publication, user=request.user)
@@ -256,7 +286,7 @@ def publication_edit_view(request, pk):
 @login_required
 def publication_delete_view(request, pk):
     """Eliminar publicación"""
-    publication = get_object_or_404(Publication, pk=pk, cultivo__productor=request.user)
+    publication = get_object_or_404(Publication, pk=pk, productor=request.user)
     
     if request.method == 'POST':
         # Guardar el nombre del cultivo antes de eliminar
@@ -309,8 +339,8 @@ def my_publications_view(request):
         return redirect('marketplace')
     
     publications = Publication.objects.filter(
-        cultivo__productor=request.user
-    ).select_related('cultivo').order_by('-created_at')
+        productor=request.user
+    ).select_related('cultivo').prefetch_related('images').order_by('-created_at')
     
     context = {
         'publications': publications
@@ -327,7 +357,7 @@ def delete_publication_image(request, image_id):
     publication = image.publication
     
     # Verificar que el usuario sea el propietario
-    if publication.cultivo.productor != request.user:
+    if publication.productor_id != request.user.pk:
         return JsonResponse({'success': False, 'error': 'No autorizado'}, status=403)
     
     # No permitir eliminar si es la única imagen
@@ -357,7 +387,7 @@ def set_primary_image(request, image_id):
     publication = image.publication
     
     # Verificar que el usuario sea el propietario
-    if publication.cultivo.productor != request.user:
+    if publication.productor_id != request.user.pk:
         return JsonResponse({'success': False, 'error': 'No autorizado'}, status=403)
     
     # Quitar el flag de principal de todas las otras imágenes
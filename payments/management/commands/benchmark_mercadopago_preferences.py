@@ -0,0 +1,143 @@
+"""
+Mide la creación de preferencias del resumen del carrito (payments/preferences.py)
+contra un servidor local que imita la API de MercadoPago con latencia.
+
+Crea una publicación y pedidos temporales dentro de una transacción que se
+revierte al final, y compara: creación secuencial, creación en paralelo,
+reutilización de las preferencias vigentes y una llamada que excede el timeout.
+"""
+import json
+import threading
+import time
+import uuid
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from inventory.models import Crop
+from marketplace.models import Publication
+from payments.models import Payment
+from payments.preferences import preparar_pagos
+from sales.models import Order
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _servidor_stub(latencia):
+    """Servidor HTTP en un puerto libre que responde a POST /checkout/preferences"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            self.server.llamadas += 1
+            time.sleep(self.server.latencia)
+            preference_id = f'stub-{uuid.uuid4().hex[:12]}'
+            cuerpo = json.dumps({
+                'id': preference_id,
+                'init_point': f'http://stub.local/checkout?pref_id={preference_id}',
+            }).encode()
+            self.send_response(201)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    servidor.daemon_threads = True
+    servidor.latencia = latencia
+    servidor.llamadas = 0
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+class Command(BaseCommand):
+    help = 'Compara la creación secuencial y en paralelo de preferencias contra un MercadoPago simulado'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cultivo', type=int, required=True,
+                            help='ID del cultivo para la publicación temporal')
+        parser.add_argument('--comprador', type=int, required=True, help='ID del usuario comprador')
+        parser.add_argument('--pedidos', type=int, default=8)
+        parser.add_argument('--latencia', type=float, default=0.3, help='Segundos por llamada')
+        parser.add_argument('--hilos', type=int, default=4)
+
+    def handle(self, *args, **options):
+        try:
+            cultivo = Crop.objects.get(pk=options['cultivo'])
+            comprador = get_user_model().objects.get(pk=options['comprador'])
+        except (Crop.DoesNotExist, get_user_model().DoesNotExist):
+            raise CommandError('El cultivo o el comprador no existen')
+
+        servidor = _servidor_stub(options['latencia'])
+        base_url = f'http://127.0.0.1:{servidor.server_address[1]}'
+        timeout = options['latencia'] * 3
+        self.stdout.write(self.style.WARNING(
+            f'{options["pedidos"]} pedidos, {options["latencia"]}s por llamada, '
+            f'{options["hilos"]} hilos, servidor simulado en {base_url}'
+        ))
+        try:
+            with override_settings(MERCADOPAGO_API_BASE_URL=base_url), transaction.atomic():
+                self._medir(cultivo, comprador, servidor, options, timeout)
+                raise _Rollback
+        except _Rollback:
+            pass
+        finally:
+            servidor.shutdown()
+
+    def _medir(self, cultivo, comprador, servidor, options, timeout):
+        publication = Publication.objects.create(
+            cultivo=cultivo,
+            unidad_medida=cultivo.unidad_medida,
+            precio_por_unidad=Decimal('1000'),
+            cantidad_disponible=Decimal('1000'),
+            cantidad_minima=Decimal('0.01'),
+            estado='Pausada',
+        )
+
+        def pedidos():
+            ids = [
+                Order.objects.create(
+                    publicacion=publication, comprador=comprador,
+                    cantidad_acordada=Decimal('1'), precio_total=Decimal('1000'), estado='pendiente',
+                ).pk
+                for _ in range(options['pedidos'])
+            ]
+            return list(Order.objects.filter(pk__in=ids).select_related('publicacion__cultivo', 'vendedor'))
+
+        def medir(nombre, orders, **kwargs):
+            servidor.llamadas = 0
+            inicio = time.perf_counter()
+            resultado = preparar_pagos(orders, comprador, timeout=kwargs.pop('timeout', timeout), **kwargs)
+            duracion = time.perf_counter() - inicio
+            exitosas = sum(1 for item in resultado if item['preference_data'].get('success'))
+            self.stdout.write(
+                f'{nombre:<12} {duracion:6.2f}s  llamadas a la API: {servidor.llamadas:<3} '
+                f'preferencias válidas: {exitosas}/{len(resultado)}'
+            )
+            return resultado, duracion, servidor.llamadas
+
+        _, secuencial, _ = medir('Secuencial', pedidos(), max_workers=1)
+        orders = pedidos()
+        _, paralelo, _ = medir('Paralelo', orders, max_workers=options['hilos'])
+        _, _, llamadas = medir('Reutilizado', orders, max_workers=options['hilos'])
+
+        servidor.latencia *= 10
+        vencidas, lento, _ = medir('Timeout', pedidos()[:1], max_workers=1, timeout=options['latencia'])
+        servidor.latencia /= 10
+
+        if llamadas or Payment.objects.filter(order__in=orders, preference_id__isnull=True).exists():
+            raise CommandError('Las preferencias vigentes no se reutilizaron')
+        if vencidas[0]['preference_data'].get('success') or lento > options['latencia'] * 3:
+            raise CommandError('La llamada lenta no respetó el timeout')
+        self.stdout.write(self.style.SUCCESS(
+            f'Paralelo {secuencial / paralelo:.1f}x más rápido; las recargas reutilizan las preferencias.'
+        ))
@@ -2,6 +2,8 @@
 Servicio para integración con MercadoPago
 """
 import mercadopago
+from mercadopago.config import RequestOptions
+from mercadopago.http import HttpClient
 from django.conf import settings
 import uuid
 from decouple import config
@@ -9,12 +11,31 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+MERCADOPAGO_API_URL = "https://api.mercadopago.com"
+
+
+class _BaseUrlHttpClient(HttpClient):
+    """Cliente HTTP del SDK que redirige las llamadas a otra URL base (p. ej. un servidor de pruebas)"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, url, maxretries=None, **kwargs):
+        if url.startswith(MERCADOPAGO_API_URL):
+            url = self.base_url + url[len(MERCADOPAGO_API_URL):]
+        return super().request(method, url, maxretries=maxretries, **kwargs)
+
 
 class MercadoPagoService:
     """Clase para manejar las operaciones con MercadoPago"""
     
-    def __init__(self):
-        """Inicializar cliente de MercadoPago"""
+    def __init__(self, timeout=None):
+        """
+        Inicializar cliente de MercadoPago
+
+        Args:
+            timeout: Segundos máximos por llamada (por defecto settings.MERCADOPAGO_TIMEOUT)
+        """
         self.access_token = config('MERCADOPAGO_ACCESS_TOKEN', default='')
         
         # Fallback temporal para desarrollo
@@ -24,8 +45,16 @@ class MercadoPagoService:
             logger.info("Usando credenciales de producción actualizadas")
             logger.info("Modo producción activado")
         
+        if timeout is None:
+            timeout = getattr(settings, 'MERCADOPAGO_TIMEOUT', 60.0)
+        base_url = getattr(settings, 'MERCADOPAGO_API_BASE_URL', '')
+        
         if self.access_token:
-            self.sdk = mercadopago.SDK(self.access_token)
+            self.sdk = mercadopago.SDK(
+                self.access_token,
+                http_client=_BaseUrlHttpClient(base_url) if base_url else None,
+                request_options=RequestOptions(connection_timeout=float(timeout)),
+            )
         else:
             self.sdk = None
     
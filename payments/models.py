@@ -2,8 +2,7 @@ from django.db import models
 from django.conf import settings
 from core.models import BaseModel
 from sales.models import Order
-from core.models import create_notification
-from core.email_service import email_service
+from core.outbox import record_notification
 
 
 class Payment(BaseModel):
@@ -134,21 +133,20 @@ class Payment(BaseModel):
         self.save()
         
         # Actualizar la cantidad disponible en la publicación (restar lo vendido)
-        # Esto se hace DESPUÉS del pago para asegurar que solo se descuente cuando el pago está confirmado
+        # Esto se hace DESPUÉS del pago para asegurar que solo se descuente cuando el pago está confirmado.
+        # El descuento es atómico y se registra una sola vez por pedido (ver marketplace/stock.py)
         try:
-            publication = self.order.publicacion
-            # Verificar que hay suficiente cantidad disponible antes de restar
-            if float(publication.cantidad_disponible) >= float(self.order.cantidad_acordada):
-                publication.cantidad_disponible = float(publication.cantidad_disponible) - float(self.order.cantidad_acordada)
-                publication.save()
-            else:
-                # Si no hay suficiente cantidad, registrar un error pero no fallar el pago
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.warning(
-                    f"Pago aprobado pero cantidad insuficiente en publicación {publication.id}. "
-                    f"Disponible: {publication.cantidad_disponible}, Solicitado: {self.order.cantidad_acordada}"
-                )
+            from marketplace.stock import descontar_stock_de_pedido, stock_descontado
+
+            if not descontar_stock_de_pedido(self.order):
+                if not stock_descontado(self.order):
+                    # Si no hay suficiente cantidad, registrar un error pero no fallar el pago
+                    import logging
+                    logger = logging.getLogger(__name__)
+                    logger.warning(
+                        f"Pago aprobado pero cantidad insuficiente en publicación {self.order.publicacion_id}. "
+                        f"Solicitado: {self.order.cantidad_acordada}"
+                    )
         except Exception as e:
             # Evitar que un error en la actualización de cantidad afecte el flujo de pago
             import logging
@@ -159,31 +157,10 @@ class Payment(BaseModel):
         # Esto permite que el vendedor revise y acepte el pedido antes de empezar a prepararlo
         # Las notificaciones se manejan automáticamente a través de signals
 
-        # Enviar recibo por email al comprador (post-pago)
-        try:
-            buyer_email = self.user.email
-            buyer_name = getattr(self.user, 'first_name', None) or self.user.username
-            email_service.send_order_confirmation_email(
-                buyer_email,
-                self.order,
-                user_name=buyer_name,
-            )
-        except Exception:
-            # Evitar que un error de correo afecte el flujo de pago
-            pass
-
-        # Notificar al vendedor
-        try:
-            seller = self.order.vendedor
-            if seller and getattr(seller, 'email', None):
-                seller_name = getattr(seller, 'first_name', None) or seller.username
-                email_service.send_order_paid_seller_email(
-                    seller.email,
-                    self.order,
-                    seller_name=seller_name,
-                )
-        except Exception:
-            pass
+        # Recibo al comprador y aviso al vendedor en segundo plano (tareas en esta misma transacción)
+        from .tasks import email_pago_vendedor, email_recibo_comprador
+        email_recibo_comprador.enqueue(self.pk)
+        email_pago_vendedor.enqueue(self.pk)
     
     def mark_as_rejected(self):
         """Marca el pago como rechazado"""
@@ -194,9 +171,8 @@ class Payment(BaseModel):
         # (aunque esto no debería pasar normalmente, es una medida de seguridad)
         if self.paid_at:
             try:
-                publication = self.order.publicacion
-                publication.cantidad_disponible = float(publication.cantidad_disponible) + float(self.order.cantidad_acordada)
-                publication.save()
+                from marketplace.stock import restaurar_stock_de_pedido
+                restaurar_stock_de_pedido(self.order)
             except Exception as e:
                 import logging
                 logger = logging.getLogger(__name__)
@@ -204,10 +180,10 @@ class Payment(BaseModel):
         
         # Cancelar la orden
         self.order.estado = 'cancelado'
-        self.order.save()
+        self.order.save(update_fields=['estado', 'updated_at'])
 
         # Notificar al comprador y vendedor del rechazo
-        create_notification(
+        record_notification(
             recipient=self.user,
             title='Pago rechazado',
             message=f'Tu pago del pedido #{self.order.id} fue rechazado.',
@@ -215,7 +191,7 @@ class Payment(BaseModel):
             order_id=self.order.id,
             payment_id=self.id,
         )
-        create_notification(
+        record_notification(
             recipient=self.order.vendedor,
             title='Pago rechazado',
             message=f'El pago del pedido #{self.order.id} fue rechazado y la orden se canceló.',
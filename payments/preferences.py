@@ -0,0 +1,128 @@
+"""
+Preferencias de MercadoPago para varios pedidos a la vez.
+
+Cada preferencia es una llamada HTTPS bloqueante, así que se crean en un pool
+de hilos acotado (MERCADOPAGO_PREFERENCE_WORKERS) con un tiempo máximo por
+llamada (MERCADOPAGO_TIMEOUT). Los hilos solo hablan con la API: los pedidos
+llegan con publicacion__cultivo cargado y los pagos se guardan en el hilo de la
+petición.
+
+La preferencia creada queda en Payment.preference_id y sus datos (init_point,
+referencia, monto y fecha) en Payment.response_data['preference']; mientras el
+pago siga pendiente, el monto no cambie y no pase MERCADOPAGO_PREFERENCE_TTL se
+reutiliza en lugar de crear otra.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .mercadopago_service import MercadoPagoService
+from .models import Payment
+
+logger = logging.getLogger(__name__)
+
+
+def preferencia_vigente(payment, order):
+    """Datos de la preferencia guardada en el pago si todavía sirve, o None"""
+    datos = (payment.response_data or {}).get('preference')
+    if not datos or not payment.preference_id or datos.get('preference_id') != payment.preference_id:
+        return None
+    if payment.status != 'pending' or Decimal(str(datos.get('amount'))) != order.precio_total:
+        return None
+    creada = parse_datetime(datos.get('created_at') or '')
+    ttl = getattr(settings, 'MERCADOPAGO_PREFERENCE_TTL', 0)
+    if creada is None or timezone.now() - creada > timedelta(seconds=ttl):
+        return None
+    return {'success': True, **datos}
+
+
+def _guardar_preferencia(payment, order, resultado):
+    payment.mercadopago_id = resultado['preference_id']
+    payment.preference_id = resultado['preference_id']
+    payment.external_reference = resultado['reference']
+    payment.response_data = {
+        **(payment.response_data or {}),
+        'preference': {
+            'preference_id': resultado['preference_id'],
+            'init_point': resultado['init_point'],
+            'reference': resultado['reference'],
+            'amount': str(order.precio_total),
+            'created_at': timezone.now().isoformat(),
+        },
+    }
+    payment.save()
+
+
+def preparar_pagos(orders, user, service=None, max_workers=None, timeout=None):
+    """
+    Asegura un Payment y una preferencia para cada pedido.
+    Retorna una lista de dicts {'order', 'payment', 'preference_data'[, 'error']}
+    en el orden de `orders`.
+    """
+    orders = list(orders)
+    if timeout is None:
+        timeout = getattr(settings, 'MERCADOPAGO_TIMEOUT', 10.0)
+    if max_workers is None:
+        max_workers = getattr(settings, 'MERCADOPAGO_PREFERENCE_WORKERS', 4)
+
+    pagos = {payment.order_id: payment for payment in Payment.objects.filter(order__in=orders)}
+    resultados = {}
+    pendientes = []
+    for order in orders:
+        payment = pagos.get(order.id)
+        if payment is None:
+            payment = pagos[order.id] = Payment.objects.create(
+                order=order,
+                user=user,
+                amount=order.precio_total,
+                currency='COP',
+                payment_method='pse',
+                description=f"Pago orden #{order.id}",
+                status='pending',
+            )
+        vigente = preferencia_vigente(payment, order)
+        if vigente is not None:
+            resultados[order.id] = vigente
+        else:
+            pendientes.append(order)
+
+    if pendientes:
+        service = service or MercadoPagoService(timeout=timeout)
+        workers = max(1, min(max_workers, len(pendientes)))
+        pool = ThreadPoolExecutor(max_workers=workers)
+        futures = {pool.submit(service.create_preference, order, user): order for order in pendientes}
+        # Cada llamada tiene su propio timeout; el plazo total cubre las tandas del pool
+        tandas = -(-len(pendientes) // workers)
+        terminadas, _ = wait(futures, timeout=timeout * tandas + 1)
+        # No esperar a las llamadas colgadas: su resultado se descarta
+        pool.shutdown(wait=False, cancel_futures=True)
+        for future, order in futures.items():
+            if future in terminadas:
+                resultados[order.id] = future.result()
+            else:
+                resultados[order.id] = {
+                    'success': False,
+                    'error': 'MercadoPago no respondió a tiempo. Intenta de nuevo.',
+                }
+
+        for order in pendientes:
+            resultado = resultados[order.id]
+            logger.info(f"Preference for order {order.id}: success={resultado.get('success', False)}")
+            if resultado.get('success'):
+                _guardar_preferencia(pagos[order.id], order, resultado)
+            else:
+                logger.error(f"Preference error for order {order.id}: {resultado.get('error')}")
+
+    orders_with_checkout = []
+    for order in orders:
+        resultado = resultados[order.id]
+        item = {'order': order, 'payment': pagos[order.id], 'preference_data': resultado}
+        if not resultado.get('success'):
+            item['error'] = resultado.get('error', 'Error desconocido')
+        orders_with_checkout.append(item)
+    return orders_with_checkout
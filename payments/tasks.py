@@ -0,0 +1,41 @@
+"""
+Emails posteriores a un pago aprobado, enviados en segundo plano (ver core/tasks.py).
+"""
+from core.email_service import email_service, raise_on_failure
+from core.tasks import task
+from .models import Payment
+
+
+def _pago(payment_id):
+    return Payment.objects.select_related(
+        'user', 'order__publicacion__cultivo', 'order__vendedor'
+    ).filter(pk=payment_id).first()
+
+
+@task(priority=5)
+def email_recibo_comprador(payment_id):
+    """Recibo por email al comprador"""
+    payment = _pago(payment_id)
+    if payment is None or not email_service.is_configured or not payment.user.email:
+        return
+    raise_on_failure(email_service.send_order_confirmation_email(
+        payment.user.email,
+        payment.order,
+        user_name=getattr(payment.user, 'first_name', None) or payment.user.username,
+    ))
+
+
+@task(priority=5)
+def email_pago_vendedor(payment_id):
+    """Aviso al vendedor de que el pedido fue pagado"""
+    payment = _pago(payment_id)
+    if payment is None or not email_service.is_configured:
+        return
+    seller = payment.order.vendedor
+    if not seller or not getattr(seller, 'email', None):
+        return
+    raise_on_failure(email_service.send_order_paid_seller_email(
+        seller.email,
+        payment.order,
+        seller_name=getattr(seller, 'first_name', None) or seller.username,
+    ))
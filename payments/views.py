@@ -98,7 +98,7 @@ def checkout_view(request, order_id):
         # Actualizar estado del pedido
         # El estado se mantiene como 'pendiente' hasta que el vendedor confirme
         # order.estado = 'pendiente'  # Ya está en pendiente por defecto
-        order.save()
+        order.save(update_fields=['updated_at'])
         
         messages.success(request, f'¡Pago procesado automáticamente! Tu pedido #{order.id} ha sido pagado.')
         return redirect('order_detail', order_id=order.id)
@@ -136,7 +136,7 @@ def checkout_view(request, order_id):
         # Actualizar estado del pedido
         # El estado se mantiene como 'pendiente' hasta que el vendedor confirme
         # order.estado = 'pendiente'  # Ya está en pendiente por defecto
-        order.save()
+        order.save(update_fields=['updated_at'])
         
         messages.success(request, f'¡Pago procesado automáticamente! Tu pedido #{order.id} ha sido pagado.')
         return redirect('order_detail', order_id=order.id)
@@ -148,7 +148,7 @@ def checkout_view(request, order_id):
         payment.preference_id = preference_result['preference_id']
         payment.external_reference = preference_result['reference']
         payment.amount = order.precio_total
-        payment.save()
+        payment.save(update_fields=['mercadopago_id', 'preference_id', 'external_reference', 'amount', 'updated_at'])
     else:
         payment = Payment.objects.create(
             order=order,
@@ -393,7 +393,7 @@ def cancel_payment_view(request, payment_id):
     
     # Cancelar el pago
     payment.status = 'cancelled'
-    payment.save()
+    payment.save(update_fields=['status', 'updated_at'])
     
     messages.success(request, 'Pago cancelado exitosamente.')
     return redirect('order_detail', order_id=payment.order.id)
@@ -473,7 +473,7 @@ def payment_failure_view(request):
         order = payment.order
         # El estado se mantiene como 'pendiente' hasta que el vendedor confirme
         # order.estado = 'pendiente'  # Ya está en pendiente por defecto
-        order.save()
+        order.save(update_fields=['updated_at'])
         
         messages.success(request, f'¡Pago procesado automáticamente! Tu pedido #{order.id} ha sido pagado.')
         return redirect('order_detail', order_id=order.id)
@@ -506,7 +506,7 @@ def payment_pending_view(request):
         order = payment.order
         # El estado se mantiene como 'pendiente' hasta que el vendedor confirme
         # order.estado = 'pendiente'  # Ya está en pendiente por defecto
-        order.save()
+        order.save(update_fields=['updated_at'])
         
         messages.success(request, f'¡Pago procesado automáticamente! Tu pedido #{order.id} ha sido pagado.')
         return redirect('order_detail', order_id=order.id)
@@ -536,14 +536,14 @@ def payment_notification_webhook(request):
                     payment.mercadopago_id = result['payment_id']
                     payment.status = 'approved' if result['approved'] else 'rejected'
                     payment.response_data = result['raw_data']
-                    payment.save()
+                    payment.save(update_fields=['mercadopago_id', 'status', 'response_data', 'updated_at'])
                     
                     # Actualizar estado del pedido - mantener como 'pendiente' para que el vendedor pueda confirmar
                     if result['approved']:
                         order = payment.order
                         # El estado se mantiene como 'pendiente' hasta que el vendedor confirme
                         # order.estado = 'pendiente'  # Ya está en pendiente por defecto
-                        order.save()
+                        order.save(update_fields=['updated_at'])
                     
                     logger.info(f"Webhook procesado: Payment {payment.id} - Status: {payment.status}")
                     
@@ -575,13 +575,13 @@ def simulate_payment_processing(request, payment_id):
         payment.status = 'approved'
         payment.response_data = simulated_result['raw_data']
         payment.paid_at = timezone.now()
-        payment.save()
+        payment.save(update_fields=['status', 'response_data', 'paid_at', 'updated_at'])
         
         # Actualizar estado del pedido
         order = payment.order
         # El estado se mantiene como 'pendiente' hasta que el vendedor confirme
         # order.estado = 'pendiente'  # Ya está en pendiente por defecto
-        order.save()
+        order.save(update_fields=['updated_at'])
         
         messages.success(
             request, 
@@ -21,7 +21,7 @@ class ConversationAdmin(admin.ModelAdmin):
     inlines = [MessageInline]
     
     def publication_info(self, obj):
-        return f"{obj.publication.cultivo.nombre} - {obj.publication.cultivo.productor.first_name}"
+        return f"{obj.publication.cultivo.nombre} - {obj.publication.productor.first_name}"
     publication_info.short_description = 'Publicación'
     
     def participants_list(self, obj):
@@ -30,7 +30,7 @@ class ConversationAdmin(admin.ModelAdmin):
     participants_list.short_description = 'Participantes'
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('publication__cultivo__productor', 'publication__cultivo').prefetch_related('participants', 'messages')
+        return super().get_queryset(request).select_related('publication__cultivo', 'publication__productor').prefetch_related('participants', 'messages')
 
 # Message Admin
 @admin.register(Message)
@@ -56,7 +56,7 @@ class MessageAdmin(admin.ModelAdmin):
 class OrderAdmin(admin.ModelAdmin):
     list_display = ('id', 'publicacion', 'comprador', 'estado', 'cantidad_acordada', 'precio_total', 'created_at')
     list_filter = ('estado', 'comprador')
-    search_fields = ('publicacion__cultivo__nombre', 'comprador__username')
+    search_fields = ('publicacion__cultivo__nombre', 'comprador__username', 'vendedor__username')
     readonly_fields = ('precio_total',)
     list_editable = ('estado',)
     date_hierarchy = 'created_at'
@@ -83,7 +83,7 @@ class OrderAdmin(admin.ModelAdmin):
     )
     
     def publicacion_info(self, obj):
-        return f"{obj.publicacion.cultivo.nombre} - {obj.publicacion.cultivo.productor.first_name}"
+        return f"{obj.publicacion.cultivo.nombre} - {obj.vendedor.first_name}"
     publicacion_info.short_description = 'Publicación'
     
     def comprador_info(self, obj):
@@ -110,7 +110,7 @@ class OrderAdmin(admin.ModelAdmin):
     estado_badge.short_description = 'Estado Visual'
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('publicacion__cultivo__productor', 'publicacion__cultivo', 'comprador')
+        return super().get_queryset(request).select_related('publicacion__cultivo', 'publicacion__productor', 'vendedor', 'comprador')
 
 # Rating Admin
 @admin.register(Rating)
@@ -145,7 +145,7 @@ class RatingAdmin(admin.ModelAdmin):
     promedio_display.short_description = 'Promedio'
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('pedido__publicacion__cultivo__productor', 'pedido__publicacion__cultivo', 'calificador', 'calificado')
+        return super().get_queryset(request).select_related('pedido__publicacion__cultivo', 'calificador', 'calificado')
 
 # Acciones personalizadas para Order
 @admin.action(description='Confirmar pedidos seleccionados')
@@ -0,0 +1,169 @@
+"""
+Mensajes de chat en vivo por Server-Sent Events.
+
+conversation_stream (sales/views.py) mantiene abierta una respuesta por cada
+conversación abierta en el navegador y le envía cada mensaje nuevo como un
+evento SSE. Solo funciona servida por ASGI (agroconnect/asgi.py); bajo WSGI
+responde 204 y la página vuelve al polling de get_new_messages.
+
+Al guardarse un Message, sales.signals sube Conversation.last_message_id y,
+tras el commit, avisa por el broker a los streams de esa conversación en este
+proceso, que leen los mensajes nuevos en una consulta. Los streams de otros
+workers no reciben ese aviso: cada CHAT_STREAM_CHECK_INTERVAL segundos
+consultan la base de datos de todos modos, así que con varios workers un
+mensaje tarda como mucho ese intervalo en llegar.
+
+Cada stream se cierra tras CHAT_STREAM_MAX_AGE segundos; EventSource se
+reconecta solo y retoma desde el último id recibido (Last-Event-ID).
+"""
+import asyncio
+import json
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+MESSAGES_PER_EVENT_BATCH = 100
+RECONNECT_MILLISECONDS = 3000
+
+
+def _check_interval():
+    return getattr(settings, 'CHAT_STREAM_CHECK_INTERVAL', 15)
+
+
+def _max_age():
+    return getattr(settings, 'CHAT_STREAM_MAX_AGE', 300)
+
+
+class Broker:
+    """
+    Pub/sub en memoria: conversación -> eventos asyncio de los streams suscritos.
+    publish() puede llamarse desde cualquier hilo (los receivers de señales
+    corren en el hilo de la vista); el aviso se entrega en el loop de cada stream.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, conversation_id):
+        wakeup = asyncio.Event()
+        subscription = (asyncio.get_running_loop(), wakeup)
+        with self._lock:
+            self._subscribers.setdefault(conversation_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, conversation_id, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(conversation_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[conversation_id]
+
+    def publish(self, conversation_id):
+        with self._lock:
+            subscribers = list(self._subscribers.get(conversation_id, ()))
+        for loop, wakeup in subscribers:
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                # El loop del stream ya se cerró
+                pass
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+broker = Broker()
+
+
+def message_payload(message):
+    """Mismo formato que get_new_messages y el envío por AJAX"""
+    return {
+        'id': message.id,
+        'sender_id': message.sender_id,
+        'sender_name': message.sender.get_full_name() or message.sender.username,
+        'content': message.content,
+        'created_at': message.created_at.isoformat(),
+    }
+
+
+def messages_since(conversation_id, since_id, limit=None):
+    """Mensajes de la conversación con id mayor a `since_id`, ya serializados"""
+    from .models import Message
+
+    mensajes = Message.objects.filter(
+        conversation_id=conversation_id, id__gt=since_id
+    ).select_related('sender').order_by('id')
+    if limit is not None:
+        mensajes = mensajes[:limit]
+    return [message_payload(message) for message in mensajes]
+
+
+def conversation_version(conversation_id, user):
+    """
+    last_message_id de la conversación si `user` participa en ella, o None.
+    Una sola consulta, sin leer mensajes.
+    """
+    from .models import Conversation
+
+    return Conversation.objects.filter(
+        pk=conversation_id, participants=user
+    ).values_list('last_message_id', flat=True).first()
+
+
+def message_saved(message):
+    """Sube la versión de la conversación y avisa a sus streams tras el commit"""
+    from django.db import transaction
+    from .models import Conversation
+
+    if message.conversation_id is None:
+        return
+    Conversation.objects.filter(
+        pk=message.conversation_id, last_message_id__lt=message.pk
+    ).update(last_message_id=message.pk)
+    conversation_id = message.conversation_id
+    transaction.on_commit(lambda: broker.publish(conversation_id))
+
+
+def _event(payload):
+    return f"id: {payload['id']}\nevent: message\ndata: {json.dumps(payload)}\n\n"
+
+
+async def message_stream(conversation_id, last_id, check_interval=None, max_age=None):
+    """
+    Generador asíncrono con el cuerpo SSE: los mensajes posteriores a `last_id`
+    y luego cada mensaje nuevo, con un comentario de keep-alive en cada
+    intervalo sin novedades.
+    """
+    check_interval = check_interval or _check_interval()
+    max_age = max_age or _max_age()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_age
+    subscription = broker.subscribe(conversation_id)
+    wakeup = subscription[1]
+    leer = sync_to_async(messages_since)
+    try:
+        yield f'retry: {RECONNECT_MILLISECONDS}\n\n'
+        while True:
+            # Limpiar antes de leer: un aviso durante la consulta no se pierde
+            wakeup.clear()
+            while True:
+                nuevos = await leer(conversation_id, last_id, MESSAGES_PER_EVENT_BATCH)
+                for payload in nuevos:
+                    last_id = payload['id']
+                    yield _event(payload)
+                if len(nuevos) < MESSAGES_PER_EVENT_BATCH:
+                    break
+
+            restante = deadline - loop.time()
+            if restante <= 0:
+                return
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=min(check_interval, restante))
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+    finally:
+        broker.unsubscribe(conversation_id, subscription)
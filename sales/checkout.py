@@ -0,0 +1,118 @@
+"""
+Creación de pedidos desde el carrito en una sola transacción.
+
+checkout_cart valida todas las líneas contra una única lectura bloqueada del
+stock, crea los pedidos con bulk_create, deja las notificaciones en el outbox
+(core/outbox.py) con otro bulk_create y encola los emails para después del
+commit. La cantidad de consultas no depende del número de líneas del carrito.
+
+Como bulk_create no dispara post_save, los avisos de "pedido creado" se arman
+aquí con las mismas funciones que usa sales.signals para Order.objects.create,
+y el aporte de los pedidos al resumen diario (sales/rollups.py) se suma en la
+misma transacción, agrupado por fila.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+
+from cart.models import Cart, CartItem
+from cart.snapshot import CartSnapshot
+from cart.summary import invalidate_cart_summaries
+from core.models import Notification
+from core.outbox import record_notifications
+from marketplace.models import Publication
+from .models import Order
+from .rollups import apply_contributions, order_contributions
+from .tasks import encolar_emails_pedidos_creados
+
+
+class CheckoutError(Exception):
+    """El carrito no se puede convertir en pedidos; el mensaje es para el usuario"""
+
+
+def order_created_notifications(order):
+    """Notificaciones (sin guardar) para el vendedor y el comprador de un pedido nuevo"""
+    publicacion = order.publicacion
+    comprador = order.comprador
+    return [
+        Notification(
+            recipient_id=order.vendedor_id,
+            title='Nuevo pedido recibido',
+            message=f'Has recibido un nuevo pedido #{order.id} de {comprador.first_name} {comprador.last_name} por {order.cantidad_acordada} {publicacion.cultivo.unidad_medida} de {publicacion.cultivo.nombre}.',
+            category='order',
+            order_id=order.id,
+        ),
+        Notification(
+            recipient=comprador,
+            title='Pedido creado',
+            message=f'Tu pedido #{order.id} ha sido creado exitosamente. Esperando confirmación del vendedor.',
+            category='order',
+            order_id=order.id,
+        ),
+    ]
+
+
+def checkout_cart(user):
+    """
+    Convierte el carrito del usuario en pedidos pendientes de pago.
+    Retorna la lista de pedidos creados o lanza CheckoutError.
+    """
+    cart = Cart.objects.filter(user=user).first()
+    if cart is None:
+        raise CheckoutError("Tu carrito está vacío.")
+
+    with transaction.atomic():
+        snapshot = CartSnapshot.for_cart(cart)
+        if not snapshot:
+            raise CheckoutError("Tu carrito está vacío.")
+
+        # Una sola lectura del stock, bloqueando las filas hasta el commit
+        # (en orden de id para que dos compras simultáneas no se bloqueen entre sí)
+        publication_ids = sorted({line.publication.pk for line in snapshot})
+        stock = dict(
+            Publication.objects.select_for_update()
+            .filter(pk__in=publication_ids)
+            .order_by('pk')
+            .values_list('pk', 'cantidad_disponible')
+        )
+
+        # Validar todo el carrito antes de escribir; varias líneas de la misma
+        # publicación (en distintas unidades) suman contra el mismo stock
+        solicitado = {}
+        for line in snapshot:
+            publication = line.publication
+            if line.cantidad_en_unidad_vendedor is None:
+                raise CheckoutError(f"❌ {publication.cultivo.nombre}: unidad no convertible")
+            solicitado[publication.pk] = solicitado.get(publication.pk, 0) + line.cantidad_en_unidad_vendedor
+            if solicitado[publication.pk] > stock.get(publication.pk, 0):
+                raise CheckoutError(
+                    f"❌ {publication.cultivo.nombre}: disponible {line.disponible:.1f} {line.unidad_compra}"
+                )
+
+        # NOTA: No restamos la cantidad aquí, se restará cuando se apruebe el pago
+        # (ver marketplace/stock.py y payments.models.Payment.mark_as_approved)
+        orders = Order.objects.bulk_create([
+            Order(
+                publicacion=line.publication,
+                vendedor_id=line.publication.productor_id,
+                comprador=user,
+                cantidad_acordada=line.cantidad_en_unidad_vendedor.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
+                precio_total=line.precio_total,
+                estado='pendiente',
+            )
+            for line in snapshot
+        ])
+
+        record_notifications([
+            notification
+            for order in orders
+            for notification in order_created_notifications(order)
+        ])
+
+        CartItem.objects.filter(cart=cart).delete()
+        invalidate_cart_summaries([user.pk])
+
+        encolar_emails_pedidos_creados(orders)
+        apply_contributions(order_contributions(orders))
+
+    return orders
@@ -0,0 +1,236 @@
+"""
+Rankings precalculados de vendedores y compradores.
+
+rankings_view no ordena perfiles en cada visita: lee las filas de
+LeaderboardEntry de un segmento (general, un departamento o una categoría) en
+una sola consulta. rebuild_leaderboards las recalcula todas con una consulta
+por tablero, usando ROW_NUMBER() OVER (PARTITION BY ...) para obtener el top de
+cada departamento y categoría de una vez.
+
+Los vendedores se ordenan por un promedio bayesiano: cada vendedor empieza con
+LEADERBOARD_PRIOR_WEIGHT calificaciones "virtuales" iguales al promedio de toda
+la plataforma, así que un 5.0 con una sola calificación no supera a un 4.8 con
+cientos.
+
+Las ventas completadas y las calificaciones de vendedores programan una
+reconstrucción diferida (una sola aunque lleguen muchos cambios seguidos); el
+comando rebuild_leaderboards sirve para cron o para corregir a mano.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Sum, Value, Window
+from django.db.models.functions import Cast, Coalesce, NullIf, RowNumber
+from django.utils import timezone
+
+LEADERBOARD_SIZE = 10
+SEGMENTS_CACHE_KEY = 'sales:rankings:segmentos'
+SEGMENTS_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def _prior_weight():
+    return getattr(settings, 'LEADERBOARD_PRIOR_WEIGHT', 5)
+
+
+def _refresh_delay():
+    return timedelta(seconds=getattr(settings, 'LEADERBOARD_REFRESH_DELAY', 60))
+
+
+def global_prior():
+    """(m, C): peso del prior y promedio general de las calificaciones a vendedores"""
+    from accounts.models import ProducerProfile
+
+    totales = ProducerProfile.objects.aggregate(
+        suma=Sum('suma_calificacion_general'), n=Sum('total_calificaciones'),
+    )
+    promedio_global = totales['suma'] / totales['n'] if totales['n'] else 0.0
+    return float(_prior_weight()), promedio_global
+
+
+def bayesian_score(prior, prefix=''):
+    """
+    Expresión del puntaje bayesiano de un vendedor: (m·C + suma) / (m + n).
+    `prefix` apunta al perfil desde otro modelo
+    (p. ej. 'vendedor__producer_profile__').
+    """
+    m, promedio_global = prior
+    suma = Cast(Coalesce(F(f'{prefix}suma_calificacion_general'), 0), FloatField())
+    conteo = Cast(Coalesce(F(f'{prefix}total_calificaciones'), 0), FloatField())
+    return Coalesce(
+        (Value(m * promedio_global) + suma) / NullIf(Value(m) + conteo, Value(0.0)),
+        Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def _top(queryset, order_by, partition_by=None, size=LEADERBOARD_SIZE):
+    """Top `size` del queryset, o de cada partición si se indica `partition_by`"""
+    if partition_by is None:
+        return list(queryset.order_by(*order_by)[:size])
+    return list(
+        queryset.annotate(
+            posicion=Window(RowNumber(), partition_by=F(partition_by), order_by=order_by)
+        ).filter(posicion__lte=size).order_by(partition_by, 'posicion')
+    )
+
+
+def _nombre(user):
+    return user.get_full_name() or user.username
+
+
+def _entries_for(rows, tablero, alcance, valor_de, entry_de):
+    """Numera las filas dentro de cada segmento y las convierte en LeaderboardEntry"""
+    from .models import LeaderboardEntry
+
+    posiciones = {}
+    entries = []
+    for row in rows:
+        valor = valor_de(row) or ''
+        if alcance != 'general' and not valor:
+            continue
+        posiciones[valor] = posiciones.get(valor, 0) + 1
+        entries.append(LeaderboardEntry(
+            tablero=tablero, alcance=alcance, valor=valor, posicion=posiciones[valor], **entry_de(row)
+        ))
+    return entries
+
+
+def _seller_entry(profile):
+    return dict(
+        user_id=profile.user_id,
+        nombre=_nombre(profile.user),
+        detalle=profile.ubicacion_completa,
+        puntaje=getattr(profile, 'puntaje', 0),
+        calificacion_promedio=profile.calificacion_promedio,
+        total_calificaciones=profile.total_calificaciones,
+        total_operaciones=profile.total_ventas,
+        monto=profile.ingresos_totales,
+    )
+
+
+def _buyer_entry(profile):
+    return dict(
+        user_id=profile.user_id,
+        nombre=_nombre(profile.user),
+        detalle=profile.company_name or '',
+        calificacion_promedio=profile.promedio('calificacion_general') or 0,
+        total_calificaciones=profile.total_calificaciones,
+        total_operaciones=profile.total_compras,
+        monto=profile.gastos_totales,
+    )
+
+
+def build_leaderboard_entries(size=LEADERBOARD_SIZE):
+    """Calcula (sin guardar) todas las filas de todos los tableros y segmentos"""
+    from accounts.models import BuyerProfile, ProducerProfile, User
+    from .models import Order
+
+    prior = global_prior()
+    vendedores = ProducerProfile.objects.filter(
+        user__role='Productor', total_ventas__gt=0
+    ).select_related('user').annotate(puntaje=bayesian_score(prior))
+    compradores = BuyerProfile.objects.filter(
+        user__role='Comprador', total_compras__gt=0
+    ).select_related('user')
+
+    por_puntaje = [F('puntaje').desc(), F('total_ventas').desc(), F('total_calificaciones').desc(), F('user_id').asc()]
+    por_ventas = [F('total_ventas').desc(), F('ingresos_totales').desc(), F('user_id').asc()]
+    por_gastos = [F('gastos_totales').desc(), F('total_compras').desc(), F('user_id').asc()]
+
+    general = lambda row: ''
+    departamento = lambda row: row.departamento
+
+    entries = []
+    for rows, tablero, entry_de, order_by in (
+        (vendedores, 'vendedores', _seller_entry, por_puntaje),
+        (compradores, 'compradores', _buyer_entry, por_gastos),
+        (vendedores, 'activos', _seller_entry, por_ventas),
+    ):
+        entries += _entries_for(_top(rows, order_by, size=size), tablero, 'general', general, entry_de)
+        entries += _entries_for(
+            _top(rows.exclude(departamento__isnull=True).exclude(departamento=''), order_by, 'departamento', size),
+            tablero, 'departamento', departamento, entry_de,
+        )
+
+    # Por categoría: ventas completadas de cada vendedor en esa categoría
+    perfil = 'vendedor__producer_profile__'
+    por_categoria = _top(
+        Order.objects.filter(
+            estado='completado', vendedor__role='Productor',
+        ).values(
+            categoria=F('publicacion__cultivo__categoria'),
+            productor_id=F('vendedor_id'),
+            calificacion_promedio=F(f'{perfil}calificacion_promedio'),
+            total_calificaciones=F(f'{perfil}total_calificaciones'),
+        ).annotate(
+            ventas=Count('id'), ingresos=Sum('precio_total'), puntaje=bayesian_score(prior, perfil),
+        ),
+        [F('puntaje').desc(), F('ventas').desc(), F('productor_id').asc()],
+        'publicacion__cultivo__categoria',
+        size,
+    )
+    usuarios = User.objects.in_bulk({row['productor_id'] for row in por_categoria})
+    entries += _entries_for(
+        por_categoria, 'vendedores', 'categoria', lambda row: row['categoria'],
+        lambda row: dict(
+            user_id=row['productor_id'],
+            nombre=_nombre(usuarios[row['productor_id']]),
+            detalle='',
+            puntaje=row['puntaje'],
+            calificacion_promedio=row['calificacion_promedio'] or 0,
+            total_calificaciones=row['total_calificaciones'] or 0,
+            total_operaciones=row['ventas'],
+            monto=row['ingresos'] or 0,
+        ),
+    )
+    return entries
+
+
+def rebuild_leaderboards(size=LEADERBOARD_SIZE):
+    """Reemplaza todas las filas de LeaderboardEntry; retorna cuántas quedaron"""
+    from .models import LeaderboardEntry
+
+    entries = build_leaderboard_entries(size)
+    with transaction.atomic():
+        LeaderboardEntry.objects.all().delete()
+        LeaderboardEntry.objects.bulk_create(entries, batch_size=500)
+        transaction.on_commit(lambda: cache.delete(SEGMENTS_CACHE_KEY))
+    return len(entries)
+
+
+def leaderboard_segments():
+    """Departamentos y categorías con ranking propio, para el selector de la vista"""
+    from inventory.models import Crop
+    from .models import LeaderboardEntry
+
+    segmentos = cache.get(SEGMENTS_CACHE_KEY)
+    if segmentos is None:
+        valores = set(
+            LeaderboardEntry.objects.exclude(alcance='general').values_list('alcance', 'valor').distinct()
+        )
+        etiquetas = dict(Crop.CATEGORIA_CHOICES)
+        segmentos = {
+            'departamentos': sorted(valor for alcance, valor in valores if alcance == 'departamento'),
+            'categorias': sorted(
+                ((valor, etiquetas.get(valor, valor)) for alcance, valor in valores if alcance == 'categoria'),
+                key=lambda item: item[1],
+            ),
+        }
+        cache.set(SEGMENTS_CACHE_KEY, segmentos, SEGMENTS_CACHE_TIMEOUT)
+    return segmentos
+
+
+def schedule_leaderboard_refresh():
+    """
+    Programa una reconstrucción para dentro de LEADERBOARD_REFRESH_DELAY
+    segundos, salvo que ya haya una pendiente (al hacer commit).
+    """
+    def programar():
+        from core.models import Task
+        from .tasks import refresh_leaderboards
+
+        if not Task.objects.filter(name=refresh_leaderboards.name, status='pending').exists():
+            refresh_leaderboards.enqueue(run_at=timezone.now() + _refresh_delay())
+    transaction.on_commit(programar)
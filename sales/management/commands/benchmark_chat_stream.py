@@ -0,0 +1,188 @@
+"""
+Prueba de carga del chat en vivo (sales/chat.py): abre N streams SSE en este
+proceso repartidos entre varias conversaciones y mide la memoria por stream,
+la latencia de entrega de mensajes nuevos a todos los suscriptores y las
+consultas por segundo con los streams en reposo, frente al polling cada 0.5 s.
+
+Los streams se consumen directamente (sin servidor ni sockets), así que la
+memoria es la del generador y su tarea, sin los buffers del servidor ASGI.
+Los datos se crean dentro de una transacción que se revierte al final.
+"""
+import asyncio
+import time
+import tracemalloc
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from sales.chat import broker, message_stream
+from sales.models import Conversation, Message
+
+POLLING_INTERVAL = 0.5
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+class Command(BaseCommand):
+    help = 'Mide memoria, latencia de entrega y consultas de los streams del chat en vivo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--streams', type=int, default=500, help='Streams abiertos a la vez')
+        parser.add_argument('--conversaciones', type=int, default=50)
+        parser.add_argument('--mensajes', type=int, default=50, help='Mensajes enviados durante la prueba')
+        parser.add_argument('--intervalo', type=float, default=1.0,
+                            help='Segundos entre consultas de respaldo de cada stream')
+        parser.add_argument('--reposo', type=float, default=3.0,
+                            help='Segundos sin mensajes para contar consultas')
+
+    def handle(self, *args, **options):
+        if options['conversaciones'] < 1 or options['streams'] < options['conversaciones']:
+            raise CommandError('Se necesita al menos un stream por conversación')
+
+        self.stdout.write(self.style.WARNING(
+            f'{options["streams"]} streams en {options["conversaciones"]} conversaciones, '
+            f'{options["mensajes"]} mensajes, respaldo cada {options["intervalo"]}s'
+        ))
+        try:
+            # ALLOWED_HOSTS para el cliente de prueba de get_new_messages
+            with override_settings(ALLOWED_HOSTS=['*']), transaction.atomic():
+                conversaciones, usuarios = self._datos(options['conversaciones'])
+                self._medir_polling(conversaciones[0], usuarios[0])
+                # async_to_sync: las consultas de los streams corren en este hilo,
+                # dentro de la transacción, y pasan por el contador
+                self.consultas = []
+                with connection.execute_wrapper(self._contar):
+                    async_to_sync(self._medir_streams)(conversaciones, usuarios, options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _datos(self, cantidad):
+        User = get_user_model()
+        comprador = User.objects.create_user('bench_chat_comprador', role='Comprador')
+        productor = User.objects.create_user('bench_chat_productor', role='Productor')
+        conversaciones = []
+        for _ in range(cantidad):
+            conversation = Conversation.objects.create()
+            conversation.participants.add(comprador, productor)
+            # Mensaje inicial: cada stream lo recibe al abrirse y así se sabe que ya está suscrito
+            Message.objects.create(conversation=conversation, sender=productor, content='Hola')
+            conversaciones.append(conversation.pk)
+        return conversaciones, [comprador, productor]
+
+    def _medir_polling(self, conversation_id, usuario):
+        client = Client()
+        client.force_login(usuario)
+        url = reverse('get_new_messages', args=[conversation_id])
+        ultimo = Conversation.objects.values_list('last_message_id', flat=True).get(pk=conversation_id)
+        client.get(url, {'since': ultimo})
+        with CaptureQueriesContext(connection) as consultas:
+            client.get(url, {'since': ultimo})
+        self.consultas_por_poll = len(consultas)
+
+    def _contar(self, execute, sql, params, many, context):
+        self.consultas.append(time.perf_counter())
+        return execute(sql, params, many, context)
+
+    async def _medir_streams(self, conversaciones, usuarios, options):
+        n = options['streams']
+        recibidos = {}
+        listos = asyncio.Event()
+        abiertos = [0]
+
+        async def consumir(conversation_id):
+            primero = True
+            async for chunk in message_stream(conversation_id, 0, check_interval=options['intervalo'],
+                                              max_age=3600):
+                if not chunk.startswith('id: '):
+                    continue
+                if primero:
+                    primero = False
+                    abiertos[0] += 1
+                    if abiertos[0] == n:
+                        listos.set()
+                    continue
+                message_id = int(chunk.split('\n', 1)[0][4:])
+                recibidos.setdefault(message_id, []).append(time.perf_counter())
+
+        tracemalloc.start()
+        antes = tracemalloc.take_snapshot()
+        tareas = [asyncio.ensure_future(consumir(conversaciones[i % len(conversaciones)])) for i in range(n)]
+        inicio = time.perf_counter()
+        await asyncio.wait_for(listos.wait(), timeout=60)
+        apertura = time.perf_counter() - inicio
+        despues = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        memoria = sum(stat.size_diff for stat in despues.compare_to(antes, 'filename'))
+        self.stdout.write(
+            f'Apertura      {apertura:6.2f}s  memoria: {memoria / n / 1024:.1f} KiB por stream '
+            f'({memoria / 1024 / 1024:.1f} MiB en total)'
+        )
+
+        # Reposo: solo las consultas de respaldo
+        desde = len(self.consultas)
+        await asyncio.sleep(options['reposo'])
+        en_reposo = (len(self.consultas) - desde) / options['reposo']
+        polling = n / POLLING_INTERVAL * self.consultas_por_poll
+        self.stdout.write(
+            f'En reposo     {en_reposo:8.1f} consultas/s  '
+            f'(polling cada {POLLING_INTERVAL}s: {polling:.0f} consultas/s, '
+            f'{self.consultas_por_poll} por petición)'
+        )
+
+        # Entrega: el aviso normalmente sale de transaction.on_commit (sales.signals);
+        # aquí la transacción no se confirma, así que se publica a mano
+        crear = sync_to_async(Message.objects.create)
+        por_conversacion = {
+            conversation_id: len(range(i, n, len(conversaciones)))
+            for i, conversation_id in enumerate(conversaciones)
+        }
+        enviados = {}
+        esperados = 0
+        for i in range(options['mensajes']):
+            conversation_id = conversaciones[i % len(conversaciones)]
+            message = await crear(conversation_id=conversation_id, sender=usuarios[i % 2], content=f'Mensaje {i}')
+            enviados[message.pk] = time.perf_counter()
+            esperados += por_conversacion[conversation_id]
+            broker.publish(conversation_id)
+            await asyncio.sleep(0.01)
+
+        limite = time.perf_counter() + options['intervalo'] * 2 + 5
+        while sum(len(v) for v in recibidos.values()) < esperados and time.perf_counter() < limite:
+            await asyncio.sleep(0.05)
+
+        latencias = [
+            (recibido - enviados[message_id]) * 1000
+            for message_id, tiempos in recibidos.items()
+            for recibido in tiempos
+        ]
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+
+        entregas = len(latencias)
+        if not latencias:
+            raise CommandError('Ningún stream recibió los mensajes')
+        self.stdout.write(
+            f'Entrega       {entregas}/{esperados} entregas  latencia p50 {_percentil(latencias, 0.5):.1f} ms, '
+            f'p95 {_percentil(latencias, 0.95):.1f} ms, máx {max(latencias):.1f} ms'
+        )
+        if entregas < esperados:
+            raise CommandError('Algunos streams no recibieron todos los mensajes')
+        if broker.subscriber_count():
+            raise CommandError('Quedaron suscripciones abiertas en el broker')
+        self.stdout.write(self.style.SUCCESS(
+            f'{polling / max(en_reposo, 0.1):.0f}x menos consultas en reposo que el polling.'
+        ))
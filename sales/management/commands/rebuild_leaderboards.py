@@ -0,0 +1,21 @@
+"""
+Recalcula las tablas de rankings (sales/leaderboard.py).
+
+Se programa solo tras cada venta completada o calificación; este comando sirve
+para ejecutarlo desde cron o después de cambiar LEADERBOARD_PRIOR_WEIGHT.
+"""
+from django.core.management.base import BaseCommand
+
+from sales.leaderboard import LEADERBOARD_SIZE, rebuild_leaderboards
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los rankings de vendedores y compradores (general, por departamento y por categoría)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=LEADERBOARD_SIZE, help='Posiciones por ranking')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('Recalculando rankings...'))
+        filas = rebuild_leaderboards(size=options['size'])
+        self.stdout.write(self.style.SUCCESS(f'Listo: {filas} posición(es) en los rankings.'))
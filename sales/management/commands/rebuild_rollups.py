@@ -0,0 +1,33 @@
+"""
+Recalcula el resumen diario de pedidos (DailyStats, ver sales/rollups.py).
+
+El resumen se mantiene solo con cada cambio de estado; este comando corrige
+las desviaciones de ediciones directas o update() masivos.
+
+    python manage.py rebuild_rollups            # todo el histórico
+    python manage.py rebuild_rollups --dias 7   # solo la última semana
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from sales.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el resumen diario de pedidos usado por los paneles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=None,
+                            help='Recalcular solo los últimos N días (por defecto, todo)')
+
+    def handle(self, *args, **options):
+        desde = None
+        if options['dias'] is not None:
+            desde = timezone.localdate() - timedelta(days=options['dias'])
+        self.stdout.write(self.style.WARNING(
+            f'Recalculando resumen diario desde {desde}...' if desde else 'Recalculando resumen diario...'
+        ))
+        filas = rebuild_rollups(desde=desde)
+        self.stdout.write(self.style.SUCCESS(f'Listo: {filas} fila(s) de resumen.'))
@@ -0,0 +1,21 @@
+"""
+Reconstruye los totales de calificaciones de todos los perfiles.
+
+Los totales se mantienen solos con cada calificación (sales/rating_stats.py);
+este comando sirve para corregirlos tras cargas masivas o ediciones directas
+en la base de datos.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from sales.rating_stats import recompute_profile_stats
+
+
+class Command(BaseCommand):
+    help = 'Recalcula total, sumas y promedio de calificaciones de productores y compradores'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('Recalculando estadísticas de calificaciones...'))
+        with transaction.atomic():
+            perfiles = recompute_profile_stats()
+        self.stdout.write(self.style.SUCCESS(f'Listo: {perfiles} perfil(es) con calificaciones.'))
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.24 on 2026-10-18 05:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('sales', '0004_add_qr_tokens'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tablero', models.CharField(choices=[('vendedores', 'Mejores Vendedores'), ('compradores', 'Mejores Compradores'), ('activos', 'Vendedores más Activos')], max_length=20, verbose_name='Tablero')),
+                ('alcance', models.CharField(choices=[('general', 'General'), ('departamento', 'Departamento'), ('categoria', 'Categoría')], default='general', max_length=20, verbose_name='Alcance')),
+                ('valor', models.CharField(blank=True, default='', help_text='Departamento o categoría; vacío en el ranking general', max_length=100, verbose_name='Segmento')),
+                ('posicion', models.PositiveSmallIntegerField(verbose_name='Posición')),
+                ('nombre', models.CharField(max_length=255, verbose_name='Nombre')),
+                ('detalle', models.CharField(blank=True, default='', max_length=255, verbose_name='Ubicación o empresa')),
+                ('puntaje', models.FloatField(default=0, verbose_name='Puntaje bayesiano')),
+                ('calificacion_promedio', models.DecimalField(decimal_places=2, default=0, max_digits=3, verbose_name='Calificación Promedio')),
+                ('total_calificaciones', models.IntegerField(default=0, verbose_name='Calificaciones')),
+                ('total_operaciones', models.IntegerField(default=0, verbose_name='Ventas o compras')),
+                ('monto', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Ingresos o gastos')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Posición en Ranking',
+                'verbose_name_plural': 'Posiciones en Rankings',
+                'ordering': ['alcance', 'valor', 'tablero', 'posicion'],
+                'unique_together': {('alcance', 'valor', 'tablero', 'posicion')},
+            },
+        ),
+    ]
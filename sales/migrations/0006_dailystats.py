@@ -0,0 +1,48 @@
+# Generated by Django 4.2.24 on 2026-10-18 05:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_daily_stats(apps, schema_editor):
+    from sales.rollups import rebuild_rollups
+
+    rebuild_rollups(Order=apps.get_model('sales', 'Order'), DailyStats=apps.get_model('sales', 'DailyStats'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('inventory', '0008_alter_crop_notas'),
+        ('sales', '0005_leaderboardentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(help_text='Fecha de creación del pedido', verbose_name='Día')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('confirmado', 'Confirmado por Vendedor'), ('en_preparacion', 'En Preparación'), ('enviado', 'Enviado'), ('en_transito', 'En Tránsito'), ('recibido', 'Recibido por Comprador'), ('completado', 'Completado'), ('cancelado', 'Cancelado')], max_length=20, verbose_name='Estado')),
+                ('pedidos', models.IntegerField(default=0, verbose_name='Pedidos')),
+                ('cantidad', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Cantidad')),
+                ('monto', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Monto')),
+                ('comprador', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Comprador')),
+                ('cultivo', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='inventory.crop', verbose_name='Cultivo')),
+                ('vendedor', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Vendedor')),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario',
+                'verbose_name_plural': 'Resúmenes Diarios',
+                'ordering': ['-dia'],
+                'indexes': [models.Index(fields=['vendedor', 'dia'], name='sales_daily_vendedor_idx'), models.Index(fields=['comprador', 'dia'], name='sales_daily_comprador_idx'), models.Index(fields=['dia', 'estado'], name='sales_daily_dia_estado_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailystats',
+            constraint=models.UniqueConstraint(fields=('dia', 'vendedor', 'comprador', 'cultivo', 'estado'), name='unique_daily_stats'),
+        ),
+        migrations.RunPython(backfill_daily_stats, migrations.RunPython.noop),
+    ]
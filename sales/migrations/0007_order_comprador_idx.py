@@ -0,0 +1,17 @@
+# Generated by Django 4.2.24 on 2026-10-18 05:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0006_dailystats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['comprador', '-created_at', '-id'], name='sales_order_comprador_idx'),
+        ),
+    ]
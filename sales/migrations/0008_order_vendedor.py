@@ -0,0 +1,41 @@
+# Generated by Django 4.2.24 on 2026-10-18 05:11
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_vendedor(apps, schema_editor):
+    Order = apps.get_model('sales', 'Order')
+    Publication = apps.get_model('marketplace', 'Publication')
+    Order.objects.update(
+        vendedor=models.Subquery(
+            Publication.objects.filter(pk=models.OuterRef('publicacion_id')).values('productor_id')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('marketplace', '0013_publication_productor'),
+        ('sales', '0007_order_comprador_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='vendedor',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pedidos_como_vendedor', to=settings.AUTH_USER_MODEL, verbose_name='Vendedor'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['vendedor', '-created_at', '-id'], name='sales_order_vendedor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['vendedor', 'estado', 'created_at'], name='sales_order_vend_estado_idx'),
+        ),
+        migrations.RunPython(backfill_vendedor, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.24 on 2026-10-18 05:15
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_last_message_id(apps, schema_editor):
+    Conversation = apps.get_model('sales', 'Conversation')
+    Message = apps.get_model('sales', 'Message')
+    ultimo = Message.objects.filter(conversation=models.OuterRef('pk')).order_by('-id').values('id')[:1]
+    Conversation.objects.update(last_message_id=Coalesce(models.Subquery(ultimo), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0008_order_vendedor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_id',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_last_message_id, migrations.RunPython.noop),
+    ]
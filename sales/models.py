@@ -10,6 +10,9 @@ import uuid
 class Conversation(BaseModel):
     publication = models.ForeignKey(Publication, on_delete=models.CASCADE, related_name='conversations', null=True)
     participants = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='conversations')
+    # Id del último mensaje (se actualiza en sales.signals): versión de la
+    # conversación para que el polling y el stream (sales/chat.py) no lean mensajes
+    last_message_id = models.BigIntegerField(default=0, editable=False)
 
     def __str__(self):
         return f"Conversation about {self.publication.pk if self.publication else 'N/A'}"
@@ -26,6 +29,65 @@ class Message(BaseModel):
         return f"Message from {self.sender} in conversation {self.conversation.pk}"
 
 
+def order_actions(estado, es_comprador, es_vendedor, pagado, comprador_califico, vendedor_califico):
+    """
+    Acciones disponibles sobre un pedido, calculadas solo a partir de su estado,
+    del rol del usuario y de si ya hay pago aprobado y calificaciones.
+    """
+    actions = []
+    completado = estado == 'completado'
+
+    if es_comprador:
+        if estado in ['enviado', 'en_transito']:
+            actions.append(('confirm_receipt', 'Confirmar Recepción', 'success'))
+        if completado and not comprador_califico:
+            actions.append(('rate_seller', 'Calificar Vendedor', 'warning'))
+        elif completado:
+            actions.append(('edit_rating_seller', 'Editar Calificación', 'warning'))
+        if estado in ['pendiente', 'confirmado']:
+            actions.append(('cancel', 'Cancelar Pedido', 'danger'))
+
+    elif es_vendedor:
+        if (estado == 'pendiente' and pagado) or estado in ['confirmado', 'en_preparacion']:
+            actions.append(('update_status', 'Actualizar Estado', 'primary'))
+        if completado and not vendedor_califico:
+            actions.append(('rate_buyer', 'Calificar Comprador', 'warning'))
+        elif completado:
+            actions.append(('edit_rating_buyer', 'Editar Calificación', 'warning'))
+        if estado in ['pendiente', 'confirmado', 'en_preparacion']:
+            actions.append(('cancel', 'Cancelar Pedido', 'danger'))
+
+    # Acciones comunes
+    actions.append(('contact', 'Contactar', 'outline'))
+    return actions
+
+
+# Listados de pedidos: página y columnas del cursor (core.pagination)
+ORDER_PAGE_SIZE = 10
+ORDER_PAGE_KEYS = ['-created_at', '-id']
+
+
+class OrderQuerySet(models.QuerySet):
+    def with_available_actions(self):
+        """
+        Anota lo que necesita get_available_actions_for_user (calificaciones de
+        cada parte y pago aprobado) para que un listado no consulte nada por
+        pedido.
+        """
+        from payments.models import Payment
+
+        calificaciones = Rating.objects.filter(pedido=models.OuterRef('pk'))
+        return self.annotate(
+            comprador_califico=models.Exists(calificaciones.filter(
+                calificador=models.OuterRef('comprador_id'), tipo='comprador_a_vendedor',
+            )),
+            vendedor_califico=models.Exists(calificaciones.filter(
+                calificador=models.OuterRef('vendedor_id'), tipo='vendedor_a_comprador',
+            )),
+            pago_aprobado=models.Exists(Payment.objects.filter(order=models.OuterRef('pk'), status='approved')),
+        )
+
+
 class Order(BaseModel):
     ESTADO_CHOICES = (
         ('pendiente', 'Pendiente'),
@@ -43,6 +105,10 @@ class Order(BaseModel):
                                   related_name='pedidos', verbose_name="Publicación", null=True)
     comprador = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, 
                                 related_name='pedidos_como_comprador', verbose_name="Comprador", null=True)
+    # Productor de la publicación (denormalizado, se copia en save() y se
+    # sincroniza en sales.signals) para filtrar las ventas sin joins
+    vendedor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, editable=False,
+                                 related_name='pedidos_como_vendedor', verbose_name="Vendedor")
     
     # Información del pedido
     cantidad_acordada = models.DecimalField(max_digits=10, decimal_places=2, default=0,
@@ -70,22 +136,37 @@ class Order(BaseModel):
                                          verbose_name="Fecha de Recepción")
     
 
+    objects = OrderQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Pedido"
         verbose_name_plural = "Pedidos"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['comprador', '-created_at', '-id'], name='sales_order_comprador_idx'),
+            models.Index(fields=['vendedor', '-created_at', '-id'], name='sales_order_vendedor_idx'),
+            models.Index(fields=['vendedor', 'estado', 'created_at'], name='sales_order_vend_estado_idx'),
+        ]
 
     def __str__(self):
         return f'Pedido #{self.id} - {self.publicacion.cultivo.nombre}'
 
-    @property
-    def vendedor(self):
-        """Propiedad para obtener el vendedor del pedido"""
-        return self.publicacion.cultivo.productor
+    def save(self, *args, **kwargs):
+        # El vendedor se copia de la publicación al crear el pedido o al cambiarla
+        update_fields = kwargs.get('update_fields')
+        if self._state.adding or self.vendedor_id is None or (
+            update_fields is not None and 'publicacion' in update_fields
+        ):
+            self.vendedor_id = self.publicacion.productor_id if self.publicacion_id else None
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'vendedor'}
+        super().save(*args, **kwargs)
     
     @property
     def is_paid(self):
         """Verifica si el pedido tiene un pago aprobado"""
+        if 'pago_aprobado' in self.__dict__:
+            return self.pago_aprobado
         return hasattr(self, 'payment') and self.payment.is_approved
     
     @property
@@ -119,7 +200,7 @@ class Order(BaseModel):
         if self.estado != 'completado':
             return False
         # Verificar si el vendedor ya calificó
-        return not self.calificaciones.filter(calificador=self.vendedor, tipo='vendedor_a_comprador').exists()
+        return not self.calificaciones.filter(calificador_id=self.vendedor_id, tipo='vendedor_a_comprador').exists()
 
     def can_be_cancelled(self):
         """Verifica si el pedido puede ser cancelado"""
@@ -135,46 +216,28 @@ class Order(BaseModel):
     
     def get_available_actions_for_user(self, user):
         """Obtiene las acciones disponibles para un usuario específico"""
-        actions = []
-        
-        if user == self.comprador:
-            # Acciones para el comprador
-            if self.can_be_received_by_buyer():
-                actions.append(('confirm_receipt', 'Confirmar Recepción', 'success'))
-            if self.can_be_rated_by_buyer():
-                actions.append(('rate_seller', 'Calificar Vendedor', 'warning'))
-            # Verificar si ya calificó al vendedor (para editar)
-            elif self.estado == 'completado':
-                existing_rating = self.calificaciones.filter(
-                    calificador=user, 
-                    tipo='comprador_a_vendedor'
-                ).first()
-                if existing_rating:
-                    actions.append(('edit_rating_seller', 'Editar Calificación', 'warning'))
-            if self.can_be_cancelled_by_buyer():
-                actions.append(('cancel', 'Cancelar Pedido', 'danger'))
-                
-        elif user == self.vendedor:
-            # Acciones para el vendedor
-            if self.can_be_confirmed_by_seller() or self.can_be_marked_as_shipped():
-                actions.append(('update_status', 'Actualizar Estado', 'primary'))
-            if self.can_be_rated_by_seller():
-                actions.append(('rate_buyer', 'Calificar Comprador', 'warning'))
-            # Verificar si ya calificó al comprador (para editar)
-            elif self.estado == 'completado':
-                existing_rating = self.calificaciones.filter(
-                    calificador=user, 
-                    tipo='vendedor_a_comprador'
-                ).first()
-                if existing_rating:
-                    actions.append(('edit_rating_buyer', 'Editar Calificación', 'warning'))
-            if self.can_be_cancelled_by_seller():
-                actions.append(('cancel', 'Cancelar Pedido', 'danger'))
-        
-        # Acciones comunes
-        actions.append(('contact', 'Contactar', 'outline'))
-        
-        return actions
+        if 'comprador_califico' in self.__dict__:
+            # Anotado por Order.objects.with_available_actions(): sin consultas
+            comprador_califico, vendedor_califico = self.comprador_califico, self.vendedor_califico
+        else:
+            tipos = set()
+            if self.estado == 'completado':
+                tipos = set(self.calificaciones.filter(
+                    models.Q(calificador_id=self.comprador_id, tipo='comprador_a_vendedor') |
+                    models.Q(calificador_id=self.vendedor_id, tipo='vendedor_a_comprador')
+                ).values_list('tipo', flat=True))
+            comprador_califico = 'comprador_a_vendedor' in tipos
+            vendedor_califico = 'vendedor_a_comprador' in tipos
+
+        es_comprador = user.pk is not None and user.pk == self.comprador_id
+        return order_actions(
+            self.estado,
+            es_comprador=es_comprador,
+            es_vendedor=not es_comprador and user.pk is not None and user.pk == self.vendedor_id,
+            pagado=self.estado == 'pendiente' and self.is_paid,
+            comprador_califico=comprador_califico,
+            vendedor_califico=vendedor_califico,
+        )
 
 
 class Rating(BaseModel):
@@ -233,4 +296,89 @@ class Rating(BaseModel):
     def promedio_calificacion(self):
         """Calcula el promedio de todas las calificaciones"""
         return (self.calificacion_general + self.calificacion_comunicacion + 
-                self.calificacion_puntualidad + self.calificacion_calidad) / 4
\ No newline at end of file
+                self.calificacion_puntualidad + self.calificacion_calidad) / 4
+
+
+class LeaderboardEntry(models.Model):
+    """
+    Fila precalculada de los rankings: una por posición de cada tablero y
+    segmento (general, por departamento o por categoría). La reconstruye
+    sales.leaderboard a partir de los perfiles; rankings_view solo la lee.
+    """
+    TABLERO_CHOICES = [
+        ('vendedores', 'Mejores Vendedores'),
+        ('compradores', 'Mejores Compradores'),
+        ('activos', 'Vendedores más Activos'),
+    ]
+    ALCANCE_CHOICES = [
+        ('general', 'General'),
+        ('departamento', 'Departamento'),
+        ('categoria', 'Categoría'),
+    ]
+
+    tablero = models.CharField(max_length=20, choices=TABLERO_CHOICES, verbose_name="Tablero")
+    alcance = models.CharField(max_length=20, choices=ALCANCE_CHOICES, default='general', verbose_name="Alcance")
+    valor = models.CharField(max_length=100, blank=True, default='', verbose_name="Segmento",
+                             help_text="Departamento o categoría; vacío en el ranking general")
+    posicion = models.PositiveSmallIntegerField(verbose_name="Posición")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+
+    # Copia de lo que muestra la plantilla, para no cargar perfiles ni usuarios
+    nombre = models.CharField(max_length=255, verbose_name="Nombre")
+    detalle = models.CharField(max_length=255, blank=True, default='', verbose_name="Ubicación o empresa")
+    puntaje = models.FloatField(default=0, verbose_name="Puntaje bayesiano")
+    calificacion_promedio = models.DecimalField(max_digits=3, decimal_places=2, default=0,
+                                                verbose_name="Calificación Promedio")
+    total_calificaciones = models.IntegerField(default=0, verbose_name="Calificaciones")
+    total_operaciones = models.IntegerField(default=0, verbose_name="Ventas o compras")
+    monto = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Ingresos o gastos")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Posición en Ranking"
+        verbose_name_plural = "Posiciones en Rankings"
+        ordering = ['alcance', 'valor', 'tablero', 'posicion']
+        unique_together = ['alcance', 'valor', 'tablero', 'posicion']
+
+    def __str__(self):
+        segmento = f" ({self.valor})" if self.valor else ""
+        return f"{self.get_tablero_display()}{segmento} #{self.posicion}: {self.nombre}"
+
+
+
+class DailyStats(models.Model):
+    """
+    Resumen diario de pedidos por vendedor, comprador, cultivo y estado. Se
+    mantiene con incrementos atómicos en cada transición de Order (ver
+    sales/rollups.py); los paneles leen estas filas en lugar de recorrer Order.
+    """
+    dia = models.DateField(verbose_name="Día", help_text="Fecha de creación del pedido")
+    vendedor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True,
+                                 related_name='+', verbose_name="Vendedor")
+    comprador = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True,
+                                  related_name='+', verbose_name="Comprador")
+    cultivo = models.ForeignKey('inventory.Crop', on_delete=models.CASCADE, null=True,
+                                related_name='+', verbose_name="Cultivo")
+    estado = models.CharField(max_length=20, choices=Order.ESTADO_CHOICES, verbose_name="Estado")
+    pedidos = models.IntegerField(default=0, verbose_name="Pedidos")
+    cantidad = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Cantidad")
+    monto = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Monto")
+
+    class Meta:
+        verbose_name = "Resumen Diario"
+        verbose_name_plural = "Resúmenes Diarios"
+        ordering = ['-dia']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dia', 'vendedor', 'comprador', 'cultivo', 'estado'],
+                name='unique_daily_stats',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['vendedor', 'dia'], name='sales_daily_vendedor_idx'),
+            models.Index(fields=['comprador', 'dia'], name='sales_daily_comprador_idx'),
+            models.Index(fields=['dia', 'estado'], name='sales_daily_dia_estado_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.dia} {self.get_estado_display()}: {self.pedidos} pedido(s)"
@@ -0,0 +1,121 @@
+"""
+Totales de calificaciones por perfil, mantenidos de forma incremental.
+
+ProducerProfile acumula las calificaciones comprador_a_vendedor y BuyerProfile
+las vendedor_a_comprador: el conteo (total_calificaciones) y la suma de cada
+dimensión (suma_calificacion_*). Crear, editar o borrar una calificación es un
+único UPDATE con F() sobre el perfil, sin recorrer las calificaciones
+anteriores; calificacion_promedio del vendedor se recalcula en el mismo UPDATE.
+Como update() no dispara post_save, tras el commit se invalidan las tarjetas
+del vendedor, que muestran su promedio y su número de calificaciones.
+
+recompute_profile_stats reconstruye todos los perfiles con una sola consulta
+agrupada (comando recompute_profile_stats y la migración que creó los campos).
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, FloatField, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+
+RATING_FIELDS = (
+    'calificacion_general',
+    'calificacion_comunicacion',
+    'calificacion_puntualidad',
+    'calificacion_calidad',
+)
+
+
+def _profile_models(ProducerProfile=None, BuyerProfile=None):
+    if ProducerProfile is None or BuyerProfile is None:
+        from accounts.models import BuyerProfile, ProducerProfile
+    return {
+        'comprador_a_vendedor': ProducerProfile,
+        'vendedor_a_comprador': BuyerProfile,
+    }
+
+
+def rating_values(rating):
+    """(tipo, calificado_id, valores por dimensión) de una calificación"""
+    return (
+        rating.tipo,
+        rating.calificado_id,
+        tuple(getattr(rating, campo) or 0 for campo in RATING_FIELDS),
+    )
+
+
+def _promedio(suma, conteo):
+    # FloatField: en SQLite un CAST a DECIMAL sigue dividiendo enteros
+    return Coalesce(
+        Round(Cast(suma, FloatField()) / NullIf(Cast(conteo, FloatField()), Value(0.0)), precision=1),
+        Value(0.0),
+        output_field=DecimalField(max_digits=3, decimal_places=2),
+    )
+
+
+def apply_rating(tipo, calificado_id, valores, signo, create_profile=True):
+    """
+    Suma (signo=1) o resta (signo=-1) una calificación a los totales del perfil
+    del calificado. Con create_profile=False no crea el perfil si falta.
+    """
+    Profile = _profile_models().get(tipo)
+    if Profile is None or calificado_id is None:
+        return
+    conteo = F('total_calificaciones') + signo
+    updates = {'total_calificaciones': conteo}
+    for campo, valor in zip(RATING_FIELDS, valores):
+        updates[f'suma_{campo}'] = F(f'suma_{campo}') + signo * valor
+    if tipo == 'comprador_a_vendedor':
+        # En un UPDATE, F() lee el valor anterior de la fila: usar los valores nuevos
+        updates['calificacion_promedio'] = _promedio(
+            F('suma_calificacion_general') + signo * valores[0], conteo
+        )
+
+    if not Profile.objects.filter(user_id=calificado_id).update(**updates) and create_profile:
+        Profile.objects.get_or_create(user_id=calificado_id)
+        Profile.objects.filter(user_id=calificado_id).update(**updates)
+    if tipo == 'comprador_a_vendedor':
+        from marketplace.cards import bump_producer_card_versions
+
+        transaction.on_commit(lambda: bump_producer_card_versions(calificado_id))
+
+
+def recompute_profile_stats(Rating=None, ProducerProfile=None, BuyerProfile=None):
+    """
+    Recalcula los totales de todos los perfiles. Acepta los modelos históricos
+    desde una migración. Retorna el número de perfiles con calificaciones.
+    """
+    if Rating is None:
+        from .models import Rating
+    profiles = _profile_models(ProducerProfile, BuyerProfile)
+
+    totales = {
+        (fila['tipo'], fila['calificado_id']): fila
+        for fila in Rating.objects.filter(calificado__isnull=False)
+        .values('tipo', 'calificado_id')
+        .annotate(n=Count('id'), **{campo: Sum(campo) for campo in RATING_FIELDS})
+        .order_by()
+    }
+
+    actualizados = 0
+    for tipo, Profile in profiles.items():
+        cambios = []
+        for profile in Profile.objects.all():
+            fila = totales.get((tipo, profile.user_id), {})
+            profile.total_calificaciones = fila.get('n', 0)
+            for campo in RATING_FIELDS:
+                setattr(profile, f'suma_{campo}', fila.get(campo) or 0)
+            if tipo == 'comprador_a_vendedor':
+                profile.calificacion_promedio = (
+                    (Decimal(profile.suma_calificacion_general) / profile.total_calificaciones).quantize(
+                        Decimal('0.1'), rounding=ROUND_HALF_UP
+                    )
+                    if profile.total_calificaciones else Decimal('0')
+                )
+            cambios.append(profile)
+            actualizados += bool(fila)
+        campos = ['total_calificaciones', *(f'suma_{campo}' for campo in RATING_FIELDS)]
+        if tipo == 'comprador_a_vendedor':
+            campos.append('calificacion_promedio')
+        Profile.objects.bulk_update(cambios, campos, batch_size=500)
+    return actualizados
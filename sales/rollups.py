@@ -0,0 +1,185 @@
+"""
+Resumen diario de pedidos (DailyStats) para los paneles y gráficas.
+
+Cada fila acumula los pedidos creados un día, de un vendedor a un comprador,
+de un cultivo, que hoy están en un estado: cuántos son, la cantidad y el monto.
+Cuando un pedido cambia de estado (core.transitions) su aporte pasa de la fila
+del estado anterior a la del nuevo con dos UPDATE ... SET x = x + n; al crearse
+o borrarse se suma o se resta. Los incrementos conmutan, así que el orden en
+que lleguen da igual (los pedidos del carrito se suman agrupados por fila).
+
+Los paneles agrupan unas cuantas filas de DailyStats en lugar de recorrer Order.
+Los cambios de cantidad o precio de un pedido sin cambio de estado, y los
+update() masivos, no pasan por aquí: rebuild_rollups los corrige.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+MONTHS_WINDOW = 180
+
+
+def _producto(order):
+    """(cultivo_id, vendedor_id) del pedido, sin consultar si la publicación ya está cargada"""
+    from marketplace.models import Publication
+
+    if order.publicacion_id is None:
+        return None, order.vendedor_id
+    publicacion = order._state.fields_cache.get('publicacion')
+    if publicacion is not None:
+        return publicacion.cultivo_id, order.vendedor_id
+    cultivo_id = Publication.objects.filter(pk=order.publicacion_id).values_list('cultivo_id', flat=True).first()
+    return cultivo_id, order.vendedor_id
+
+
+def _bump(key, pedidos, cantidad, monto):
+    """Suma a la fila `key`, creándola si no existe (también con valores negativos)"""
+    from .models import DailyStats
+
+    cambios = dict(
+        pedidos=F('pedidos') + pedidos,
+        cantidad=F('cantidad') + cantidad,
+        monto=F('monto') + monto,
+    )
+    if DailyStats.objects.filter(**key).update(**cambios):
+        return
+    try:
+        with transaction.atomic():
+            DailyStats.objects.create(**key, pedidos=pedidos, cantidad=cantidad, monto=monto)
+    except IntegrityError:
+        # Otra transacción creó la fila entre el UPDATE y el INSERT
+        DailyStats.objects.filter(**key).update(**cambios)
+
+
+def _apply(order, estado, signo, producto=None):
+    cultivo_id, vendedor_id = producto or _producto(order)
+    key = dict(
+        dia=timezone.localdate(order.created_at),
+        vendedor_id=vendedor_id,
+        comprador_id=order.comprador_id,
+        cultivo_id=cultivo_id,
+        estado=estado,
+    )
+    _bump(key, signo, signo * (order.cantidad_acordada or 0), signo * (order.precio_total or 0))
+
+
+def add_order(order):
+    """Un pedido nuevo suma en la fila de su estado"""
+    _apply(order, order.estado, 1)
+
+
+def order_contributions(orders):
+    """
+    Aportes de pedidos nuevos agrupados por fila (serializables a JSON), para
+    sumarlos con apply_contributions desde sales.checkout
+    """
+    filas = {}
+    for order in orders:
+        cultivo_id, vendedor_id = _producto(order)
+        key = (timezone.localdate(order.created_at).isoformat(), vendedor_id,
+               order.comprador_id, cultivo_id, order.estado)
+        pedidos, cantidad, monto = filas.get(key, (0, 0, 0))
+        filas[key] = (pedidos + 1, cantidad + (order.cantidad_acordada or 0), monto + (order.precio_total or 0))
+    return [
+        [*key, pedidos, str(cantidad), str(monto)]
+        for key, (pedidos, cantidad, monto) in filas.items()
+    ]
+
+
+def apply_contributions(filas):
+    """Suma los aportes calculados por order_contributions"""
+    for dia, vendedor_id, comprador_id, cultivo_id, estado, pedidos, cantidad, monto in filas:
+        _bump(
+            dict(dia=date.fromisoformat(dia), vendedor_id=vendedor_id, comprador_id=comprador_id,
+                 cultivo_id=cultivo_id, estado=estado),
+            pedidos, Decimal(cantidad), Decimal(monto),
+        )
+
+
+def remove_order(order):
+    """Un pedido borrado deja de contar en la fila de su estado"""
+    _apply(order, order.estado, -1)
+
+
+def move_order(order, source, target):
+    """Pasa el aporte del pedido de la fila `source` a la fila `target`"""
+    producto = _producto(order)
+    _apply(order, source, -1, producto)
+    _apply(order, target, 1, producto)
+
+
+def rebuild_rollups(desde=None, Order=None, DailyStats=None):
+    """
+    Recalcula DailyStats desde Order (todo, o desde la fecha `desde`). Acepta los
+    modelos históricos desde una migración. Retorna el número de filas creadas.
+    """
+    if Order is None or DailyStats is None:
+        from .models import DailyStats, Order
+
+    pedidos = Order.objects.all()
+    filas = DailyStats.objects.all()
+    if desde is not None:
+        pedidos = pedidos.filter(created_at__date__gte=desde)
+        filas = filas.filter(dia__gte=desde)
+
+    # El vendedor se toma del cultivo: esto también corre en la migración que
+    # creó DailyStats, cuando Order todavía no tenía el campo vendedor
+    grupos = pedidos.values(
+        'estado', 'comprador_id',
+        dia_pedido=TruncDate('created_at'),
+        cultivo=F('publicacion__cultivo_id'),
+        productor=F('publicacion__cultivo__productor_id'),
+    ).annotate(
+        n=Count('id'), total_cantidad=Sum('cantidad_acordada'), total_monto=Sum('precio_total'),
+    ).order_by()
+
+    with transaction.atomic():
+        filas.delete()
+        creadas = DailyStats.objects.bulk_create([
+            DailyStats(
+                dia=grupo['dia_pedido'],
+                vendedor_id=grupo['productor'],
+                comprador_id=grupo['comprador_id'],
+                cultivo_id=grupo['cultivo'],
+                estado=grupo['estado'],
+                pedidos=grupo['n'],
+                cantidad=grupo['total_cantidad'] or 0,
+                monto=grupo['total_monto'] or 0,
+            )
+            for grupo in grupos
+        ], batch_size=1000)
+    return len(creadas)
+
+
+def totals_by_estado(rows):
+    """{estado: {'pedidos': n, 'monto': total}} de un queryset de DailyStats"""
+    return {
+        fila['estado']: {'pedidos': fila['n'] or 0, 'monto': fila['total'] or 0}
+        for fila in rows.values('estado').annotate(n=Sum('pedidos'), total=Sum('monto')).order_by()
+    }
+
+
+def count_in(totales, *estados):
+    """Pedidos en cualquiera de `estados` (todos si no se indica ninguno)"""
+    return sum(fila['pedidos'] for estado, fila in totales.items() if not estados or estado in estados)
+
+
+def amount_in(totales, *estados):
+    """Monto de los pedidos en cualquiera de `estados` (todos si no se indica ninguno)"""
+    return sum(fila['monto'] for estado, fila in totales.items() if not estados or estado in estados)
+
+
+def monthly(rows, months_window=MONTHS_WINDOW, **filters):
+    """Pedidos y monto por mes de los últimos `months_window` días"""
+    desde = timezone.localdate() - timedelta(days=months_window)
+    return list(
+        rows.filter(dia__gte=desde, **filters)
+        .annotate(month=TruncMonth('dia'))
+        .values('month')
+        .annotate(count=Sum('pedidos'), revenue=Sum('monto'))
+        .order_by('month')
+    )
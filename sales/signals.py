@@ -1,336 +1,335 @@
-from django.db.models.signals import post_save, pre_save, pre_delete
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.db import transaction
+from django.db.models import F
 from django.dispatch import receiver
 from django.utils import timezone
-from .models import Order, Rating
-from core.models import create_notification, Notification
+from .models import Message, Order, Rating
+from inventory.models import Crop
+from marketplace.cards import bump_producer_card_versions
+from marketplace.models import Publication
+from core.models import Notification, OutboxEvent
+from core.notifications import bump_notifications_version
+from core.outbox import record_notification, record_notifications
+from core.transitions import CREATED, track_field, transition
 from payments.models import Payment
 from accounts.models import ProducerProfile, BuyerProfile
-from django.db.models import Avg
-from core.email_service import email_service
+from .chat import message_saved
+from .checkout import order_created_notifications
+from .leaderboard import schedule_leaderboard_refresh
+from .rollups import add_order, move_order, remove_order
+from .rating_stats import RATING_FIELDS, apply_rating, rating_values
+from .tasks import email_pedido_completado_vendedor, email_pedido_en_transito, encolar_emails_pedidos_creados
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-@receiver(post_save, sender=Order)
-def order_status_notifications(sender, instance, created, **kwargs):
-    """Envía notificaciones y emails cuando cambia el estado de un pedido"""
-    if created:
-        # Nuevo pedido creado - notificar al vendedor
-        create_notification(
-            recipient=instance.vendedor,
-            title='Nuevo pedido recibido',
-            message=f'Has recibido un nuevo pedido #{instance.id} de {instance.comprador.first_name} {instance.comprador.last_name} por {instance.cantidad_acordada} {instance.publicacion.cultivo.unidad_medida} de {instance.publicacion.cultivo.nombre}.',
-            category='order',
-            order_id=instance.id,
-        )
+# Solo los cambios reales de estado disparan avisos y estadísticas
+# (ver core/transitions.py): volver a guardar un pedido no repite nada
+track_field(Order, 'estado')
+track_field(Payment, 'status')
+
+
+@transition(Order, source=CREATED)
+def order_created(order, source):
+    """Nuevo pedido: notificar al vendedor y al comprador"""
+    # (mismos avisos que arma sales.checkout para los pedidos del carrito)
+    record_notifications(order_created_notifications(order))
+    
+    # Emails de confirmación en segundo plano, después del commit
+    encolar_emails_pedidos_creados([order])
+
+
+@transition(Order, target='confirmado')
+def order_confirmed(order, source):
+    """Pedido confirmado por el vendedor"""
+    record_notification(
+        recipient=order.comprador,
+        title='Pedido confirmado',
+        message=f'Tu pedido #{order.id} ha sido confirmado por el vendedor. El vendedor comenzará a preparar tu pedido.',
+        category='order',
+        order_id=order.id,
+    )
+
+
+@transition(Order, target='en_preparacion')
+def order_in_preparation(order, source):
+    record_notification(
+        recipient=order.comprador,
+        title='Pedido en preparación',
+        message=f'Tu pedido #{order.id} está siendo preparado por el vendedor.',
+        category='order',
+        order_id=order.id,
+    )
+
+
+@transition(Order, target='enviado')
+def order_shipped(order, source):
+    record_notification(
+        recipient=order.comprador,
+        title='Pedido enviado',
+        message=f'Tu pedido #{order.id} ha sido enviado. Pronto lo recibirás.',
+        category='order',
+        order_id=order.id,
+    )
+
+
+@transition(Order, target='en_transito')
+def order_in_transit(order, source):
+    record_notification(
+        recipient=order.comprador,
+        title='Pedido en tránsito',
+        message=f'Tu pedido #{order.id} está en camino hacia ti.',
+        category='order',
+        order_id=order.id,
+    )
+    
+    # Email al comprador en segundo plano (la tarea se guarda en esta misma transacción)
+    email_pedido_en_transito.enqueue(order.id)
+
+
+@transition(Order, target='recibido')
+def order_received(order, source):
+    """Pedido recibido por el comprador"""
+    record_notification(
+        recipient=order.vendedor,
+        title='Pedido recibido',
+        message=f'El comprador ha confirmado la recepción del pedido #{order.id}.',
+        category='order',
+        order_id=order.id,
+    )
+
+
+@transition(Order, target='completado')
+def order_completed(order, source):
+    record_notification(
+        recipient=order.comprador,
+        title='Pedido completado',
+        message=f'Tu pedido #{order.id} ha sido completado exitosamente. ¡Gracias por tu compra!',
+        category='order',
+        order_id=order.id,
+    )
+    record_notification(
+        recipient=order.vendedor,
+        title='Pedido completado',
+        message=f'El pedido #{order.id} ha sido completado exitosamente. ¡Gracias por la venta!',
+        category='order',
+        order_id=order.id,
+    )
+    
+    # Email al vendedor en segundo plano (la tarea se guarda en esta misma transacción)
+    email_pedido_completado_vendedor.enqueue(order.id)
+
+
+@transition(Order, target='cancelado')
+def order_cancelled(order, source):
+    record_notification(
+        recipient=order.comprador,
+        title='Pedido cancelado',
+        message=f'Tu pedido #{order.id} ha sido cancelado.',
+        category='order',
+        order_id=order.id,
+    )
+    record_notification(
+        recipient=order.vendedor,
+        title='Pedido cancelado',
+        message=f'El pedido #{order.id} ha sido cancelado.',
+        category='order',
+        order_id=order.id,
+    )
+
+
+@transition(Payment, source=CREATED)
+def payment_created(payment, source):
+    record_notification(
+        recipient=payment.user,
+        title='Pago iniciado',
+        message=f'Se ha iniciado el proceso de pago para el pedido #{payment.order_id}.',
+        category='payment',
+        order_id=payment.order_id,
+        payment_id=payment.id,
+    )
+
+
+@transition(Payment, target='approved')
+def payment_approved(payment, source):
+    record_notification(
+        recipient=payment.user,
+        title='Pago aprobado',
+        message=f'Tu pago del pedido #{payment.order_id} ha sido aprobado exitosamente.',
+        category='payment',
+        order_id=payment.order_id,
+        payment_id=payment.id,
+    )
+    
+    # Notificar al vendedor
+    record_notification(
+        recipient=payment.order.vendedor,
+        title='Pago recibido',
+        message=f'Has recibido el pago del pedido #{payment.order_id}. Puedes confirmar el pedido.',
+        category='payment',
+        order_id=payment.order_id,
+        payment_id=payment.id,
+    )
+
+
+@transition(Payment, target='rejected')
+def payment_rejected(payment, source):
+    record_notification(
+        recipient=payment.user,
+        title='Pago rechazado',
+        message=f'Tu pago del pedido #{payment.order_id} ha sido rechazado. Por favor, intenta nuevamente.',
+        category='payment',
+        order_id=payment.order_id,
+        payment_id=payment.id,
+    )
+
+
+@transition(Payment, target='pending')
+def payment_pending(payment, source):
+    record_notification(
+        recipient=payment.user,
+        title='Pago pendiente',
+        message=f'Tu pago del pedido #{payment.order_id} está pendiente de procesamiento.',
+        category='payment',
+        order_id=payment.order_id,
+        payment_id=payment.id,
+    )
+
+
+@transition(Order, target='completado')
+def refresh_rankings_on_completion(order, source):
+    """Las ventas y compras cambiaron: recalcular los rankings en breve"""
+    schedule_leaderboard_refresh()
+
+
+@transition(Order, target='completado')
+def update_seller_stats_on_completion(order, source):
+    """Actualiza estadísticas del vendedor cuando se completa un pedido"""
+    try:
+        # UPDATE con F(): un save() del perfil pisaría los totales de
+        # calificaciones que apply_rating cambia en otra transacción
+        perfil = ProducerProfile.objects.filter(user_id=order.vendedor_id)
+        cambios = {
+            'total_ventas': F('total_ventas') + 1,
+            'ingresos_totales': F('ingresos_totales') + order.precio_total,
+        }
+        if not perfil.update(**cambios):
+            ProducerProfile.objects.get_or_create(user_id=order.vendedor_id)
+            perfil.update(**cambios)
+
+        # Establecer fecha de primera venta si es la primera
+        perfil.filter(total_ventas=1).update(fecha_primera_venta=timezone.now())
+
+        # El detalle de la publicación muestra el número de ventas
+        vendedor_id = order.vendedor_id
+        transaction.on_commit(lambda: bump_producer_card_versions(vendedor_id))
         
-        # Notificar al comprador
-        create_notification(
-            recipient=instance.comprador,
-            title='Pedido creado',
-            message=f'Tu pedido #{instance.id} ha sido creado exitosamente. Esperando confirmación del vendedor.',
-            category='order',
-            order_id=instance.id,
-        )
+    except Exception as e:
+        logger.error(f"Error updating seller stats: {e}")
+
+
+@transition(Order, target='completado')
+def update_buyer_stats_on_completion(order, source):
+    """Actualiza estadísticas del comprador cuando se completa un pedido"""
+    try:
+        # UPDATE con F(), como en el vendedor
+        perfil = BuyerProfile.objects.filter(user_id=order.comprador_id)
+        cambios = {
+            'total_compras': F('total_compras') + 1,
+            'gastos_totales': F('gastos_totales') + order.precio_total,
+        }
+        if not perfil.update(**cambios):
+            BuyerProfile.objects.get_or_create(user_id=order.comprador_id)
+            perfil.update(**cambios)
         
-        # Enviar emails de confirmación
-        try:
-            # Email al comprador
-            if instance.comprador.email:
-                email_service.send_order_buyer_confirmation_email(
-                    buyer_email=instance.comprador.email,
-                    order=instance,
-                    buyer_name=instance.comprador.get_full_name()
-                )
-            
-            # Email al vendedor
-            if instance.vendedor.email:
-                email_service.send_order_seller_notification_email(
-                    seller_email=instance.vendedor.email,
-                    order=instance,
-                    seller_name=instance.vendedor.get_full_name()
-                )
-        except Exception as e:
-            logger.error(f"Error sending order creation emails: {e}")
-    else:
-        # Estado del pedido cambió - enviar notificaciones según el estado
-        if instance.estado == 'confirmado':
-            # Pedido confirmado por el vendedor
-            create_notification(
-                recipient=instance.comprador,
-                title='Pedido confirmado',
-                message=f'Tu pedido #{instance.id} ha sido confirmado por el vendedor. El vendedor comenzará a preparar tu pedido.',
-                category='order',
-                order_id=instance.id,
-            )
-            
-        elif instance.estado == 'en_preparacion':
-            # Pedido en preparación
-            create_notification(
-                recipient=instance.comprador,
-                title='Pedido en preparación',
-                message=f'Tu pedido #{instance.id} está siendo preparado por el vendedor.',
-                category='order',
-                order_id=instance.id,
-            )
-            
-        elif instance.estado == 'enviado':
-            # Pedido enviado
-            create_notification(
-                recipient=instance.comprador,
-                title='Pedido enviado',
-                message=f'Tu pedido #{instance.id} ha sido enviado. Pronto lo recibirás.',
-                category='order',
-                order_id=instance.id,
-            )
-            
-        elif instance.estado == 'en_transito':
-            # Pedido en tránsito
-            create_notification(
-                recipient=instance.comprador,
-                title='Pedido en tránsito',
-                message=f'Tu pedido #{instance.id} está en camino hacia ti.',
-                category='order',
-                order_id=instance.id,
-            )
-            
-            # Enviar email al comprador
-            try:
-                if instance.comprador.email:
-                    email_service.send_order_in_transit_email(
-                        buyer_email=instance.comprador.email,
-                        order=instance,
-                        buyer_name=instance.comprador.get_full_name()
-                    )
-            except Exception as e:
-                logger.error(f"Error sending in transit email: {e}")
-            
-            
-        elif instance.estado == 'recibido':
-            # Pedido recibido por el comprador
-            create_notification(
-                recipient=instance.vendedor,
-                title='Pedido recibido',
-                message=f'El comprador ha confirmado la recepción del pedido #{instance.id}.',
-                category='order',
-                order_id=instance.id,
-            )
-            
-        elif instance.estado == 'completado':
-            # Pedido completado
-            create_notification(
-                recipient=instance.comprador,
-                title='Pedido completado',
-                message=f'Tu pedido #{instance.id} ha sido completado exitosamente. ¡Gracias por tu compra!',
-                category='order',
-                order_id=instance.id,
-            )
-            
-            create_notification(
-                recipient=instance.vendedor,
-                title='Pedido completado',
-                message=f'El pedido #{instance.id} ha sido completado exitosamente. ¡Gracias por la venta!',
-                category='order',
-                order_id=instance.id,
-            )
-            
-            # Enviar email al vendedor
-            try:
-                # Obtener calificaciones
-                buyer_rating = instance.calificaciones.filter(tipo='comprador_a_vendedor').first()
-                seller_rating = instance.calificaciones.filter(tipo='vendedor_a_comprador').first()
-                
-                if instance.vendedor.email:
-                    email_service.send_order_received_seller_email(
-                        seller_email=instance.vendedor.email,
-                        order=instance,
-                        seller_name=instance.vendedor.get_full_name(),
-                        buyer_rating=buyer_rating,
-                        seller_rating=seller_rating
-                    )
-            except Exception as e:
-                logger.error(f"Error sending order received seller email: {e}")
-            
-        elif instance.estado == 'cancelado':
-            # Pedido cancelado
-            create_notification(
-                recipient=instance.comprador,
-                title='Pedido cancelado',
-                message=f'Tu pedido #{instance.id} ha sido cancelado.',
-                category='order',
-                order_id=instance.id,
-            )
-            
-            create_notification(
-                recipient=instance.vendedor,
-                title='Pedido cancelado',
-                message=f'El pedido #{instance.id} ha sido cancelado.',
-                category='order',
-                order_id=instance.id,
-            )
-
-
-@receiver(post_save, sender=Payment)
-def payment_status_notifications(sender, instance, created, **kwargs):
-    """Envía notificaciones cuando cambia el estado de un pago"""
-    if created:
-        # Nuevo pago creado
-        create_notification(
-            recipient=instance.user,
-            title='Pago iniciado',
-            message=f'Se ha iniciado el proceso de pago para el pedido #{instance.order.id}.',
-            category='payment',
-            order_id=instance.order.id,
-            payment_id=instance.id,
-        )
+    except Exception as e:
+        logger.error(f"Error updating buyer stats: {e}")
+
+
+@transition(Order, source=CREATED)
+def add_order_to_rollups(order, source):
+    """El pedido nuevo suma en el resumen diario (sales/rollups.py)"""
+    add_order(order)
+
+
+@transition(Order)
+def move_order_in_rollups(order, source):
+    """El aporte del pedido pasa a la fila de su nuevo estado"""
+    move_order(order, source, order.estado)
+
+
+@receiver(pre_delete, sender=Order)
+def remove_order_from_rollups(sender, instance, **kwargs):
+    """Antes de borrar (la publicación todavía existe) descontar el pedido del resumen"""
+    remove_order(instance)
+
+
+@receiver(post_save, sender=Publication)
+def sync_publication_productor_to_orders(sender, instance, created, raw=False, **kwargs):
+    """Order.vendedor copia el productor de la publicación (Publication.save lo marca si cambió)"""
+    if raw or created or not getattr(instance, '_productor_cambiado', False):
+        return
+    Order.objects.filter(publicacion=instance).update(vendedor_id=instance.productor_id)
+    instance._productor_cambiado = False
+
+
+@receiver(post_save, sender=Crop)
+def sync_crop_productor_to_orders(sender, instance, created, raw=False, **kwargs):
+    """Igual que las publicaciones (marketplace.signals), los pedidos siguen al productor del cultivo"""
+    if raw or created or instance._productor_original == instance.productor_id:
+        return
+    Order.objects.filter(publicacion__cultivo=instance).exclude(
+        vendedor_id=instance.productor_id
+    ).update(vendedor_id=instance.productor_id)
+
+
+@receiver(post_save, sender=Message)
+def publish_new_message(sender, instance, created, raw=False, **kwargs):
+    """Sube la versión de la conversación y despierta sus streams (sales/chat.py)"""
+    if raw or not created:
+        return
+    message_saved(instance)
+
+
+@receiver(post_init, sender=Rating)
+def remember_rating_values(sender, instance, **kwargs):
+    """Guarda lo que aporta la calificación a los totales tal como se cargó"""
+    if instance.pk is None or any(campo not in instance.__dict__ for campo in ('tipo', 'calificado_id', *RATING_FIELDS)):
+        instance._rating_original = None
     else:
-        # Estado del pago cambió
-        if instance.status == 'approved':
-            # Pago aprobado
-            create_notification(
-                recipient=instance.user,
-                title='Pago aprobado',
-                message=f'Tu pago del pedido #{instance.order.id} ha sido aprobado exitosamente.',
-                category='payment',
-                order_id=instance.order.id,
-                payment_id=instance.id,
-            )
-            
-            # Notificar al vendedor
-            create_notification(
-                recipient=instance.order.vendedor,
-                title='Pago recibido',
-                message=f'Has recibido el pago del pedido #{instance.order.id}. Puedes confirmar el pedido.',
-                category='payment',
-                order_id=instance.order.id,
-                payment_id=instance.id,
-            )
-            
-        elif instance.status == 'rejected':
-            # Pago rechazado
-            create_notification(
-                recipient=instance.user,
-                title='Pago rechazado',
-                message=f'Tu pago del pedido #{instance.order.id} ha sido rechazado. Por favor, intenta nuevamente.',
-                category='payment',
-                order_id=instance.order.id,
-                payment_id=instance.id,
-            )
-            
-        elif instance.status == 'pending':
-            # Pago pendiente
-            create_notification(
-                recipient=instance.user,
-                title='Pago pendiente',
-                message=f'Tu pago del pedido #{instance.order.id} está pendiente de procesamiento.',
-                category='payment',
-                order_id=instance.order.id,
-                payment_id=instance.id,
-            )
-
-
-@receiver(post_save, sender=Order)
-def update_seller_stats_on_completion(sender, instance, created, **kwargs):
-    """Actualiza estadísticas del vendedor cuando se completa un pedido"""
-    if not created and instance.estado == 'completado':
-        try:
-            # Obtener o crear perfil del vendedor
-            seller_profile, created = ProducerProfile.objects.get_or_create(
-                user=instance.vendedor,
-                defaults={
-                    'total_ventas': 0,
-                    'ingresos_totales': 0,
-                    'calificacion_promedio': 0,
-                    'total_calificaciones': 0,
-                }
-            )
-            
-            # Actualizar estadísticas
-            seller_profile.total_ventas += 1
-            seller_profile.ingresos_totales += instance.precio_total
-            
-            # Establecer fecha de primera venta si es la primera
-            if seller_profile.total_ventas == 1:
-                seller_profile.fecha_primera_venta = timezone.now()
-            
-            seller_profile.save()
-            
-        except Exception as e:
-            logger.error(f"Error updating seller stats: {e}")
-
-
-@receiver(post_save, sender=Order)
-def update_buyer_stats_on_completion(sender, instance, created, **kwargs):
-    """Actualiza estadísticas del comprador cuando se completa un pedido"""
-    if not created and instance.estado == 'completado':
-        try:
-            # Obtener o crear perfil del comprador
-            buyer_profile, created = BuyerProfile.objects.get_or_create(
-                user=instance.comprador,
-                defaults={
-                    'total_compras': 0,
-                    'gastos_totales': 0,
-                }
-            )
-            
-            # Actualizar estadísticas
-            buyer_profile.total_compras += 1
-            buyer_profile.gastos_totales += instance.precio_total
-            buyer_profile.save()
-            
-        except Exception as e:
-            logger.error(f"Error updating buyer stats: {e}")
+        instance._rating_original = rating_values(instance)
+
+
+@receiver(pre_save, sender=Rating)
+def load_rating_values(sender, instance, raw=False, **kwargs):
+    """Si la instancia se cargó con campos diferidos, leer los valores guardados"""
+    if raw or instance._state.adding or getattr(instance, '_rating_original', None) is not None:
+        return
+    guardada = sender.objects.filter(pk=instance.pk).only('tipo', 'calificado_id', *RATING_FIELDS).first()
+    instance._rating_original = rating_values(guardada) if guardada else None
 
 
 @receiver(post_save, sender=Rating)
-def update_rating_stats(sender, instance, created, **kwargs):
-    """Actualiza estadísticas de calificaciones cuando se crea una nueva calificación"""
-    if created:
-        try:
-            if instance.tipo == 'comprador_a_vendedor':
-                # Calificación de comprador a vendedor
-                try:
-                    seller_profile, _ = ProducerProfile.objects.get_or_create(
-                        user=instance.calificado,
-                        defaults={
-                            'total_ventas': 0,
-                            'ingresos_totales': 0,
-                            'calificacion_promedio': 0,
-                            'total_calificaciones': 0,
-                        }
-                    )
-                    
-                    # Recalcular promedio de calificaciones basado en calificado (más preciso)
-                    ratings = Rating.objects.filter(
-                        calificado=instance.calificado,
-                        tipo='comprador_a_vendedor'
-                    )
-                    
-                    if ratings.exists():
-                        avg_rating = ratings.aggregate(avg=Avg('calificacion_general'))['avg']
-                        seller_profile.calificacion_promedio = round(avg_rating, 1)  # Usar 1 decimal
-                        seller_profile.total_calificaciones = ratings.count()
-                        seller_profile.save()
-                    else:
-                        # Si no hay calificaciones, resetear a 0
-                        seller_profile.calificacion_promedio = 0
-                        seller_profile.total_calificaciones = 0
-                        seller_profile.save()
-                        
-                except ProducerProfile.DoesNotExist:
-                    # Si no existe el perfil, crearlo con valores por defecto
-                    ProducerProfile.objects.create(
-                        user=instance.calificado,
-                        total_ventas=0,
-                        ingresos_totales=0,
-                        calificacion_promedio=0,
-                        total_calificaciones=0,
-                    )
-                except Exception as e:
-                    logger.error(f"Error updating rating stats: {e}")
-        except Exception as e:
-            logger.error(f"Error in update_rating_stats: {e}")
+def update_rating_stats(sender, instance, created, raw=False, **kwargs):
+    """Aplica al perfil del calificado la diferencia que introduce la calificación"""
+    if raw:
+        return
+    actual = rating_values(instance)
+    anterior = None if created else getattr(instance, '_rating_original', None)
+    if anterior != actual:
+        if anterior is not None:
+            apply_rating(*anterior, signo=-1, create_profile=False)
+        apply_rating(*actual, signo=1)
+        schedule_leaderboard_refresh()
+    instance._rating_original = actual
+
+
+@receiver(post_delete, sender=Rating)
+def remove_rating_stats(sender, instance, **kwargs):
+    """Descuenta la calificación borrada de los totales del calificado"""
+    apply_rating(*rating_values(instance), signo=-1, create_profile=False)
+    schedule_leaderboard_refresh()
 
 
 @receiver(pre_delete, sender=Order)
@@ -338,8 +337,12 @@ def delete_order_notifications(sender, instance, **kwargs):
     """Elimina todas las notificaciones relacionadas con un pedido cuando se borra"""
     try:
         # Eliminar notificaciones que referencian este pedido
-        deleted_count = Notification.objects.filter(order_id=instance.id).count()
-        Notification.objects.filter(order_id=instance.id).delete()
+        notificaciones = Notification.objects.filter(order_id=instance.id)
+        destinatarios = set(notificaciones.values_list('recipient_id', flat=True))
+        deleted_count, _ = notificaciones.delete()
+        bump_notifications_version(*destinatarios)
+        # Y las que todavía no salieron del outbox
+        OutboxEvent.objects.filter(order_id=instance.id).delete()
         logger.info(f"Deleted {deleted_count} notifications for order {instance.id}")
     except Exception as e:
         logger.error(f"Error deleting notifications for order {instance.id}: {e}")
\ No newline at end of file
@@ -0,0 +1,88 @@
+"""
+Emails de pedidos enviados en segundo plano (ver core/tasks.py).
+
+Una tarea por destinatario, para que el reintento de un envío fallido no
+repita el que ya salió. Sin RESEND_API_KEY no hay nada que reintentar.
+"""
+from core.email_service import email_service, raise_on_failure
+from core.tasks import task
+from .models import Order
+
+
+def _pedido(order_id):
+    return Order.objects.select_related(
+        'comprador', 'vendedor', 'publicacion__cultivo'
+    ).filter(pk=order_id).first()
+
+
+@task(priority=5)
+def email_pedido_creado_comprador(order_id):
+    order = _pedido(order_id)
+    if order is None or not email_service.is_configured or not order.comprador.email:
+        return
+    raise_on_failure(email_service.send_order_buyer_confirmation_email(
+        buyer_email=order.comprador.email,
+        order=order,
+        buyer_name=order.comprador.get_full_name()
+    ))
+
+
+@task(priority=5)
+def email_pedido_creado_vendedor(order_id):
+    order = _pedido(order_id)
+    if order is None or not email_service.is_configured or not order.vendedor.email:
+        return
+    raise_on_failure(email_service.send_order_seller_notification_email(
+        seller_email=order.vendedor.email,
+        order=order,
+        seller_name=order.vendedor.get_full_name()
+    ))
+
+
+@task
+def email_pedido_en_transito(order_id):
+    order = _pedido(order_id)
+    if order is None or not email_service.is_configured or not order.comprador.email:
+        return
+    raise_on_failure(email_service.send_order_in_transit_email(
+        buyer_email=order.comprador.email,
+        order=order,
+        buyer_name=order.comprador.get_full_name()
+    ))
+
+
+@task
+def email_pedido_completado_vendedor(order_id):
+    order = _pedido(order_id)
+    if order is None or not email_service.is_configured or not order.vendedor.email:
+        return
+    raise_on_failure(email_service.send_order_received_seller_email(
+        seller_email=order.vendedor.email,
+        order=order,
+        seller_name=order.vendedor.get_full_name(),
+        buyer_rating=order.calificaciones.filter(tipo='comprador_a_vendedor').first(),
+        seller_rating=order.calificaciones.filter(tipo='vendedor_a_comprador').first()
+    ))
+
+
+def encolar_emails_pedidos_creados(orders):
+    """Encola (al hacer commit) los emails de confirmación de varios pedidos nuevos"""
+    ids = [(order.id,) for order in orders]
+    email_pedido_creado_comprador.delay_many(ids)
+    email_pedido_creado_vendedor.delay_many(ids)
+
+
+@task(priority=-5)
+def sumar_pedidos_al_resumen(filas):
+    """
+    Suma a DailyStats aportes de pedidos creados en bloque. sales.checkout ya
+    los suma en su transacción; queda para las tareas encoladas antes de ese cambio.
+    """
+    from .rollups import apply_contributions
+    apply_contributions(filas)
+
+
+@task(priority=-5, max_attempts=3)
+def refresh_leaderboards():
+    from .leaderboard import rebuild_leaderboards
+    rebuild_leaderboards()
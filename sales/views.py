@@ -1,17 +1,22 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q, Sum, Avg, Count
+from django.db.models import Q, Avg, Count
 from django.utils import timezone
-from django.http import JsonResponse, HttpResponse
-from django.core.paginator import Paginator
-from .models import Conversation, Message, Order, Rating
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
+from asgiref.sync import sync_to_async
+from core.pagination import KeysetPaginator, cursor_querystring
+from .models import ORDER_PAGE_KEYS, ORDER_PAGE_SIZE, Conversation, DailyStats, Message, Order, Rating
 from marketplace.models import Publication
+from marketplace.stock import restaurar_stock_de_pedido
+from .chat import conversation_version, message_payload, message_stream, messages_since
+from .checkout import CheckoutError, checkout_cart
+from .rollups import amount_in, count_in, totals_by_estado
 from .forms import MessageForm, OrderForm, OrderUpdateForm, RatingForm, OrderConfirmReceiptForm, OrderSearchForm
 from accounts.models import ProducerProfile, BuyerProfile
 from django.views.decorators.http import require_POST
-from cart.models import Cart
-from core.models import create_notification
+from core.outbox import record_notification
 from core.models import Notification
 import logging
 
@@ -23,7 +28,7 @@ logger = logging.getLogger(__name__)
 def create_order_view(request, publication_id):
     publication = get_object_or_404(Publication, pk=publication_id)
 
-    if request.user == publication.cultivo.productor:
+    if request.user.pk == publication.productor_id:
         # Redirigir si es el dueño de la publicación (no puede comprarse a sí mismo)
         messages.error(request, 'No puedes comprar tu propio producto.')
         return redirect('publication_detail', publication_id=publication.id)
@@ -48,8 +53,8 @@ def create_order_view(request, publication_id):
                 # La cantidad se restará cuando se apruebe el pago
                 order.save()
             # Notificar al vendedor que hay un nuevo pedido
-            create_notification(
-                recipient=publication.cultivo.productor,
+            record_notification(
+                recipient=publication.productor,
                 title='Nuevo pedido recibido',
                 message=f'El comprador {request.user.first_name} ha creado el pedido #{order.id} de {order.cantidad_acordada} unidades.',
                 category='order',
@@ -72,13 +77,14 @@ def order_history_view(request):
     """Vista mejorada del historial de pedidos con filtros"""
     form = OrderSearchForm(request.GET)
     
-    if request.user.role == 'Comprador':
-        orders = Order.objects.filter(comprador=request.user)
-    elif request.user.role == 'Productor':
+    if request.user.role in ('Comprador', 'Productor'):
         # Los productores también pueden ser compradores, mostrar sus compras
         orders = Order.objects.filter(comprador=request.user)
+        # Resumen diario (sales/rollups.py) con los mismos filtros, para el total
+        resumen = DailyStats.objects.filter(comprador=request.user)
     else:
         orders = Order.objects.none()
+        resumen = DailyStats.objects.none()
 
     # Aplicar filtros
     if form.is_valid():
@@ -92,36 +98,49 @@ def order_history_view(request):
                 Q(publicacion__cultivo__nombre__icontains=search) |
                 Q(comprador__first_name__icontains=search) |
                 Q(comprador__last_name__icontains=search) |
-                Q(publicacion__cultivo__productor__first_name__icontains=search) |
-                Q(publicacion__cultivo__productor__last_name__icontains=search)
+                Q(vendedor__first_name__icontains=search) |
+                Q(vendedor__last_name__icontains=search)
+            )
+            resumen = resumen.filter(
+                Q(cultivo__nombre__icontains=search) |
+                Q(comprador__first_name__icontains=search) |
+                Q(comprador__last_name__icontains=search) |
+                Q(vendedor__first_name__icontains=search) |
+                Q(vendedor__last_name__icontains=search)
             )
         
         if estado:
             orders = orders.filter(estado=estado)
+            resumen = resumen.filter(estado=estado)
         
         if fecha_desde:
             orders = orders.filter(created_at__date__gte=fecha_desde)
+            resumen = resumen.filter(dia__gte=fecha_desde)
         
         if fecha_hasta:
             orders = orders.filter(created_at__date__lte=fecha_hasta)
+            resumen = resumen.filter(dia__lte=fecha_hasta)
 
     orders = orders.select_related(
-        'publicacion__cultivo', 'publicacion__cultivo__productor', 'comprador'
-    ).order_by('-created_at')
+        'publicacion__cultivo', 'vendedor', 'comprador'
+    ).with_available_actions()
 
-    # Agregar acciones disponibles para cada pedido
-    orders_with_actions = []
-    for order in orders:
-        order.available_actions = order.get_available_actions_for_user(request.user)
-        orders_with_actions.append(order)
+    # Paginación por cursor: solo se cargan los pedidos de la página actual
+    page = KeysetPaginator(orders, ORDER_PAGE_KEYS, ORDER_PAGE_SIZE).get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
 
-    # Paginación
-    paginator = Paginator(orders_with_actions, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Acciones disponibles solo para los pedidos de la página (sin consultas extra)
+    for order in page.object_list:
+        order.available_actions = order.get_available_actions_for_user(request.user)
 
     context = {
-        'orders': page_obj,
+        'orders': page.object_list,
+        'page': page,
+        # Total desde el resumen diario: no cuenta los pedidos uno por uno
+        'total_pedidos': count_in(totals_by_estado(resumen)),
+        'filter_querystring': cursor_querystring(request),
         'form': form,
         'user_role': request.user.role
     }
@@ -139,7 +158,7 @@ def order_detail_view(request, order_id):
     order = get_object_or_404(Order, pk=order_id)
     
     # Verificar que el usuario tenga acceso a este pedido
-    if not (request.user == order.comprador or request.user == order.vendedor):
+    if not (request.user == order.comprador or request.user.pk == order.vendedor_id):
         messages.error(request, 'No tienes acceso a este pedido.')
         return redirect('order_history')
     
@@ -149,7 +168,7 @@ def order_detail_view(request, order_id):
     
     # Obtener la calificación del usuario actual si existe (para editar)
     my_rating = None
-    if request.user == order.vendedor:
+    if request.user.pk == order.vendedor_id:
         my_rating = rating_from_seller
     elif request.user == order.comprador:
         my_rating = rating_from_buyer
@@ -189,7 +208,7 @@ def quick_update_order_status_view(request, order_id):
     order = get_object_or_404(Order, pk=order_id)
     
     # Solo el vendedor puede actualizar el estado
-    if request.user != order.vendedor:
+    if request.user.pk != order.vendedor_id:
         messages.error(request, 'No tienes permisos para actualizar este pedido.')
         return redirect('producer_sales')
     
@@ -227,9 +246,9 @@ def quick_update_order_status_view(request, order_id):
             if nuevo_estado == 'confirmado' and not order.fecha_confirmacion:
                 order.fecha_confirmacion = timezone.now()
             
-            order.save()
+            order.save(update_fields=['estado', 'fecha_confirmacion', 'updated_at'])
             # Notificar al comprador sobre el cambio de estado
-            create_notification(
+            record_notification(
                 recipient=order.comprador,
                 title='Estado de pedido actualizado',
                 message=f'Tu pedido #{order.id} ahora está: {order.get_estado_display()}.',
@@ -278,7 +297,7 @@ def mark_order_shipped_view(request, order_id):
     order = get_object_or_404(Order, pk=order_id)
     
     # Solo el vendedor puede marcar como enviado
-    if request.user != order.vendedor:
+    if request.user.pk != order.vendedor_id:
         messages.error(request, 'No tienes permisos para actualizar este pedido.')
         return redirect('producer_sales')
     
@@ -303,9 +322,9 @@ def mark_order_shipped_view(request, order_id):
                 else:
                     order.notas_vendedor = f"[Envío] {notas}"
             
-            order.save()
+            order.save(update_fields=['estado', 'fecha_envio', 'notas_vendedor', 'updated_at'])
             # Notificar al comprador que el pedido está en tránsito
-            create_notification(
+            record_notification(
                 recipient=order.comprador,
                 title='Pedido en tránsito',
                 message=f'Tu pedido #{order.id} está en tránsito. Debería llegar en 3-5 días hábiles.',
@@ -358,9 +377,9 @@ def confirm_order_receipt_view(request, order_id):
                 else:
                     order.notas_comprador = f"Notas de recepción: {notas_recepcion}"
             
-            order.save()
+            order.save(update_fields=['estado', 'fecha_recepcion', 'notas_comprador', 'updated_at'])
             # Notificar al vendedor que el comprador confirmó recepción y calificó
-            create_notification(
+            record_notification(
                 recipient=order.vendedor,
                 title='Pedido completado',
                 message=f'El comprador confirmó la recepción y calificó el pedido #{order.id}.',
@@ -372,7 +391,7 @@ def confirm_order_receipt_view(request, order_id):
             rating = rating_form.save(commit=False)
             rating.pedido = order
             rating.calificador = request.user
-            rating.calificado = order.vendedor
+            rating.calificado_id = order.vendedor_id
             rating.tipo = 'comprador_a_vendedor'
             rating.save()
             
@@ -421,7 +440,7 @@ def rate_seller_view(request, order_id):
             rating = Rating()
             rating.pedido = order
             rating.calificador = request.user
-            rating.calificado = order.vendedor
+            rating.calificado_id = order.vendedor_id
             rating.tipo = 'comprador_a_vendedor'
             action_text = 'enviada'
         
@@ -447,7 +466,7 @@ def rate_buyer_view(request, order_id):
     order = get_object_or_404(Order, pk=order_id)
     
     # Verificar que el usuario es el vendedor
-    if request.user != order.vendedor:
+    if request.user.pk != order.vendedor_id:
         messages.error(request, 'No tienes permisos para calificar este pedido.')
         return redirect('order_detail', order_id=order.id)
     
@@ -495,7 +514,7 @@ def rate_buyer_view(request, order_id):
 @login_required
 def start_or_go_to_conversation(request, publication_id):
     publication = get_object_or_404(Publication, pk=publication_id)
-    producer = publication.cultivo.productor
+    producer = publication.productor
     
     # Prevenir que un productor inicie una conversación consigo mismo
     if request.user == producer:
@@ -584,16 +603,9 @@ def conversation_detail_simple(request, conversation_id):
             
             # Si es una petición AJAX, devolver JSON
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                from django.http import JsonResponse
                 return JsonResponse({
                     'success': True,
-                    'message': {
-                        'id': message.id,
-                        'sender_id': message.sender.id,
-                        'sender_name': message.sender.get_full_name() or message.sender.username,
-                        'content': message.content,
-                        'created_at': message.created_at.isoformat(),
-                    },
+                    'message': message_payload(message),
                     'archived': False
                 })
             
@@ -615,39 +627,58 @@ def conversation_detail_simple(request, conversation_id):
 
 @login_required
 def get_new_messages(request, conversation_id):
-    """API endpoint para obtener nuevos mensajes (polling)"""
-    conversation = get_object_or_404(Conversation, pk=conversation_id)
-    
-    # Verificar que el usuario es parte de la conversación
-    if request.user not in conversation.participants.all():
-        from django.http import JsonResponse
-        return JsonResponse({'error': 'No autorizado'}, status=403)
-    
+    """
+    API endpoint para obtener nuevos mensajes (polling). Compara primero la
+    versión de la conversación (last_message_id) con `since`, así que un
+    polling sin novedades no lee la tabla de mensajes.
+    """
     since_id = request.GET.get('since', 0)
     try:
         since_id = int(since_id)
     except ValueError:
         since_id = 0
-    
-    # Obtener mensajes nuevos
-    new_messages = conversation.messages.filter(id__gt=since_id).order_by('created_at')
-    
-    messages_data = []
-    for message in new_messages:
-        messages_data.append({
-            'id': message.id,
-            'sender_id': message.sender.id,
-            'sender_name': message.sender.get_full_name() or message.sender.username,
-            'content': message.content,
-            'created_at': message.created_at.isoformat(),
-        })
-    
-    from django.http import JsonResponse
+
+    version = conversation_version(conversation_id, request.user)
+    if version is None:
+        # Verificar que la conversación existe y que el usuario es parte de ella
+        get_object_or_404(Conversation, pk=conversation_id)
+        return JsonResponse({'error': 'No autorizado'}, status=403)
+
+    messages_data = messages_since(conversation_id, since_id) if version > since_id else []
     return JsonResponse({
         'messages': messages_data,
         'count': len(messages_data)
     })
 
+
+async def conversation_stream(request, conversation_id):
+    """
+    Mensajes nuevos de la conversación por Server-Sent Events (sales/chat.py).
+    Bajo WSGI responde 204: EventSource no reintenta y la página sigue con
+    el polling de get_new_messages.
+    """
+    user = await sync_to_async(lambda: request.user if request.user.is_authenticated else None)()
+    if user is None:
+        return HttpResponse(status=401)
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    version = await sync_to_async(conversation_version)(conversation_id, user)
+    if version is None:
+        return HttpResponse(status=403)
+
+    last_id = request.headers.get('Last-Event-ID') or request.GET.get('since', 0)
+    try:
+        last_id = int(last_id)
+    except ValueError:
+        last_id = 0
+
+    response = StreamingHttpResponse(message_stream(conversation_id, last_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Sin buffer en nginx para que cada evento llegue al momento
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 @login_required
 def buyer_dashboard(request):
     """Dashboard mejorado para compradores"""
@@ -658,19 +689,18 @@ def buyer_dashboard(request):
     # Obtener o crear perfil de comprador
     profile, created = BuyerProfile.objects.get_or_create(user=request.user)
     
-    # Estadísticas del comprador
-    total_orders = request.user.pedidos_como_comprador.count()
-    pending_orders = request.user.pedidos_como_comprador.filter(estado__in=['pendiente', 'confirmado', 'en_preparacion']).count()
-    completed_orders = request.user.pedidos_como_comprador.filter(estado='completado').count()
-    orders_to_receive = request.user.pedidos_como_comprador.filter(estado__in=['enviado', 'en_transito', 'entregado']).count()
+    # Estadísticas del comprador, desde el resumen diario (sales/rollups.py)
+    compras = totals_by_estado(DailyStats.objects.filter(comprador=request.user))
+    total_orders = count_in(compras)
+    pending_orders = count_in(compras, 'pendiente', 'confirmado', 'en_preparacion')
+    completed_orders = count_in(compras, 'completado')
+    orders_to_receive = count_in(compras, 'enviado', 'en_transito', 'entregado')
     
-    total_spent = request.user.pedidos_como_comprador.filter(
-        estado='completado'
-    ).aggregate(total=Sum('precio_total'))['total'] or 0
+    total_spent = amount_in(compras, 'completado')
     
     # Pedidos recientes
     recent_orders = request.user.pedidos_como_comprador.select_related(
-        'publicacion__cultivo', 'publicacion__cultivo__productor'
+        'publicacion__cultivo', 'vendedor'
     ).order_by('-created_at')[:5]
     
     # Conversaciones activas
@@ -718,14 +748,17 @@ def user_profile_view(request, user_id):
         calificado=user
     ).select_related('calificador', 'pedido').order_by('-created_at')[:10]
     
-    # Estadísticas de calificaciones
-    ratings_stats = Rating.objects.filter(calificado=user).aggregate(
-        total_ratings=Count('id'),
-        avg_general=Avg('calificacion_general'),
-        avg_comunicacion=Avg('calificacion_comunicacion'),
-        avg_puntualidad=Avg('calificacion_puntualidad'),
-        avg_calidad=Avg('calificacion_calidad')
-    )
+    # Estadísticas de calificaciones (totales mantenidos en el perfil, ver sales/rating_stats.py)
+    if profile is not None:
+        ratings_stats = profile.ratings_stats
+    else:
+        ratings_stats = Rating.objects.filter(calificado=user).aggregate(
+            total_ratings=Count('id'),
+            avg_general=Avg('calificacion_general'),
+            avg_comunicacion=Avg('calificacion_comunicacion'),
+            avg_puntualidad=Avg('calificacion_puntualidad'),
+            avg_calidad=Avg('calificacion_calidad')
+        )
     
     context = {
         'profile_user': user,
@@ -743,7 +776,7 @@ def cancel_order_view(request, order_id):
     order = get_object_or_404(Order, pk=order_id)
     
     # Verificar que el usuario tenga permisos para cancelar
-    if not (request.user == order.comprador or request.user == order.vendedor):
+    if not (request.user == order.comprador or request.user.pk == order.vendedor_id):
         messages.error(request, 'No tienes permisos para cancelar este pedido.')
         return redirect('order_detail', order_id=order.id)
     
@@ -759,19 +792,18 @@ def cancel_order_view(request, order_id):
             payment = order.payment
             if payment and payment.is_approved:
                 # Si el pago fue aprobado, restaurar la cantidad que se había restado
-                publication = order.publicacion
-                publication.cantidad_disponible = float(publication.cantidad_disponible) + float(order.cantidad_acordada)
-                publication.save()
+                # (atómico y una sola vez por pedido, ver marketplace/stock.py)
+                restaurar_stock_de_pedido(order)
         except:
             # Si no hay pago o el pago no fue aprobado, no hay nada que restaurar
             pass
         
         # Marcar el pedido como cancelado
         order.estado = 'cancelado'
-        order.save()
+        order.save(update_fields=['estado', 'updated_at'])
         
         # Determinar quién canceló
-        canceller_role = "vendedor" if request.user == order.vendedor else "comprador"
+        canceller_role = "vendedor" if request.user.pk == order.vendedor_id else "comprador"
         try:
             payment = order.payment
             if payment and payment.is_approved:
@@ -785,7 +817,7 @@ def cancel_order_view(request, order_id):
     
     context = {
         'order': order,
-        'user_role': 'vendedor' if request.user == order.vendedor else 'comprador'
+        'user_role': 'vendedor' if request.user.pk == order.vendedor_id else 'comprador'
     }
     
     # Render different template based on user role to keep appropriate sidebar
@@ -797,93 +829,50 @@ def cancel_order_view(request, order_id):
 
 @login_required
 def rankings_view(request):
-    """Vista de rankings de usuarios"""
-    # Top vendedores
-    top_sellers = ProducerProfile.objects.filter(
-        user__role='Productor',
-        total_ventas__gt=0
-    ).select_related('user').order_by(
-        '-calificacion_promedio',
-        '-total_ventas'
-    )[:10]
-    
-    # Top compradores
-    top_buyers = BuyerProfile.objects.filter(
-        user__role='Comprador',
-        total_compras__gt=0
-    ).select_related('user').order_by(
-        '-gastos_totales', # Ordenar por gastos puede ser más relevante
-        '-total_compras'
-    )[:10]
-    
-    # Vendedores más activos
-    most_active_sellers = ProducerProfile.objects.filter(
-        user__role='Productor'
-    ).select_related('user').order_by('-total_ventas')[:10]
-    
+    """Vista de rankings de usuarios (precalculados en sales/leaderboard.py)"""
+    from .leaderboard import leaderboard_segments
+    from .models import LeaderboardEntry
+
+    segmentos = leaderboard_segments()
+    departamento = request.GET.get('departamento', '')
+    categoria = request.GET.get('categoria', '')
+    if departamento in segmentos['departamentos']:
+        alcance, valor = 'departamento', departamento
+        categoria = ''
+    elif categoria in dict(segmentos['categorias']):
+        alcance, valor = 'categoria', categoria
+        departamento = ''
+    else:
+        alcance, valor = 'general', ''
+        departamento = categoria = ''
+
+    # Una sola lectura por índice: todas las posiciones del segmento elegido
+    tableros = {tablero: [] for tablero, _ in LeaderboardEntry.TABLERO_CHOICES}
+    for entry in LeaderboardEntry.objects.filter(alcance=alcance, valor=valor).order_by('tablero', 'posicion'):
+        tableros[entry.tablero].append(entry)
+
     context = {
-        'top_sellers': top_sellers,
-        'top_buyers': top_buyers,
-        'most_active_sellers': most_active_sellers,
+        'top_sellers': tableros['vendedores'],
+        'top_buyers': tableros['compradores'],
+        'most_active_sellers': tableros['activos'],
+        'departamentos': segmentos['departamentos'],
+        'categorias': segmentos['categorias'],
+        'departamento_actual': departamento,
+        'categoria_actual': categoria,
     }
     return render(request, 'sales/rankings.html', context)
 
 @login_required
 @require_POST
 def create_order_from_cart(request):
-    cart = get_object_or_404(Cart, user=request.user)
-    cart_items = cart.items.all()
-
-    if not cart_items:
-        messages.error(request, "Tu carrito está vacío.")
+    # Una sola transacción: validación contra el stock bloqueado, pedidos y
+    # notificaciones en bloque; los emails salen después del commit
+    try:
+        created_orders = checkout_cart(request.user)
+    except CheckoutError as e:
+        messages.error(request, str(e))
         return redirect('cart:cart_detail')
 
-    created_orders = []
-    
-    for item in cart_items:
-        publication = item.publication
-
-        # Verificar disponibilidad considerando conversión
-        disponible, cantidad_disponible = publication.verificar_disponibilidad(float(item.quantity), item.unidad_compra)
-        if not disponible:
-            disponible_display = cantidad_disponible if cantidad_disponible is not None else publication.cantidad_disponible
-            messages.error(
-                request,
-                f"❌ {publication.cultivo.nombre}: disponible {float(disponible_display):.1f} {item.unidad_compra}"
-            )
-            return redirect('cart:cart_detail')
-
-        # Convertir la cantidad del carrito a la unidad del vendedor para guardar y descontar stock
-        cantidad_en_unidad_vendedor = publication.convertir_unidad(
-            float(item.quantity),
-            item.unidad_compra,
-            publication.unidad_medida,
-        )
-        if cantidad_en_unidad_vendedor is None:
-            messages.error(request, f"❌ {publication.cultivo.nombre}: unidad no convertible")
-            return redirect('cart:cart_detail')
-
-        order = Order.objects.create(
-            publicacion=publication,
-            comprador=request.user,
-            cantidad_acordada=round(float(cantidad_en_unidad_vendedor), 2),
-            precio_total=item.get_item_price,
-            estado='pendiente'
-        )
-        # NOTA: No restamos la cantidad aquí, se restará cuando se apruebe el pago
-        # La cantidad se restará en payment.models.Payment.mark_as_approved()
-        created_orders.append(order)
-        # Notificar al vendedor sobre pedidos creados desde carrito
-        create_notification(
-            recipient=publication.cultivo.productor,
-            title='Nuevo pedido recibido',
-            message=f'Pedido #{order.id} creado por {request.user.first_name} desde el carrito.',
-            category='order',
-            order_id=order.id,
-        )
-
-    cart_items.delete()
-    
     # Guardar los IDs de los pedidos en la sesión para mostrarlos
     request.session['pending_payment_orders'] = [order.id for order in created_orders]
     
@@ -894,9 +883,7 @@ def create_order_from_cart(request):
 @login_required
 def cart_checkout_summary(request):
     """Vista de resumen después de crear pedidos desde el carrito"""
-    from django.conf import settings
-    from payments.mercadopago_service import MercadoPagoService
-    from payments.models import Payment
+    from payments.preferences import preparar_pagos
     
     order_ids = request.session.get('pending_payment_orders', [])
     
@@ -912,7 +899,7 @@ def cart_checkout_summary(request):
         id__in=order_ids,
         comprador=request.user,
         estado='pendiente'
-    ).select_related('publicacion__cultivo__productor')
+    ).select_related('publicacion__cultivo', 'vendedor')
     
     # Calcular total y resumen por unidad de medida
     total = sum(order.precio_total for order in orders)
@@ -922,51 +909,9 @@ def cart_checkout_summary(request):
         totals_by_unit[unit] = totals_by_unit.get(unit, 0.0) + float(order.cantidad_acordada)
     totals_by_unit_items = sorted(((u, round(q, 1)) for u, q in totals_by_unit.items()), key=lambda x: x[0])
     
-    # Crear datos de checkout para cada pedido
-    mercadopago_service = MercadoPagoService()
-    orders_with_checkout = []
-    
-    for order in orders:
-        # Crear o obtener pago
-        payment, created = Payment.objects.get_or_create(
-            order=order,
-            user=request.user,
-            defaults={
-                'amount': order.precio_total,
-                'currency': 'COP',
-                'payment_method': 'pse',
-                'description': f"Pago orden #{order.id}",
-                'status': 'pending'
-            }
-        )
-        
-        # Crear preferencia de MercadoPago
-        preference_result = mercadopago_service.create_preference(order, request.user)
-        
-        logger.info("Preference result received")
-        logger.info(f"Order ID: {order.id}")
-        logger.info(f"Success: {preference_result.get('success', False)}")
-        logger.info(f"Error: {preference_result.get('error', 'No error')}")
-        
-        if preference_result['success']:
-            payment.mercadopago_id = preference_result['preference_id']
-            payment.preference_id = preference_result['preference_id']
-            payment.external_reference = preference_result['reference']
-            payment.save()
-            
-            orders_with_checkout.append({
-                'order': order,
-                'payment': payment,
-                'preference_data': preference_result
-            })
-        else:
-            # Agregar el pedido aunque falle la preferencia para mostrar el error
-            orders_with_checkout.append({
-                'order': order,
-                'payment': payment,
-                'preference_data': preference_result,
-                'error': preference_result.get('error', 'Error desconocido')
-            })
+    # Pagos y preferencias de MercadoPago: se reutilizan las vigentes y las
+    # nuevas se crean en paralelo (ver payments/preferences.py)
+    orders_with_checkout = preparar_pagos(orders, request.user)
     
     # Limpiar sesión después de obtener los pedidos
     if 'pending_payment_orders' in request.session:
@@ -10,10 +10,25 @@ sleep 5
 echo "🗄️ Aplicando migraciones..."
 python manage.py migrate --noinput
 
+# Rankings precalculados (luego se actualizan solos desde el worker)
+echo "🏆 Recalculando rankings..."
+python manage.py rebuild_leaderboards
+
 # Recopilar archivos estáticos
 echo "📦 Recopilando archivos estáticos..."
 python manage.py collectstatic --noinput
 
+# Worker de tareas en segundo plano (emails, notificaciones del outbox)
+echo "⚙️ Iniciando worker de tareas..."
+python manage.py run_workers &
+
+# Con APP_SERVER=asgi, Gunicorn con workers de Uvicorn: el chat recibe los
+# mensajes en vivo (Server-Sent Events) en lugar de hacer polling
+if [ "$APP_SERVER" = "asgi" ]; then
+    echo "🌟 Iniciando servidor con Gunicorn (ASGI, Uvicorn)..."
+    exec gunicorn --bind 0.0.0.0:8000 -k uvicorn.workers.UvicornWorker agroconnect.asgi:application
+fi
+
 # Iniciar con Gunicorn (más simple, sin WebSockets)
 echo "🌟 Iniciando servidor con Gunicorn..."
 exec gunicorn --bind 0.0.0.0:8000 agroconnect.wsgi:application